@@ -1,6 +1,17 @@
-from pydantic import BaseModel
-from typing import List, Dict
+from pydantic import AliasChoices, BaseModel, Field, field_validator
+from typing import List, Dict, Optional, Set
 from schema import PersonaType
+from persona_store import parse_filter
+
+
+# Sections of a survey result, by group. A SurveyRequest's include names sections or groups
+QUESTION_SECTIONS = {
+    "quantitative": ["basic_statistics", "mean_reliability", "agreement_metrics", "polarization_metrics", "categorical_metrics"],
+    "qualitative": ["theme_analysis", "network_analysis", "sentiment_analysis", "response_patterns"],
+}
+SURVEY_SECTIONS = ["key_findings", "statistical_metrics", "recommendations", "alignment_analysis", "consistency_analysis", "demographic_insights"]
+SECTION_GROUPS = {**QUESTION_SECTIONS, "complete_analysis": SURVEY_SECTIONS}
+RESULT_SECTIONS = {section for sections in SECTION_GROUPS.values() for section in sections}
 
 
 class Option(BaseModel):
@@ -12,9 +23,56 @@ class Question(BaseModel):
     text: str
     options: List[Option]
 
+class StratificationSpec(BaseModel):
+    field: str
+    # Target share of the sample per value of field; defaults to the population shares
+    proportions: Optional[Dict[str, float]] = None
+
 class SurveyRequest(BaseModel):
     title: str
     questions: List[Question]
     persona_type: PersonaType
     number_of_personas: int = 5
-    number_of_samples: int = 2000
\ No newline at end of file
+    number_of_samples: int = 2000
+    # e.g. 'employment_status contains "more than 10 years" and location contains ", OR"'
+    persona_filter: Optional[str] = None
+    stratify_by: Optional[StratificationSpec] = None
+    sampling_seed: Optional[int] = None
+    # Result sections to compute and return, e.g. ["basic_statistics", "agreement_metrics"] or
+    # ["quantitative"]; every section when unset. Also accepted as "fields"
+    include: Optional[List[str]] = Field(default=None, validation_alias=AliasChoices("include", "fields"))
+
+    @field_validator("persona_filter")
+    @classmethod
+    def validate_persona_filter(cls, value: Optional[str]) -> Optional[str]:
+        if value:
+            parse_filter(value)
+        return value
+
+    @field_validator("include")
+    @classmethod
+    def validate_include(cls, value: Optional[List[str]]) -> Optional[List[str]]:
+        if value is not None:
+            unknown = [name for name in value if name not in RESULT_SECTIONS and name not in SECTION_GROUPS]
+            if unknown:
+                raise ValueError(f"Unknown result sections {unknown}, expected some of {sorted(SECTION_GROUPS)} or {sorted(RESULT_SECTIONS)}")
+        return value
+
+    def result_sections(self) -> Optional[Set[str]]:
+        """The sections named by include, with groups expanded; None when every section is wanted"""
+        if self.include is None:
+            return None
+        return {section for name in self.include for section in SECTION_GROUPS.get(name, [name])}
+
+    @property
+    def is_targeted(self) -> bool:
+        """Whether personas are selected by filter or stratification instead of taking the first ones"""
+        return bool(self.persona_filter or self.stratify_by)
+
+    @property
+    def is_reproducible(self) -> bool:
+        """Whether running the request again surveys the same personas"""
+        return not self.is_targeted or self.sampling_seed is not None
+
+class SurveyExtensionRequest(BaseModel):
+    questions: List[Question]
@@ -0,0 +1,235 @@
+"""
+Admission control for the LLM-heavy endpoints.
+
+Every request that fans out to the LLM providers is admitted against a budget of LLM calls
+(ADMISSION_CAPACITY) before it runs. Its cost is estimated up front from its
+size, e.g. personas x questions x calls per persona-question for a survey. Requests that fit run
+straight away; the others wait in a queue, or are rejected with 429 and a Retry-After estimate when
+the queue is full or the wait would exceed ADMISSION_MAX_WAIT_SECONDS. A request larger than the
+whole budget runs once nothing else does.
+
+Interactive traffic (/ask and its variants) has a priority lane: it is admitted ahead of queued
+batch work, and batch work is never admitted into the last ADMISSION_INTERACTIVE_RESERVE calls of
+the budget, so a question to a persona is not stuck behind surveys. Background survey jobs wait
+for admission instead of being rejected, since their queue is durable.
+
+ADMISSION_CAPACITY and ADMISSION_INTERACTIVE_RESERVE are the budget of the whole server. Each of the
+WEB_CONCURRENCY uvicorn workers admits its own requests, so each holds an equal share of them and
+the workers together never project more than ADMISSION_CAPACITY calls. A worker whose share is used
+up queues or rejects work even while another worker's share is idle.
+"""
+
+import asyncio
+import itertools
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import Deque, Dict, List, Tuple
+import metrics
+
+# LLM calls per persona and question of a survey: the answer at each ensemble temperature, and
+# the reason summary
+SURVEY_CALLS_PER_UNIT = 4
+# Question classification and the four qualitative analyses
+SURVEY_CALLS_PER_QUESTION = 5
+# Meta analysis setup, alignment and consistency, demographic insights, key findings
+SURVEY_META_CALLS = 4
+RESEARCH_CALLS_PER_QUERY = 3
+
+ADMISSION_CAPACITY = int(os.getenv("ADMISSION_CAPACITY", "2000"))
+ADMISSION_INTERACTIVE_RESERVE = int(os.getenv("ADMISSION_INTERACTIVE_RESERVE", "100"))
+# Worker processes sharing the budget
+WORKERS = max(int(os.getenv("WEB_CONCURRENCY", "1")), 1)
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "60"))
+# Assumed LLM calls completed per second until completed requests have been measured
+DEFAULT_THROUGHPUT = float(os.getenv("ADMISSION_DEFAULT_THROUGHPUT", "20"))
+THROUGHPUT_WINDOW_SECONDS = 300
+
+
+class Lane(Enum):
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+
+
+class AdmissionRejected(Exception):
+    """The request would exceed the LLM capacity; retry after retry_after seconds"""
+
+    def __init__(self, retry_after: int, cost: int, lane: Lane):
+        super().__init__(f"LLM capacity exhausted, retry after {retry_after}s (estimated {cost} LLM calls)")
+        self.retry_after = retry_after
+        self.cost = cost
+        self.lane = lane
+
+
+def survey_cost(personas: int, questions: int) -> int:
+    """Estimated LLM calls of a survey"""
+    return personas * questions * SURVEY_CALLS_PER_UNIT + personas + questions * SURVEY_CALLS_PER_QUESTION + SURVEY_META_CALLS
+
+
+def research_cost(breadth: int, depth: int) -> int:
+    """Estimated LLM calls of a research run: breadth queries at the first level, halving per level"""
+    queries = sum(max(breadth // (2 ** level), 1) for level in range(max(depth, 1)))
+    return queries * RESEARCH_CALLS_PER_QUERY + 1
+
+
+class Ticket:
+    """Admitted work; released exactly once"""
+
+    def __init__(self, cost: int, lane: Lane):
+        self.cost = cost
+        self.lane = lane
+        self.admitted_at = time.monotonic()
+        self.released = False
+
+
+class AdmissionController:
+    """
+    Budget of concurrent LLM work shared by the requests of a worker process.
+
+    Args:
+        capacity: LLM calls admitted at once by all workers
+        interactive_reserve: Part of the capacity only interactive requests may use
+        workers: Worker processes the capacity and reserve are split between
+        max_queue: Requests waiting at once, beyond which new ones are rejected
+        max_wait_seconds: Longest estimated wait a request is queued for instead of rejected
+    """
+
+    def __init__(self, capacity: int = ADMISSION_CAPACITY, interactive_reserve: int = ADMISSION_INTERACTIVE_RESERVE, max_queue: int = ADMISSION_MAX_QUEUE, max_wait_seconds: float = ADMISSION_MAX_WAIT_SECONDS, workers: int = WORKERS):
+        self.capacity = max(capacity // workers, 1)
+        self.interactive_reserve = min(interactive_reserve // workers, self.capacity - 1)
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.in_flight = 0
+        self.running = 0
+        self._queues: Dict[Lane, Deque[Tuple[int, int, asyncio.Future]]] = {lane: deque() for lane in Lane}
+        self._sequence = itertools.count()
+        self._completed: Deque[Tuple[float, int]] = deque()
+        self.stats = {"admitted": 0, "queued": 0, "rejected": 0}
+
+    def _limit(self, lane: Lane) -> int:
+        return self.capacity if lane == Lane.INTERACTIVE else self.capacity - self.interactive_reserve
+
+    def _fits(self, cost: int, lane: Lane) -> bool:
+        # Work larger than the whole budget runs alone rather than never
+        return self.in_flight + cost <= self._limit(lane) or self.running == 0
+
+    def _waiting(self, lane: Lane) -> int:
+        return sum(1 for *_, future in self._queues[lane] if not future.done())
+
+    def _publish(self):
+        """Update the admission gauges of this worker process"""
+        metrics.ADMISSION_IN_FLIGHT.set(self.in_flight)
+        metrics.ADMISSION_RUNNING.set(self.running)
+        for lane in Lane:
+            metrics.ADMISSION_QUEUE.labels(lane.value).set(self._waiting(lane))
+
+    def _queued_cost(self, lanes: List[Lane]) -> int:
+        return sum(cost for lane in lanes for cost, _, future in self._queues[lane] if not future.done())
+
+    def throughput(self) -> float:
+        """LLM calls completed per second over the recent window"""
+        now = time.monotonic()
+        while self._completed and self._completed[0][0] < now - THROUGHPUT_WINDOW_SECONDS:
+            self._completed.popleft()
+        if not self._completed:
+            return DEFAULT_THROUGHPUT
+        elapsed = max(now - self._completed[0][0], 1.0)
+        return max(sum(cost for _, cost in self._completed) / elapsed, 1.0)
+
+    def estimated_wait(self, cost: int, lane: Lane) -> float:
+        """Seconds until a request of this cost would be admitted, from the work ahead of it"""
+        ahead = [Lane.INTERACTIVE] if lane == Lane.INTERACTIVE else [Lane.INTERACTIVE, Lane.BATCH]
+        excess = self.in_flight + self._queued_cost(ahead) + min(cost, self._limit(lane)) - self._limit(lane)
+        return max(excess, 0) / self.throughput()
+
+    def _dispatch(self):
+        """Admit queued requests in lane priority, first come first served within a lane"""
+        for lane in Lane:
+            queue = self._queues[lane]
+            while queue:
+                cost, _, future = queue[0]
+                if future.done():
+                    queue.popleft()
+                    continue
+                if not self._fits(cost, lane):
+                    break
+                queue.popleft()
+                self.in_flight += cost
+                self.running += 1
+                future.set_result(None)
+            if queue:
+                # Lower priority lanes wait while a higher one has queued work
+                break
+        self._publish()
+
+    async def acquire(self, cost: int, lane: Lane = Lane.BATCH, wait: bool = False) -> Ticket:
+        """
+        Admit work of the estimated cost, waiting in the lane's queue when the budget is used up.
+        Unless wait is set, raises AdmissionRejected when the queue is full or the estimated wait
+        exceeds max_wait_seconds.
+        """
+        cost = max(int(cost), 1)
+        ahead = any(self._queues[lane]) or (lane == Lane.BATCH and any(self._queues[Lane.INTERACTIVE]))
+        if not ahead and self._fits(cost, lane):
+            self.in_flight += cost
+            self.running += 1
+            self.stats["admitted"] += 1
+            self._publish()
+            return Ticket(cost, lane)
+        if not wait:
+            queued = sum(len(queue) for queue in self._queues.values())
+            estimate = self.estimated_wait(cost, lane)
+            if queued >= self.max_queue or estimate > self.max_wait_seconds:
+                self.stats["rejected"] += 1
+                metrics.ADMISSION_REJECTED.labels(lane.value).inc()
+                raise AdmissionRejected(max(math.ceil(estimate), 1), cost, lane)
+        future = asyncio.get_running_loop().create_future()
+        self._queues[lane].append((cost, next(self._sequence), future))
+        self.stats["queued"] += 1
+        self._publish()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the caller went away
+                self._release(cost)
+            else:
+                self._publish()
+            raise
+        self.stats["admitted"] += 1
+        return Ticket(cost, lane)
+
+    def _release(self, cost: int):
+        self.in_flight -= cost
+        self.running -= 1
+        self._dispatch()
+
+    def release(self, ticket: Ticket):
+        """Return the ticket's budget and admit queued work; releasing twice has no effect"""
+        if ticket.released:
+            return
+        ticket.released = True
+        self._completed.append((time.monotonic(), ticket.cost))
+        self._release(ticket.cost)
+
+    @asynccontextmanager
+    async def admit(self, cost: int, lane: Lane = Lane.BATCH, wait: bool = False):
+        ticket = await self.acquire(cost, lane, wait)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def report(self) -> Dict[str, object]:
+        return {
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "running": self.running,
+            "waiting": {lane.value: self._waiting(lane) for lane in Lane},
+            "throughput": round(self.throughput(), 2),
+            **self.stats,
+        }
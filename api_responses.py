@@ -0,0 +1,159 @@
+"""
+Serialization and compression of API responses.
+
+Survey results are deeply nested (per-question statistics, confidence intervals, theme, network,
+sentiment and heatmap payloads, meta analysis) and run to megabytes for large surveys.
+FastJSONResponse renders them with orjson, numpy values included, instead of walking them with
+jsonable_encoder and the stdlib encoder. Endpoints return it directly so FastAPI skips its own
+encoding pass.
+
+CompressionMiddleware compresses complete response bodies with brotli or gzip, whichever the
+client prefers in Accept-Encoding (brotli on ties, when the package is installed). Streaming
+responses (server-sent events, NDJSON) are passed through untouched so every event reaches the
+client as soon as it is sent.
+"""
+
+import asyncio
+import gzip
+from enum import Enum
+from typing import Any, List, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import orjson
+except ImportError:  # falls back to the stdlib encoder
+    orjson = None
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+MINIMUM_COMPRESS_SIZE = 1024
+# Bodies above this size are compressed in a worker thread so the event loop keeps serving
+THREAD_COMPRESS_SIZE = 256 * 1024
+# Level 5 is within 10% of level 6's size for survey results at less than half the time
+GZIP_LEVEL = 5
+# Quality 11 (the default) is far too slow for responses compressed on every request
+BROTLI_QUALITY = 5
+UNCOMPRESSED_TYPES = ("text/event-stream", "application/x-ndjson", "image/", "audio/", "video/")
+
+
+def _default(value: Any) -> Any:
+    """Values orjson does not serialize natively"""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    """Encode a JSON response body"""
+    if orjson is None:
+        return JSONResponse(jsonable_encoder(content)).body
+    return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson; NaN and infinity become null"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """'br', 'gzip' or None for an Accept-Encoding header"""
+    preferences: List[Tuple[float, int, str]] = []
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding == "*":
+            candidates = ["br", "gzip"]
+        elif coding in ("br", "gzip"):
+            candidates = [coding]
+        else:
+            continue
+        for candidate in candidates:
+            if candidate == "br" and brotli is None:
+                continue
+            if quality > 0:
+                preferences.append((quality, 1 if candidate == "br" else 0, candidate))
+    return max(preferences)[2] if preferences else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete response bodies of at least minimum_size bytes"""
+
+    def __init__(self, app, minimum_size: int = MINIMUM_COMPRESS_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or headers.get("content-type", "").startswith(UNCOMPRESSED_TYPES)
+                or len(body) < self.minimum_size
+            ):
+                # Streamed, already encoded or too small to gain from compression
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+            if len(body) >= THREAD_COMPRESS_SIZE:
+                body = await asyncio.to_thread(compress, body, encoding)
+            else:
+                body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
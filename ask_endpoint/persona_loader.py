@@ -1,6 +1,25 @@
 import json
-from typing import List, Dict
+import os
+from typing import List, Dict, Sequence
 from pathlib import Path
+from persona_store import MappedPersonaStore, PersonaStore, Predicate
+
+# Indexed columns of the raw persona files, keyed by persona type
+CATEGORICAL_FIELDS = {
+    'intel_employee': ["role", "location", "employment_status"],
+    'intel_product_reviewer': ["name"],
+}
+# Typed columns of the raw persona files, so that filters like "rating <= 2" use the numeric index
+COLUMN_KINDS = {
+    'intel_employee': {"rating": "float", "recommend": "bool", "ceo_approval": "bool", "business_outlook": "bool"},
+    'intel_product_reviewer': {"rating": "int", "recommends": "bool"},
+}
+DERIVED_FIELDS = {
+    'intel_product_reviewer': {
+        "expertise_level_name": lambda record: record["expertise_level"]["level"],
+        "primary_use": lambda record: record["usage_patterns"]["primary_use"],
+    },
+}
 
 class PersonaLoader:
     _instance = None
@@ -9,10 +28,9 @@ class PersonaLoader:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(PersonaLoader, cls).__new__(cls)
-            cls._instance._load_all_personas()
         return cls._instance
 
-    def _load_all_personas(self):
+    def _load_personas(self, persona_type: str) -> PersonaStore:
         # Get the project root directory
         root_dir = Path(__file__).parent.parent
 
@@ -20,21 +38,47 @@ class PersonaLoader:
             'intel_employee': root_dir / 'glassdoor.json',
             'intel_product_reviewer': root_dir / 'intel_product_reviews.json',
         }
+        file_path = persona_files.get(persona_type)
+        if file_path is None:
+            return PersonaStore([])
+
+        # Persona files are compiled once into raw catalogs (or ingested with `persona_ingest.py --raw`)
+        # and memory-mapped, so every worker shares the same pages instead of parsing its own copy
+        catalog_dir = Path(os.getenv("PERSONA_CATALOG_DIR", root_dir / "persona_catalog")) / "raw"
+        if os.getenv("PERSONA_CATALOG_COMPILE", "1") == "1":
+            from persona_ingest import ensure_catalog  # persona_ingest imports this module
+            from schema import PersonaType
+            ensure_catalog(str(file_path), PersonaType(persona_type), str(catalog_dir / persona_type), raw=True)
+        if MappedPersonaStore.exists(catalog_dir / persona_type):
+            return MappedPersonaStore(catalog_dir / persona_type)
+        try:
+            with open(file_path, 'r') as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            print(f"Warning: Persona file {file_path} not found")
+            records = []
+        return PersonaStore(
+            records,
+            categorical=CATEGORICAL_FIELDS.get(persona_type, []),
+            derived=DERIVED_FIELDS.get(persona_type)
+        )
 
-        # Load all persona files
-        for persona_type, file_path in persona_files.items():
-            try:
-                with open(file_path, 'r') as f:
-                    self._personas[persona_type] = json.load(f)
-            except FileNotFoundError:
-                print(f"Warning: Persona file {file_path} not found")
-                self._personas[persona_type] = []
+    def get_store(self, persona_type: str) -> PersonaStore:
+        # The server loads every persona type at startup, in a thread; elsewhere on first use
+        if persona_type not in self._personas:
+            self._personas[persona_type] = self._load_personas(persona_type)
+        return self._personas[persona_type]
 
     def get_personas(self, persona_type: str) -> List[dict]:
-        return self._personas.get(persona_type, [])
+        return self.get_store(persona_type).records()
 
     def get_persona(self, persona_type: str, index: int) -> Dict:
-        personas = self.get_personas(persona_type)
-        if not personas or index >= len(personas):
+        store = self.get_store(persona_type)
+        if index < 0 or index >= len(store):
             raise ValueError(f"Persona not found for type {persona_type} at index {index}")
-        return personas[index]
\ No newline at end of file
+        return store.record(index)
+
+    def select_personas(self, persona_type: str, predicates: Sequence[Predicate] = (), limit: int = None) -> List[dict]:
+        """Raw persona records matching all predicates (field, operator, value)"""
+        store = self.get_store(persona_type)
+        return store.records(store.select(predicates, limit))
\ No newline at end of file
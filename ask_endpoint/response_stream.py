@@ -0,0 +1,101 @@
+"""
+Incremental decoding of a streamed JSON completion.
+
+/ask prompts ask for a JSON object whose "response" field holds the persona's answer. While the
+completion streams in, JSONFieldStream picks the text of that field out of the partial object and
+decodes its escapes, so the answer can be shown token by token before the object is complete.
+"""
+
+from typing import List, Optional
+
+ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JSONFieldStream:
+    """Text of one top-level string field of a JSON object, decoded as the object arrives in chunks"""
+
+    def __init__(self, field: str = "response"):
+        self.field = field
+        self.done = False
+        self._chunks: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._unicode: Optional[str] = None
+        self._high_surrogate: Optional[int] = None
+        self._role = None  # "key", "value" (the field's text) or None while in a string
+        self._key: List[str] = []
+        self._last_key = None
+        self._after_colon = False
+
+    @property
+    def text(self) -> str:
+        """The complete JSON text received so far"""
+        return "".join(self._chunks)
+
+    def _emit(self, out: List[str], char: str):
+        if self._role == "key":
+            self._key.append(char)
+        elif self._role == "value":
+            out.append(char)
+
+    def _emit_code_point(self, out: List[str], code: int):
+        if 0xD800 <= code < 0xDC00:
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self._high_surrogate = None
+        self._emit(out, chr(code))
+
+    def _end_string(self):
+        if self._role == "key":
+            self._last_key = "".join(self._key)
+            self._key = []
+        elif self._role == "value":
+            self.done = True
+        self._in_string = False
+        self._role = None
+
+    def feed(self, chunk: str) -> str:
+        """Consume the next chunk of JSON text and return the field text it completes"""
+        self._chunks.append(chunk)
+        out: List[str] = []
+        for char in chunk:
+            if self._in_string:
+                if self._unicode is not None:
+                    self._unicode += char
+                    if len(self._unicode) == 4:
+                        try:
+                            self._emit_code_point(out, int(self._unicode, 16))
+                        except ValueError:
+                            pass
+                        self._unicode = None
+                elif self._escape:
+                    self._escape = False
+                    if char == "u":
+                        self._unicode = ""
+                    else:
+                        self._emit(out, ESCAPES.get(char, char))
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._end_string()
+                else:
+                    self._emit(out, char)
+                continue
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and not self._after_colon:
+                    self._role = "key"
+                elif self._depth == 1 and self._last_key == self.field and not self.done:
+                    self._role = "value"
+            elif self._depth == 1 and char == ":":
+                self._after_colon = True
+            elif self._depth == 1 and char == ",":
+                self._after_colon = False
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+        return "".join(out)
@@ -0,0 +1,137 @@
+"""
+Benchmark of survey result serialization and compression.
+
+Builds a survey result of the size of a 100-persona, 10-question run (the quantitative statistics
+are computed by QuestionAnalytics from random persona distributions; the qualitative and meta
+analysis payloads are generated from their Gemini schemas) and reports, for each encoder, the
+median time to render it and the bytes on the wire with each content encoding.
+
+Usage:
+    python bench_responses.py
+    python bench_responses.py --personas 500 --questions 20 --repeat 20
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import statistics
+import time
+from typing import Any, Callable, Dict, List
+
+for _key in ("GEMINI_API_KEY", "AZURE_OPENAI_API_KEY", "OPENAI_API_KEY"):
+    os.environ.setdefault(_key, "bench")
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "https://bench.openai.azure.com")
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from api_responses import BROTLI_QUALITY, GZIP_LEVEL, FastJSONResponse, brotli, orjson
+from response_analytics import QuestionAnalytics
+from schema import PERSONA_NETWORK_SCHEMA, RESPONSE_HEATMAP_SCHEMA, SENTIMENT_FLOW_SCHEMA, THEME_RADAR_SCHEMA
+
+OPTIONS = ["Very Dissatisfied", "Dissatisfied", "Neutral", "Satisfied", "Very Satisfied"]
+WORDS = "pay culture management growth benefits balance leadership team product quality support roadmap".split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _instance(schema: Dict[str, Any], rng: random.Random, items: int) -> Any:
+    """Value shaped like a schema, with arrays of the given length"""
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: _instance(sub, rng, items) for name, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [_instance(schema["items"], rng, 3) for _ in range(items)]
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    if kind == "number":
+        return rng.random() * 100
+    if kind == "integer":
+        return rng.randrange(100)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return _text(rng, 12)
+
+
+def build_result(personas: int, questions: int, seed: int = 7) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    classification = {"scale_type": "likert", "is_likert": True, "ordered_options": OPTIONS}
+    question_results = {}
+    for q in range(1, questions + 1):
+        responses = [
+            {
+                "persona_id": str(p),
+                "distribution": dict(zip(OPTIONS, np_rng.dirichlet(np.ones(len(OPTIONS))).tolist())),
+                "reliability_score": float(np_rng.uniform(0.5, 1.0)),
+                "reason": _text(rng, 20),
+                "error": None,
+            }
+            for p in range(personas)
+        ]
+        result = QuestionAnalytics(responses, n_samples=2000).calculate_quantitative_metrics(classification)
+        result.update({
+            "theme_analysis": _instance(THEME_RADAR_SCHEMA, rng, 8),
+            "network_analysis": _instance(PERSONA_NETWORK_SCHEMA, rng, personas),
+            "sentiment_analysis": _instance(SENTIMENT_FLOW_SCHEMA, rng, 8),
+            "response_patterns": _instance(RESPONSE_HEATMAP_SCHEMA, rng, personas),
+            "completed_personas": personas,
+        })
+        question_results[str(q)] = result
+    return {
+        "question_results": question_results,
+        "metadata": {"total_personas": personas, "total_questions": questions, "error_count": 0},
+        "complete_analysis": {
+            "key_findings": [{"finding": _text(rng, 30), "evidence": _text(rng, 40)} for _ in range(10)],
+            "recommendations": [_text(rng, 25) for _ in range(10)],
+            "alignment_analysis": {str(p): {"alignment": rng.random(), "notes": _text(rng, 15)} for p in range(personas)},
+        },
+    }
+
+
+def _median_ms(fn: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 2)
+
+
+def run(personas: int, questions: int, repeat: int) -> Dict[str, Any]:
+    result = build_result(personas, questions)
+    encoders = {"stdlib (jsonable_encoder + json)": lambda: JSONResponse(jsonable_encoder(result)).body}
+    if orjson is not None:
+        encoders["orjson (FastJSONResponse)"] = lambda: FastJSONResponse(result).body
+    report: Dict[str, Any] = {"personas": personas, "questions": questions, "serialization": {}, "wire": {}}
+    for name, encode in encoders.items():
+        report["serialization"][name] = {"median_ms": _median_ms(encode, repeat)}
+    body = FastJSONResponse(result).body
+    # Both encoders must produce the same document
+    assert json.loads(body) == json.loads(JSONResponse(jsonable_encoder(result)).body)
+    report["wire"]["identity"] = {"bytes": len(body)}
+    codings: List[tuple] = [(f"gzip -{GZIP_LEVEL}", lambda: gzip.compress(body, compresslevel=GZIP_LEVEL))]
+    if brotli is not None:
+        codings.append((f"br q{BROTLI_QUALITY}", lambda: brotli.compress(body, quality=BROTLI_QUALITY)))
+    for name, encode in codings:
+        report["wire"][name] = {"bytes": len(encode()), "median_ms": _median_ms(encode, max(3, repeat // 4))}
+    if brotli is None:
+        report["wire"]["br"] = "brotli not installed"
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark survey result serialization and compression")
+    parser.add_argument("--personas", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    print(json.dumps(run(args.personas, args.questions, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 import os
 import typer
-import tiktoken
+from functools import lru_cache
 from typing import Optional
 from rich.console import Console
 from dotenv import load_dotenv
@@ -19,22 +19,6 @@ def create_azure_openai_client(api_key: str, azure_endpoint: str) -> AzureOpenAI
         api_version="2024-12-01-preview",
     )
 
-# Initialize Azure OpenAI client with better error handling
-try:
-    azure_api_key = os.getenv("AZURE_OPENAI_API_KEY")
-    azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-    if not azure_api_key or not azure_endpoint:
-        raise ValueError(
-            "Azure OpenAI API key or endpoint not found. Please set AZURE_OPENAI_API_KEY and AZURE_OPENAI_ENDPOINT environment variables."
-        )
-
-    azure_openai_client = create_azure_openai_client(
-        api_key=azure_api_key, azure_endpoint=azure_endpoint
-    )
-except Exception as e:
-    print(f"Error initializing Azure OpenAI client: {e}")
-    raise
-
 def get_ai_client(service: str, console: Console) -> AzureOpenAI:
     # Decide which API key and endpoint to use
     if service.lower() == "azure":
@@ -53,9 +37,12 @@ def get_ai_client(service: str, console: Console) -> AzureOpenAI:
         raise typer.Exit(1)
 
 MIN_CHUNK_SIZE = 140
-encoder = tiktoken.get_encoding(
-    "cl100k_base"
-)  # Updated to use OpenAI's current encoding
+
+@lru_cache(maxsize=1)
+def get_encoder():
+    """OpenAI's current encoding, loaded on the first trim"""
+    import tiktoken
+    return tiktoken.get_encoding("cl100k_base")
 
 def trim_prompt(
     prompt: str, context_size: int = int(os.getenv("CONTEXT_SIZE", "128000"))
@@ -64,7 +51,7 @@ def trim_prompt(
     if not prompt:
         return ""
 
-    length = len(encoder.encode(prompt))
+    length = len(get_encoder().encode(prompt))
     if length <= context_size:
         return prompt
 
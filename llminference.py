@@ -3,7 +3,6 @@ import httpx
 import json
 import os
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from anthropic import AsyncAnthropicBedrock
 import asyncio
 from dotenv import load_dotenv
 from datetime import datetime
@@ -12,12 +11,17 @@ from openai import AsyncAzureOpenAI
 import numpy as np
 from personas import Persona
 from personas import PersonaManager
+from shared_cache import SharedCache, get_shared_cache
+from metrics import count_retry, observe_call
 import time
 load_dotenv()
 
 class LLMInference:
-    def __init__(self, persona_manager: PersonaManager):
+    def __init__(self, persona_manager: PersonaManager, cache: SharedCache = None):
         self.persona_manager = persona_manager
+        # Responses are shared by all server workers: requests are seeded, so an identical
+        # request (model, prompt, temperature, schema) is answered from the cache
+        self.cache = cache or get_shared_cache()
         self.aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
         self.aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
         self.aws_region = os.getenv("AWS_REGION")
@@ -28,11 +32,7 @@ class LLMInference:
             raise ValueError("AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, and AWS_REGION environment variables are required")
         
         self.temperatures = [0.1, 0.5, 1.0]  # Different temperatures for variation
-        self.anthropic_client = AsyncAnthropicBedrock(
-            aws_access_key=self.aws_access_key_id,
-            aws_secret_key=self.aws_secret_access_key,
-            aws_region=self.aws_region
-        )
+        self._anthropic_client = None
         self.openai_client = AsyncOpenAI(api_key=self.openai_api_key)
         self.azure_openai_client = AsyncAzureOpenAI(
             api_key=self.azure_openai_api_key, 
@@ -43,6 +43,53 @@ class LLMInference:
         # Add rate limiting properties
         self.last_request_time = None
         self._lock = asyncio.Lock()
+        # Token usage reported by the provider, including prompt tokens served from its prefix cache
+        self.usage = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "cached_responses": 0}
+
+    @property
+    def anthropic_client(self):
+        """Bedrock client, created on first use so the anthropic SDK stays out of server startup"""
+        if self._anthropic_client is None:
+            from anthropic import AsyncAnthropicBedrock
+            self._anthropic_client = AsyncAnthropicBedrock(
+                aws_access_key=self.aws_access_key_id,
+                aws_secret_key=self.aws_secret_access_key,
+                aws_region=self.aws_region
+            )
+        return self._anthropic_client
+
+    def _record_usage(self, response):
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.usage["requests"] += 1
+        self.usage["prompt_tokens"] += usage.prompt_tokens or 0
+        self.usage["cached_tokens"] += (getattr(details, "cached_tokens", 0) or 0) if details else 0
+        self.usage["completion_tokens"] += usage.completion_tokens or 0
+
+    def usage_report(self) -> Dict[str, Any]:
+        """Token usage so far and the share of prompt tokens that hit the provider's prompt cache"""
+        prompt_tokens = self.usage["prompt_tokens"]
+        return {
+            **self.usage,
+            "cached_token_rate": round(self.usage["cached_tokens"] / prompt_tokens, 4) if prompt_tokens else 0.0
+        }
+
+    async def _cached(self, namespace: str, parts: List[Any], compute):
+        """Value from the shared cache, computed (and counted as LLM spend) only on a miss"""
+        computed = False
+
+        async def run():
+            nonlocal computed
+            computed = True
+            return await compute()
+
+        provider = "azure" if self.use_azure_openai else "openai"
+        value = await self.cache.get_or_compute(namespace, [provider, "gpt-4o-mini", *parts], run)
+        if not computed:
+            self.usage["cached_responses"] += 1
+        return value
 
     async def wait_for_cooldown(self):
         """Ensure at least 2 seconds between requests"""
@@ -62,7 +109,7 @@ class LLMInference:
             self.last_request_time = datetime.now()
 
     async def _make_azure_openai_json_request(self, prompt: str, temperature: float, prompt_schema=None):
-        response = await self.azure_openai_client.chat.completions.create(
+        response = await observe_call("persona_answer", "azure", self.azure_openai_client.chat.completions.create(
             model="gpt-4o-mini",
             temperature=temperature,
             messages=[{"role": "user", "content": prompt}],
@@ -71,14 +118,18 @@ class LLMInference:
                 "json_schema": prompt_schema
             },
             seed=123
-        )
+        ))
         return response
     
     async def _make_openai_json_request(self, prompt: str, temperature: float, prompt_schema=None):
+        # Only validated responses are cached, so a retry after a malformed one calls the LLM again
+        return await self._cached("llm", [prompt, temperature, prompt_schema], lambda: self._request_json(prompt, temperature, prompt_schema))
+
+    async def _request_json(self, prompt: str, temperature: float, prompt_schema=None):
         if self.use_azure_openai:
             response = await self._make_azure_openai_json_request(prompt, temperature, prompt_schema)
         else:
-            response = await self.openai_client.chat.completions.create(
+            response = await observe_call("persona_answer", "openai", self.openai_client.chat.completions.create(
                 model="gpt-4o-mini",
                 temperature=temperature,
                 messages=[{"role": "user", "content": prompt}],
@@ -87,11 +138,12 @@ class LLMInference:
                     "json_schema": prompt_schema
                 },
                 seed=123
-            )
+            ))
+        self._record_usage(response)
         try:
             json_response = json.loads(response.choices[0].message.content)
         except Exception as e:
-            print(f"[LLMInference][_make_openai_json_request] Error: {str(e)}")
+            print(f"[LLMInference][_request_json] Error: {str(e)}")
             raise
 
         if not all(key in json_response for key in ['relevant', 'option', 'reason']):
@@ -99,26 +151,27 @@ class LLMInference:
 
         return json_response
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=8, max=32), reraise=True)
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=8, max=32), reraise=True, before_sleep=count_retry("persona_summary"))
     async def _make_azure_openai_request(self, prompt: str, temperature: float):
-        response = await self.azure_openai_client.chat.completions.create(
+        response = await observe_call("persona_summary", "azure", self.azure_openai_client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=temperature,
             seed=123
-        )
+        ))
         return response
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=8, max=32), reraise=True)
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=8, max=32), reraise=True, before_sleep=count_retry("persona_summary"))
     async def _make_openai_request(self, prompt: str, temperature: float):
         if self.use_azure_openai:
             response = await self._make_azure_openai_request(prompt, temperature)   
         else:
-            response = await self.openai_client.chat.completions.create(
+            response = await observe_call("persona_summary", "openai", self.openai_client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=temperature,
                 seed=123
-            )
+            ))
+        self._record_usage(response)
         try:
             response = response.choices[0].message.content
         except Exception as e:
@@ -127,6 +180,9 @@ class LLMInference:
 
         return response
 
+    async def _complete(self, prompt: str, temperature: float, namespace: str = "llm") -> str:
+        return await self._cached(namespace, [prompt, temperature], lambda: self._make_openai_request(prompt, temperature))
+
     def _normalize_distribution(self, distribution: Dict[str, float]) -> Dict[str, float]:
         """Normalize a probability distribution to ensure it sums to 1"""
         total = sum(distribution.values())
@@ -134,7 +190,7 @@ class LLMInference:
             return distribution
         return {k: float(v)/total for k, v in distribution.items()}
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=4, max=60), retry=retry_if_exception_type(Exception))
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=4, max=60), retry=retry_if_exception_type(Exception), before_sleep=count_retry("persona_answer"))
     async def get_distribution(self, prompt: str, temperature: float, prompt_schema=None) -> Dict[str, Any]:
         """Get probability distribution for options from LLM"""
         if prompt_schema:
@@ -161,7 +217,7 @@ class LLMInference:
         else:
             raise ValueError("Prompt schema is required")
         
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=8, max=32), reraise=True)
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=8, max=32), reraise=True, before_sleep=count_retry("persona_answer"))
     async def get_ensemble_distribution(self, persona: Persona, question: str, options: List[str]) -> Dict[str, Any]:
         """Get ensemble distribution by combining multiple calls with different temperatures"""
         distributions = []
@@ -222,7 +278,7 @@ class LLMInference:
 
         Reasons: {reasons_string}
         """
-        reason_summary = await self._make_openai_request(prompt, 0.2)
+        reason_summary = await self._complete(prompt, 0.2)
 
         # Only reaches here if all responses were relevant
         final_distribution = {
@@ -242,7 +298,7 @@ class LLMInference:
     async def get_personality_summary(self, prompt: str) -> str:
         """Get personality summary from LLM"""
         try:
-            response = await self._make_openai_request(prompt, 0.2)
+            response = await self._complete(prompt, 0.2, namespace="personality_summary")
 
             return response
         except Exception as e:
@@ -0,0 +1,137 @@
+"""
+Prometheus metrics of the API server, served by GET /metrics.
+
+Every LLM provider call goes through observe_call, which counts it per call site and provider with
+its outcome (ok, error, rate_limited for 429s), times it into a latency histogram, tracks the
+calls in flight and adds the prompt, completion and cached prompt tokens of response.usage (or
+Gemini's usage_metadata) to the token totals. Retries scheduled by tenacity are counted through
+count_retry. Survey pipeline stages and analysis steps are timed into histograms. The admission
+controller updates its gauges as it admits, queues and releases work; the survey job counts are
+read from the shared job store when the metrics are scraped.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty directory shared by the
+workers so that a scrape of any worker reports all of them.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Tuple, Union
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+LLM_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+LLM_REQUESTS = Counter("llm_requests", "LLM provider calls by outcome (ok, error, rate_limited)", ["call_site", "provider", "outcome"])
+LLM_LATENCY = Histogram("llm_request_duration_seconds", "Latency of LLM provider calls", ["call_site", "provider"], buckets=LLM_LATENCY_BUCKETS)
+LLM_RETRIES = Counter("llm_retries", "Retries of LLM calls scheduled after a failed attempt", ["call_site", "provider"])
+LLM_RATE_LIMITED = Counter("llm_rate_limited", "LLM provider calls rejected with 429", ["call_site", "provider"])
+LLM_TOKENS = Counter("llm_tokens", "Tokens reported by the provider (prompt, completion, cached prompt tokens)", ["call_site", "provider", "kind"])
+LLM_IN_FLIGHT = Gauge("llm_requests_in_flight", "LLM provider calls in flight", ["call_site", "provider"], multiprocess_mode="livesum")
+ASK_STREAM_TTFT = Histogram("ask_stream_time_to_first_token_seconds", "Time to the first answer token of /ask/stream", buckets=LLM_LATENCY_BUCKETS)
+SURVEY_STAGE_SECONDS = Histogram("survey_stage_duration_seconds", "Duration of survey pipeline stages, by stage kind", ["stage"], buckets=STAGE_BUCKETS)
+ANALYSIS_STEP_SECONDS = Histogram("analysis_step_duration_seconds", "Duration of the steps of question analysis", ["step"], buckets=STAGE_BUCKETS)
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight_calls", "Estimated LLM calls of the admitted requests", multiprocess_mode="livesum")
+ADMISSION_RUNNING = Gauge("admission_running_requests", "Admitted requests running", multiprocess_mode="livesum")
+ADMISSION_QUEUE = Gauge("admission_queue_depth", "Requests waiting for admission", ["lane"], multiprocess_mode="livesum")
+ADMISSION_REJECTED = Counter("admission_rejected", "Requests rejected with 429 by admission control", ["lane"])
+SURVEY_JOBS = Gauge("survey_jobs", "Survey jobs in the job store, by state", ["state"], multiprocess_mode="mostrecent")
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether a provider error is a 429 (OpenAI RateLimitError, Gemini ResourceExhausted)"""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return status == 429 or type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+
+
+def record_usage(call_site: str, provider: str, usage: Any):
+    """Add the token counts of an OpenAI usage or Gemini usage_metadata object"""
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    counts = {
+        "prompt": getattr(usage, "prompt_tokens", None) or getattr(usage, "prompt_token_count", None) or 0,
+        "completion": getattr(usage, "completion_tokens", None) or getattr(usage, "candidates_token_count", None) or 0,
+        "cached": (getattr(details, "cached_tokens", None) if details else None) or getattr(usage, "cached_content_token_count", None) or 0,
+    }
+    for kind, count in counts.items():
+        if count:
+            LLM_TOKENS.labels(call_site, provider, kind).inc(count)
+
+
+@contextmanager
+def track_call(call_site: str, provider: str):
+    """Count, time and track in flight the LLM call made in the block"""
+    in_flight = LLM_IN_FLIGHT.labels(call_site, provider)
+    in_flight.inc()
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except BaseException as e:
+        if is_rate_limited(e):
+            outcome = "rate_limited"
+            LLM_RATE_LIMITED.labels(call_site, provider).inc()
+        raise
+    finally:
+        in_flight.dec()
+        LLM_LATENCY.labels(call_site, provider).observe(time.perf_counter() - start)
+        LLM_REQUESTS.labels(call_site, provider, outcome).inc()
+
+
+async def observe_call(call_site: str, provider: str, call: Awaitable[Any]) -> Any:
+    """Await an LLM provider call, recording its metrics and token usage"""
+    with track_call(call_site, provider):
+        response = await call
+    record_usage(call_site, provider, getattr(response, "usage", None) or getattr(response, "usage_metadata", None))
+    return response
+
+
+def openai_provider(client_owner: Any) -> str:
+    return "azure" if getattr(client_owner, "use_azure_openai", False) else "openai"
+
+
+def gemini_provider(client_owner: Any) -> str:
+    return "azure" if getattr(client_owner, "use_azure_openai", False) else "gemini"
+
+
+def count_retry(call_site: str, provider: Union[str, Callable[[Any], str]] = openai_provider) -> Callable:
+    """
+    tenacity before_sleep hook counting the retries of a call site. A call_site keyword argument
+    of the decorated call overrides the name; provider is a name, or a function of the decorated
+    method's instance returning it.
+    """
+    def before_sleep(retry_state):
+        owner = retry_state.args[0] if retry_state.args else None
+        site = retry_state.kwargs.get("call_site", call_site)
+        LLM_RETRIES.labels(site, provider(owner) if callable(provider) else provider).inc()
+    return before_sleep
+
+
+def observe_stage(name: str, seconds: float):
+    """Time a survey pipeline stage; per-question stages (responses:3) are grouped by kind"""
+    SURVEY_STAGE_SECONDS.labels(name.split(":", 1)[0]).observe(seconds)
+
+
+def observe_step(step: str, seconds: float):
+    ANALYSIS_STEP_SECONDS.labels(step).observe(seconds)
+
+
+def render() -> Tuple[bytes, str]:
+    """Metrics in the Prometheus text format, and their content type"""
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead():
+    """Drop the live gauges of this worker process when it exits"""
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(os.getpid())
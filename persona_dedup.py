@@ -0,0 +1,128 @@
+"""
+Near-duplicate persona detection with MinHash and locality-sensitive hashing.
+
+Each persona's review text (the DEDUP_FIELDS of its persona type) is reduced to word 3-gram
+shingles and summarized by a MinHash signature. Signatures are split into bands; personas that
+share a band are candidates, and a candidate counts as a duplicate when the estimated Jaccard
+similarity of the two signatures reaches the threshold. A duplicate is collapsed into the first
+persona it matched, whose weight counts the reviews it stands for, so surveys spend LLM calls on
+distinct viewpoints while weighted aggregates still represent every review.
+"""
+
+import re
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from schema import PersonaType
+
+DEDUP_FIELDS = {
+    PersonaType.INTEL_EMPLOYEE: ["pros", "cons", "advice_to_management"],
+    PersonaType.INTEL_PRODUCT_REVIEWER: ["summary", "pros", "cons"],
+}
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.8
+# Mersenne prime 2^31 - 1: products of 31-bit values fit in uint64
+_PRIME = np.uint64((1 << 31) - 1)
+_MAX_HASH = np.uint32((1 << 31) - 1)
+TOKEN = re.compile(r"\w+")
+
+
+def persona_text(record: Dict[str, Any], fields: Sequence[str]) -> str:
+    """Concatenate the review text of a persona record, flattening list fields"""
+    parts = []
+    for field in fields:
+        value = record.get(field)
+        if isinstance(value, (list, tuple)):
+            parts.extend(str(item) for item in value if item)
+        elif value:
+            parts.append(str(value))
+    return " ".join(parts)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """31-bit hashes of the word n-grams of a text"""
+    tokens = TOKEN.findall(text.lower())
+    if len(tokens) < size:
+        grams = [" ".join(tokens)] if tokens else []
+    else:
+        grams = [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+    return np.unique(np.array([zlib.crc32(gram.encode("utf-8")) & 0x7FFFFFFF for gram in grams], dtype=np.uint64))
+
+
+class MinHashDeduplicator:
+    """
+    Incremental near-duplicate index. add() returns the row a record duplicates, or None when the
+    record is distinct and becomes a representative itself. Memory grows with the number of
+    distinct personas (one signature each), not with the number of records seen.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, num_perm: int = NUM_PERM, bands: int = BANDS, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[int, np.ndarray] = {}
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        hashes = shingles(text)
+        if not len(hashes):
+            return None
+        permuted = (hashes[:, None] * self._a[None, :] + self._b[None, :]) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows_per_band:(i + 1) * self.rows_per_band].tobytes() for i in range(self.bands)]
+
+    def add(self, row: int, text: str) -> Optional[Tuple[int, float]]:
+        """
+        Index the text of a row. Returns (representative row, estimated similarity) if the text
+        is a near duplicate of an indexed representative, else None. Texts without words are
+        never treated as duplicates.
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        keys = self._band_keys(signature)
+        best: Optional[Tuple[int, float]] = None
+        seen = set()
+        for band, key in enumerate(keys):
+            for candidate in self._buckets[band].get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                similarity = float(np.mean(self._signatures[candidate] == signature))
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (candidate, similarity)
+        if best is not None:
+            return best
+        self._signatures[row] = signature
+        for band, key in enumerate(keys):
+            self._buckets[band].setdefault(key, []).append(row)
+        return None
+
+
+def deduplicate(records: Iterable[Dict[str, Any]], fields: Sequence[str], threshold: float = DEFAULT_THRESHOLD) -> Tuple[List[int], List[float]]:
+    """
+    Collapse near-duplicate records.
+
+    Returns:
+        The positions of the kept records and, for each, the number of records it represents
+    """
+    index = MinHashDeduplicator(threshold)
+    kept: List[int] = []
+    weights: Dict[int, float] = {}
+    for position, record in enumerate(records):
+        match = index.add(position, persona_text(record, fields))
+        if match is None:
+            kept.append(position)
+            weights[position] = 1.0
+        else:
+            weights[match[0]] += 1.0
+    return kept, [weights[position] for position in kept]
@@ -0,0 +1,112 @@
+"""
+Bounded conversation history for survey prompts.
+
+Personas keep their full conversation history (the meta analysis and run snapshots need it), but
+prompts only replay a compacted view: the last HISTORY_VERBATIM answers word for word, and older
+answers folded into one condensed line ("leaned 'Satisfied' (62%) on 'How satisfied are you with
+your manager'"). The view is held under HISTORY_TOKEN_BUDGET tokens by dropping the oldest folded
+answers first, then folding recent ones, so the per-question prompt size stays bounded however
+long the survey runs.
+"""
+
+import os
+from functools import lru_cache
+from typing import Dict, List
+
+HISTORY_VERBATIM = int(os.getenv("HISTORY_VERBATIM", "5"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "400"))
+TOPIC_WORDS = 8
+CONDENSED_PREFIX = "Earlier answers, condensed: "
+
+
+@lru_cache(maxsize=1)
+def _get_encoder():
+    """Load the tiktoken encoder once, returning None when it is unavailable (e.g. offline)."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"[persona_history][_get_encoder] Falling back to character estimate: {str(e)}")
+        return None
+
+
+def warm_encoder():
+    """
+    Load the encoder ahead of the first prompt. Loading reads (or, without a cached copy under
+    TIKTOKEN_CACHE_DIR, downloads) the encoding file, so the server runs this in a thread at startup.
+    """
+    _get_encoder()
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of a prompt fragment."""
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    if encoder is None:
+        # Same estimate as deep_research.providers.trim_prompt (3 chars per token on average)
+        return len(text) // 3 + 1
+    return len(encoder.encode(text))
+
+
+@lru_cache(maxsize=16384)
+def _tokens(text: str) -> int:
+    return count_tokens(text)
+
+
+def _topic(question: str) -> str:
+    words = question.split()
+    topic = " ".join(words[:TOPIC_WORDS]).rstrip("?.!:,")
+    return topic + "..." if len(words) > TOPIC_WORDS else topic
+
+
+def condense(entry: Dict[str, str]) -> str:
+    """One short phrase for a history entry"""
+    if not entry.get("option") or not entry.get("question"):
+        return entry.get("summary", "")
+    try:
+        probability = f" ({float(entry['probability']):.0%})"
+    except (KeyError, TypeError, ValueError):
+        probability = ""
+    return f"leaned '{entry['option']}'{probability} on '{_topic(entry['question'])}'"
+
+
+def compact_history(history: List[Dict[str, str]], keep_recent: int = HISTORY_VERBATIM, token_budget: int = HISTORY_TOKEN_BUDGET) -> List[str]:
+    """
+    History lines to show in a prompt, oldest first.
+
+    Args:
+        history: Conversation history entries of a persona
+        keep_recent: Number of latest answers kept verbatim when the budget allows
+        token_budget: Maximum tokens of the returned lines
+    """
+    if not history:
+        return []
+    split = max(len(history) - keep_recent, 0)
+    phrases = [condense(entry) for entry in history[:split]]
+    recent = [entry.get("summary", "") for entry in history[split:]]
+    recent_entries = list(history[split:])
+    omitted = 0
+    phrase_tokens = sum(_tokens(phrase) + 1 for phrase in phrases)
+    recent_tokens = sum(_tokens(line) for line in recent)
+    # The condensed line's prefix and omission note count against the budget once
+    overhead = _tokens(CONDENSED_PREFIX) + 4
+    while phrase_tokens + recent_tokens + (overhead if phrases or omitted else 0) > token_budget:
+        if phrases:
+            # Oldest condensed answers go first
+            phrase_tokens -= _tokens(phrases.pop(0)) + 1
+            omitted += 1
+        elif len(recent) > 1:
+            recent_tokens -= _tokens(recent.pop(0))
+            phrase = condense(recent_entries.pop(0))
+            phrases.append(phrase)
+            phrase_tokens += _tokens(phrase) + 1
+        else:
+            break
+    lines = []
+    if phrases or omitted:
+        condensed = CONDENSED_PREFIX + "; ".join(phrases)
+        if omitted:
+            condensed += f"{'; ' if phrases else ''}{omitted} earlier answer{'s' if omitted != 1 else ''} omitted"
+        lines.append(condensed)
+    return lines + recent
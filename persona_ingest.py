@@ -0,0 +1,263 @@
+"""
+Streaming ingestion of review datasets into an on-disk persona catalog.
+
+Reviews are read incrementally from a JSON array or a JSONL file, mapped to persona fields with the
+same mapping as PersonaCatalog, validated as Persona models and written chunk by chunk with
+ColumnarWriter, so peak memory depends on the chunk size, not on the size of the dataset. Invalid
+reviews are skipped and counted. Near-duplicate reviews are collapsed into the persona they match
+(see persona_dedup.py), whose weight column counts the reviews it represents; the dedup index keeps
+one MinHash signature per distinct persona. PersonaCatalog then memory-maps the result.
+
+With --raw the reviews are stored as they are, with the indexed columns of the ask endpoint's
+PersonaLoader, into PERSONA_CATALOG_DIR/raw/<persona type>.
+
+The bundled JSON datasets are compiled the same way on first use (ensure_catalog), once per machine:
+every server worker then maps the same read-only files instead of parsing its own copy, and the
+pages are shared through the OS page cache.
+
+Usage:
+    python persona_ingest.py glassdoor-full.jsonl --persona-type intel_employee
+    python persona_ingest.py reviews.json --persona-type intel_product_reviewer --out persona_catalog/intel_product_reviewer
+    python persona_ingest.py intel_product_reviews.json --persona-type intel_product_reviewer --raw
+"""
+
+import argparse
+import json
+import os
+import time
+from array import array
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, compile races are resolved by the atomic rename
+    fcntl = None
+from typing import Any, Dict, IO, Iterator, List
+from pydantic import ValidationError
+from ask_endpoint.persona_loader import CATEGORICAL_FIELDS as RAW_CATEGORICAL_FIELDS, COLUMN_KINDS as RAW_COLUMN_KINDS, DERIVED_FIELDS as RAW_DERIVED_FIELDS
+from persona_dedup import DEDUP_FIELDS, MinHashDeduplicator, persona_text
+from persona_store import MANIFEST_FILE, ColumnarWriter
+from personas import COLUMN_KINDS, DEDUP_THRESHOLD, PERSONA_CATALOG_DIR, PERSONA_STATE_FIELDS, SOURCE_ROW_COLUMN, WEIGHT_COLUMN, persona_record
+from schema import Persona, PersonaType
+
+READ_SIZE = 1 << 20
+CHUNK_SIZE = 10000
+
+
+def _iter_json_array(f: IO[str], read_size: int) -> Iterator[Any]:
+    """Decode the elements of a top-level JSON array one at a time from a buffered text stream"""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = f.read(read_size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or not fill():
+                return
+
+    skip_whitespace()
+    if pos >= len(buffer) or buffer[pos] != "[":
+        raise ValueError("Expected a JSON array or JSONL records")
+    pos += 1
+    expect_element = True
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError("Unexpected end of JSON array")
+        if buffer[pos] == "]":
+            return
+        if not expect_element:
+            if buffer[pos] != ",":
+                raise ValueError(f"Expected ',' between array elements, found {buffer[pos]!r}")
+            pos += 1
+            skip_whitespace()
+        while True:
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+                # A number cut at the end of the buffer decodes as a shorter one: only accept
+                # an element once the character after it has been read and ends it
+                if eof or (end < len(buffer) and (buffer[end] in ",]" or buffer[end].isspace())):
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            if not fill():
+                element, end = decoder.raw_decode(buffer, pos)
+                break
+        pos = end
+        expect_element = False
+        yield element
+
+
+def iter_json_records(path: str, read_size: int = READ_SIZE) -> Iterator[Dict[str, Any]]:
+    """Stream the records of a JSON array file or a JSONL file (one record per line)"""
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head == "[":
+            yield from _iter_json_array(f, read_size)
+            return
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def ingest(source: str, persona_type: PersonaType, out_dir: str = None, chunk_size: int = CHUNK_SIZE, raw: bool = False, dedup_threshold: float = DEDUP_THRESHOLD) -> Dict[str, Any]:
+    """
+    Ingest a review dataset into a persona catalog directory.
+
+    Args:
+        source: JSON array or JSONL file of raw reviews
+        persona_type: Persona type whose field mapping applies to the reviews
+        out_dir: Catalog directory; defaults to PERSONA_CATALOG_DIR/<persona type>
+        chunk_size: Number of personas buffered before a chunk is written
+        raw: Store the reviews unmapped, for the ask endpoint
+        dedup_threshold: MinHash similarity at which reviews collapse into one persona; 0 disables (always off for raw)
+
+    Returns:
+        Counts of ingested, duplicate and skipped reviews
+    """
+    out_dir = out_dir or os.path.join(PERSONA_CATALOG_DIR, *(["raw"] if raw else []), persona_type.value)
+    os.makedirs(os.path.dirname(os.path.abspath(out_dir)), exist_ok=True)
+    if raw:
+        writer = ColumnarWriter(out_dir, kinds=raw_kinds(persona_type), derived=RAW_DERIVED_FIELDS.get(persona_type.value))
+    else:
+        writer = ColumnarWriter(out_dir, kinds=COLUMN_KINDS)
+    start = time.time()
+    chunk: List[Dict[str, Any]] = []
+    read, skipped, duplicates = 0, 0, 0
+    errors: List[str] = []
+    dedup = MinHashDeduplicator(dedup_threshold) if dedup_threshold > 0 and not raw and persona_type in DEDUP_FIELDS else None
+    weights = array("d")
+    source_rows = array("q")
+    for data in iter_json_records(source):
+        read += 1
+        if raw:
+            chunk.append(data)
+        else:
+            # Persona ids are positions in the source, as when the catalog is loaded from JSON
+            persona_id = str(read - 1)
+            try:
+                persona = Persona(**persona_record(persona_type, persona_id, data))
+            except (ValidationError, AttributeError, TypeError) as e:
+                skipped += 1
+                if len(errors) < 10:
+                    errors.append(f"review {read - 1}: {e}")
+                continue
+            record = persona.model_dump(exclude=PERSONA_STATE_FIELDS)
+            if dedup is not None:
+                match = dedup.add(writer.rows + len(chunk), persona_text(record, DEDUP_FIELDS[persona_type]))
+                if match is not None:
+                    weights[match[0]] += 1
+                    duplicates += 1
+                    continue
+                weights.append(1.0)
+            source_rows.append(read - 1)
+            chunk.append(record)
+        if len(chunk) >= chunk_size:
+            writer.append(chunk)
+            chunk = []
+    if chunk:
+        writer.append(chunk)
+    if dedup is not None:
+        writer.write_column(WEIGHT_COLUMN, "float", weights)
+    if not raw:
+        writer.write_column(SOURCE_ROW_COLUMN, "int", source_rows)
+    stat = os.stat(source)
+    writer.close({
+        "persona_type": persona_type.value,
+        "source": os.path.basename(source),
+        "source_size": stat.st_size,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "raw": raw,
+        "dedup_threshold": dedup_threshold if dedup is not None else 0
+    })
+    return {
+        "catalog": out_dir,
+        "read": read,
+        "ingested": writer.rows,
+        "duplicates": duplicates,
+        "skipped": skipped,
+        "errors": errors,
+        "seconds": round(time.time() - start, 2)
+    }
+
+
+def raw_kinds(persona_type: PersonaType) -> Dict[str, str]:
+    """Column kinds of a raw catalog; other fields are stored as JSON"""
+    return {
+        **RAW_COLUMN_KINDS.get(persona_type.value, {}),
+        **{field: "category" for field in RAW_CATEGORICAL_FIELDS.get(persona_type.value, [])}
+    }
+
+
+def _catalog_state(source: str, out_dir: str, raw: bool, dedup_threshold: float, kinds: Dict[str, str] = None) -> str:
+    """'current', 'stale' or 'missing' for a catalog compiled from source, 'foreign' if it was ingested from another file"""
+    try:
+        with open(os.path.join(out_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return "missing"
+    if manifest.get("source") != os.path.basename(source):
+        return "foreign"
+    stat = os.stat(source)
+    current = (
+        manifest.get("source_size") == stat.st_size
+        and manifest.get("source_mtime_ns") == stat.st_mtime_ns
+        and manifest.get("raw", False) == raw
+        and (raw or manifest.get("dedup_threshold") == dedup_threshold)
+        # Catalogs compiled before a field's kind was configured are recompiled
+        and all(column.get("kind") == (kinds or {}).get(field, column.get("kind")) for field, column in manifest.get("columns", {}).items())
+    )
+    return "current" if current else "stale"
+
+
+def ensure_catalog(source: str, persona_type: PersonaType, out_dir: str, raw: bool = False, dedup_threshold: float = DEDUP_THRESHOLD) -> bool:
+    """
+    Compile a JSON dataset into a catalog directory unless an up-to-date one is already there.
+    A catalog ingested from another file is left alone. Concurrent workers wait on a file lock so
+    only one of them compiles. Returns whether a catalog is available.
+    """
+    kinds = raw_kinds(persona_type) if raw else COLUMN_KINDS
+    if not os.path.exists(source):
+        return _catalog_state(source, out_dir, raw, dedup_threshold, kinds) == "foreign"
+    if _catalog_state(source, out_dir, raw, dedup_threshold, kinds) in ("current", "foreign"):
+        return True
+    os.makedirs(os.path.dirname(os.path.abspath(out_dir)), exist_ok=True)
+    with open(f"{out_dir.rstrip(os.sep)}.lock", "w") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        if _catalog_state(source, out_dir, raw, dedup_threshold, kinds) not in ("current", "foreign"):
+            result = ingest(source, persona_type, out_dir, raw=raw, dedup_threshold=dedup_threshold)
+            print(f"[ensure_catalog] compiled {source} into {out_dir}: {result['ingested']} personas in {result['seconds']}s")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a review dataset into an on-disk persona catalog")
+    parser.add_argument("source", help="JSON array or JSONL file of reviews")
+    parser.add_argument("--persona-type", required=True, choices=[t.value for t in PersonaType])
+    parser.add_argument("--out", help=f"Catalog directory (default {PERSONA_CATALOG_DIR}/<persona type>)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--raw", action="store_true", help="Store the reviews unmapped, for the ask endpoint")
+    parser.add_argument("--dedup-threshold", type=float, default=DEDUP_THRESHOLD, help="MinHash similarity of near-duplicate reviews (0 disables)")
+    args = parser.parse_args()
+    result = ingest(args.source, PersonaType(args.persona_type), args.out, args.chunk_size, args.raw, args.dedup_threshold)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
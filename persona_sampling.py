@@ -0,0 +1,128 @@
+"""
+Targeted persona samples for surveys.
+
+The persona filter of a SurveyRequest selects the eligible personas from the indexed catalog. With
+a stratification field, the sample size is allocated across the field's values (proportionally by
+default, or by the requested proportions) and each stratum is sampled at random. Every sampled
+persona gets the design weight N_h / n_h of its stratum, normalized to a mean of 1, so weighted
+aggregates represent the eligible population even when small strata are oversampled.
+
+Personas that collapse near-duplicate reviews count as their number of reviews: population sizes
+and shares are weighted, and a sampled persona's weight is its review count times D_h / n_h, D_h
+being the number of distinct personas in its stratum.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from persona_store import Predicate
+from personas import PersonaCatalog
+
+UNKNOWN_STRATUM = "unknown"
+
+
+@dataclass
+class PersonaSample:
+    persona_ids: List[str]
+    weights: Dict[str, float]
+    report: Dict[str, Any] = field(default_factory=dict)
+
+
+def allocate(size: int, population: Dict[str, int], proportions: Dict[str, float]) -> Dict[str, int]:
+    """
+    Split a sample size across strata by target proportions (largest remainder), without taking
+    more personas from a stratum than it has. Capacity left unused by small strata is handed to
+    the others in proportion to their targets.
+    """
+    allocation = {stratum: 0 for stratum in population}
+    remaining = min(size, sum(population.values()))
+    open_strata = [s for s in population if proportions.get(s, 0) > 0 and population[s] > 0]
+    while remaining > 0 and open_strata:
+        total = sum(proportions[s] for s in open_strata)
+        quotas = {s: remaining * proportions[s] / total for s in open_strata}
+        floors = {s: min(int(quotas[s]), population[s] - allocation[s]) for s in open_strata}
+        leftover = remaining - sum(floors.values())
+        for s in sorted(open_strata, key=lambda s: quotas[s] - int(quotas[s]), reverse=True):
+            if leftover <= 0:
+                break
+            if floors[s] < population[s] - allocation[s]:
+                floors[s] += 1
+                leftover -= 1
+        for s, n in floors.items():
+            allocation[s] += n
+        given = sum(floors.values())
+        remaining -= given
+        open_strata = [s for s in open_strata if allocation[s] < population[s]]
+        if given == 0:
+            break
+    return allocation
+
+
+def sample_personas(catalog: PersonaCatalog, size: int, predicates: Sequence[Predicate] = (), stratify_by: str = None, proportions: Optional[Dict[str, float]] = None, seed: int = None) -> PersonaSample:
+    """
+    Draw a sample of up to size personas matching the predicates, optionally stratified.
+
+    Args:
+        catalog: Persona catalog to sample from
+        size: Requested number of personas
+        predicates: Filter predicates (field, operator, value), all of which must hold
+        stratify_by: Persona field whose values define the strata
+        proportions: Target share of the sample per stratum; defaults to the population shares
+        seed: Seed of the random draw, so a run can be reproduced
+    """
+    store = catalog.store
+    eligible = store.select(predicates)
+    if not len(eligible):
+        raise ValueError("No personas match the persona filter")
+    rng = np.random.default_rng(seed)
+    review_counts = dict(zip((int(row) for row in eligible), catalog.weights(eligible).tolist()))
+
+    if not stratify_by:
+        chosen = eligible if len(eligible) <= size else np.sort(rng.choice(eligible, size=size, replace=False))
+        persona_ids = [catalog.ids[int(row)] for row in chosen]
+        counts = np.array([review_counts[int(row)] for row in chosen])
+        weights = counts / counts.mean()
+        return PersonaSample(
+            persona_ids=persona_ids,
+            weights={persona_id: round(float(weight), 6) for persona_id, weight in zip(persona_ids, weights)},
+            report={"eligible": int(len(eligible)), "eligible_reviews": int(sum(review_counts.values())), "sampled": len(persona_ids)}
+        )
+
+    if stratify_by not in store.columns:
+        raise ValueError(f"Unknown persona field {stratify_by}")
+    strata: Dict[str, List[int]] = {}
+    for row in eligible:
+        value = store.value(int(row), stratify_by)
+        strata.setdefault(UNKNOWN_STRATUM if value is None else str(value), []).append(int(row))
+    distinct = {stratum: len(rows) for stratum, rows in strata.items()}
+    population = {stratum: sum(review_counts[row] for row in rows) for stratum, rows in strata.items()}
+    total = sum(population.values())
+    targets = {stratum: count / total for stratum, count in population.items()}
+    if proportions:
+        targets = {stratum: float(proportions.get(stratum, 0.0)) for stratum in population}
+        if not any(targets.values()):
+            raise ValueError(f"None of the stratum proportions match values of {stratify_by}: {sorted(population)}")
+    allocation = allocate(size, distinct, targets)
+
+    chosen, design_weights, strata_report, picked_rows = [], {}, {}, {}
+    for stratum, rows in strata.items():
+        n = allocation[stratum]
+        if n:
+            picked = rng.choice(rows, size=n, replace=False)
+            picked_rows[stratum] = [int(row) for row in picked]
+            chosen.extend(picked_rows[stratum])
+            for row in picked:
+                design_weights[int(row)] = review_counts[int(row)] * distinct[stratum] / n
+        strata_report[stratum] = {"population": int(population[stratum]), "distinct": distinct[stratum], "sampled": n}
+
+    chosen.sort()
+    mean_weight = float(np.mean([design_weights[row] for row in chosen]))
+    weights = {catalog.ids[row]: round(design_weights[row] / mean_weight, 6) for row in chosen}
+    for stratum, rows in picked_rows.items():
+        # Mean weight of the stratum's sampled personas
+        strata_report[stratum]["weight"] = round(float(np.mean([design_weights[row] for row in rows])) / mean_weight, 6)
+    return PersonaSample(
+        persona_ids=[catalog.ids[row] for row in chosen],
+        weights=weights,
+        report={"eligible": len(eligible), "eligible_reviews": int(total), "sampled": len(chosen), "stratify_by": stratify_by, "strata": strata_report}
+    )
@@ -0,0 +1,599 @@
+"""
+Columnar, array-backed persona storage with attribute indexes.
+
+Records are split into one column per field instead of one object per persona:
+- numbers and booleans live in numpy arrays with a null mask
+- categorical fields (role, location, ...) are interned: each distinct value is stored once and
+  rows hold an int32 code
+- everything else (free text, lists, nested objects) stays in a plain list per field
+
+Categorical and boolean columns get a posting list per value, numeric columns a sorted index, so
+predicates such as [("rating", "<=", 2), ("location", "in", ["Hillsboro, OR", "Chandler, AZ"])]
+resolve to row numbers without scanning the records.
+
+Large catalogs are written to disk in chunks by ColumnarWriter and opened with MappedPersonaStore,
+which memory-maps the column files instead of loading them. On-disk layout, one directory per catalog:
+- manifest.json: row count, field order, column kinds and the categories of categorical columns
+- <field>.state: one byte per row, 0 = value, 1 = null, 2 = field absent from the record
+- <field>.data: fixed-width values (int64, float64, int8 booleans, int32 category codes)
+- <field>.offsets and <field>.heap: utf-8 strings (text) or JSON documents (json), row i spanning
+  heap[offsets[i]:offsets[i + 1]]
+"""
+
+import ast
+import json
+import os
+import re
+import shutil
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+Predicate = Tuple[str, str, Any]
+
+OPERATORS = ("==", "!=", "<", "<=", ">", ">=", "in", "not in", "contains")
+
+
+class PersonaColumn:
+    """A single column. kind is one of int, float, bool, category or object."""
+
+    def __init__(self, name: str, kind: str, values: List[Any]):
+        self.name = name
+        self.kind = kind
+        self.present = np.array([value is not _MISSING for value in values], dtype=bool)
+        values = [None if value is _MISSING else value for value in values]
+        self.null = np.array([value is None for value in values], dtype=bool)
+        self.categories: List[str] = []
+        self._postings: Dict[Any, np.ndarray] = {}
+        self._sorted_rows: Optional[np.ndarray] = None
+
+        if kind == "category":
+            lookup: Dict[str, int] = {}
+            codes = np.full(len(values), -1, dtype=np.int32)
+            for row, value in enumerate(values):
+                if value is None:
+                    continue
+                value = sys.intern(str(value))
+                if value not in lookup:
+                    lookup[value] = len(self.categories)
+                    self.categories.append(value)
+                codes[row] = lookup[value]
+            self.data = codes
+            self._lookup = lookup
+            self._build_postings(codes, [code for code in range(len(self.categories))])
+        elif kind == "bool":
+            self.data = np.array([-1 if value is None else int(bool(value)) for value in values], dtype=np.int8)
+            self._build_postings(self.data, [0, 1])
+        elif kind in ("int", "float"):
+            dtype = np.int64 if kind == "int" else np.float64
+            self.data = np.array([0 if value is None else value for value in values], dtype=dtype)
+            valid_rows = np.flatnonzero(~self.null)
+            self._sorted_rows = valid_rows[np.argsort(self.data[valid_rows], kind="stable")]
+            self._sorted_values = self.data[self._sorted_rows]
+        else:
+            self.data = values
+
+    def _build_postings(self, codes: np.ndarray, keys: List[int]):
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        for key in keys:
+            lo, hi = np.searchsorted(sorted_codes, [key, key + 1])
+            self._postings[key] = np.sort(order[lo:hi])
+
+    def _posting(self, key: int) -> np.ndarray:
+        """Sorted rows holding a category code (or 0/1 for booleans)"""
+        return self._postings[key]
+
+    def is_present(self, row: int) -> bool:
+        return bool(self.present[row])
+
+    def value(self, row: int) -> Any:
+        if self.null[row]:
+            return None
+        if self.kind == "category":
+            return self.categories[self.data[row]]
+        if self.kind == "bool":
+            return bool(self.data[row])
+        if self.kind in ("int", "float"):
+            return self.data[row].item()
+        return self.data[row]
+
+    def _codes_for(self, values: Iterable[Any]) -> List[Any]:
+        if self.kind == "category":
+            return [self._lookup[str(value)] for value in values if str(value) in self._lookup]
+        return [int(bool(value)) for value in values]
+
+    def rows(self, op: str, operand: Any) -> np.ndarray:
+        """Sorted row numbers matching `column op operand`. Null values never match."""
+        size = len(self.null)
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported operator {op} for field {self.name}")
+
+        if self.kind in ("category", "bool"):
+            if op in ("==", "!=", "in", "not in"):
+                values = operand if op in ("in", "not in") else [operand]
+                if isinstance(values, str):
+                    values = [values]
+                keys = self._codes_for(values)
+            elif op == "contains" and self.kind == "category":
+                needle = str(operand).lower()
+                keys = [code for code, category in enumerate(self.categories) if needle in category.lower()]
+            else:
+                raise ValueError(f"Operator {op} is not supported for {self.kind} field {self.name}")
+            matched = np.unique(np.concatenate([self._posting(key) for key in keys])) if keys else np.empty(0, dtype=np.int64)
+            if op in ("!=", "not in"):
+                mask = ~self.null
+                mask[matched] = False
+                return np.flatnonzero(mask)
+            return matched
+
+        if self.kind in ("int", "float"):
+            if op in ("in", "not in"):
+                matched = np.unique(np.concatenate([self.rows("==", value) for value in operand])) if operand else np.empty(0, dtype=np.int64)
+                if op == "not in":
+                    mask = ~self.null
+                    mask[matched] = False
+                    return np.flatnonzero(mask)
+                return matched
+            if op == "contains":
+                raise ValueError(f"Operator contains is not supported for numeric field {self.name}")
+            values = self._sorted_values
+            if op == "==":
+                lo, hi = np.searchsorted(values, operand, "left"), np.searchsorted(values, operand, "right")
+            elif op == "!=":
+                return np.setdiff1d(np.flatnonzero(~self.null), self.rows("==", operand))
+            elif op == "<":
+                lo, hi = 0, np.searchsorted(values, operand, "left")
+            elif op == "<=":
+                lo, hi = 0, np.searchsorted(values, operand, "right")
+            elif op == ">":
+                lo, hi = np.searchsorted(values, operand, "right"), len(values)
+            else:
+                lo, hi = np.searchsorted(values, operand, "left"), len(values)
+            return np.sort(self._sorted_rows[lo:hi])
+
+        # Object columns are not indexed: fall back to a scan
+        def matches(value: Any) -> bool:
+            if value is None:
+                return False
+            if op == "==":
+                return value == operand
+            if op == "!=":
+                return value != operand
+            if op == "in":
+                return value in operand
+            if op == "not in":
+                return value not in operand
+            if op == "contains":
+                return str(operand).lower() in str(value).lower()
+            raise ValueError(f"Operator {op} is not supported for field {self.name}")
+        return np.array([row for row in range(size) if matches(self.value(row))], dtype=np.int64)
+
+
+class _Missing:
+    def __repr__(self):
+        return "<missing>"
+
+
+_MISSING = _Missing()
+
+
+def _infer_kind(values: List[Any]) -> str:
+    present = [value for value in values if value is not None and value is not _MISSING]
+    if not present:
+        return "object"
+    if all(isinstance(value, bool) for value in present):
+        return "bool"
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in present):
+        return "int"
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        return "float"
+    return "object"
+
+
+class PersonaStore:
+    """
+    Column-oriented table of persona records with predicate selection.
+    """
+
+    def __init__(self, records: Sequence[Dict[str, Any]], categorical: Sequence[str] = (), derived: Dict[str, Callable[[Dict[str, Any]], Any]] = None):
+        """
+        Args:
+            records: Flat or nested persona records; nested values are kept as they are
+            categorical: Fields to intern and index as categories
+            derived: Extra indexed categorical columns computed from each record, not part of the records themselves
+        """
+        self._size = len(records)
+        self.fields: List[str] = []
+        for record in records:
+            for key in record:
+                if key not in self.fields:
+                    self.fields.append(key)
+        self.columns: Dict[str, PersonaColumn] = {}
+        for field in self.fields:
+            values = [record.get(field, _MISSING) for record in records]
+            kind = "category" if field in categorical else _infer_kind(values)
+            self.columns[field] = PersonaColumn(field, kind, values)
+        self.derived_fields: List[str] = []
+        for name, extract in (derived or {}).items():
+            values = []
+            for record in records:
+                try:
+                    values.append(extract(record))
+                except (KeyError, TypeError, AttributeError):
+                    values.append(None)
+            self.columns[name] = PersonaColumn(name, "category", values)
+            self.derived_fields.append(name)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add_column(self, name: str, kind: str, values: Sequence[Any]):
+        """Attach a computed column that is indexed but not part of the records"""
+        if len(values) != self._size:
+            raise ValueError(f"Column {name} has {len(values)} values for {self._size} rows")
+        self.columns[name] = PersonaColumn(name, kind, list(values))
+        if name not in self.derived_fields:
+            self.derived_fields.append(name)
+
+    def value(self, row: int, field: str) -> Any:
+        return self.columns[field].value(row)
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """Rebuild the record of a row with its original fields"""
+        if row < 0 or row >= self._size:
+            raise IndexError(f"Persona row {row} out of range")
+        return {
+            field: self.columns[field].value(row)
+            for field in self.fields
+            if self.columns[field].is_present(row)
+        }
+
+    def records(self, rows: Iterable[int] = None) -> List[Dict[str, Any]]:
+        return [self.record(int(row)) for row in (range(self._size) if rows is None else rows)]
+
+    def categories(self, field: str) -> List[str]:
+        """Distinct values of a categorical field"""
+        return list(self.columns[field].categories)
+
+    def column_kinds(self) -> Dict[str, str]:
+        """Kind of every column, to validate filters with parse_filter"""
+        return {name: column.kind for name, column in self.columns.items()}
+
+    def select(self, predicates: Sequence[Predicate] = (), limit: int = None) -> np.ndarray:
+        """Row numbers, in catalog order, matching all predicates (field, operator, value)"""
+        rows = np.arange(self._size)
+        for field, op, operand in predicates:
+            if field not in self.columns:
+                raise ValueError(f"Unknown persona field {field}")
+            check_operand(field, self.columns[field].kind, op, operand)
+            rows = np.intersect1d(rows, self.columns[field].rows(op, operand), assume_unique=True)
+            if not len(rows):
+                break
+        return rows[:limit] if limit is not None else rows
+
+
+FILTER_CLAUSE = re.compile(r"^\s*([A-Za-z_][\w]*)\s*(==|=|!=|<=|>=|<|>|not\s+in\b|in\b|contains\b)\s*(.+?)\s*$", re.IGNORECASE)
+
+
+def _split_clauses(expression: str) -> List[str]:
+    """Split on 'and' outside of quotes and brackets"""
+    clauses, current, depth, quote, i = [], [], 0, None, 0
+    while i < len(expression):
+        char = expression[i]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char in "[({":
+            depth += 1
+        elif char in "])}":
+            depth -= 1
+        elif depth == 0 and expression[i:i + 5].lower() == " and ":
+            clauses.append("".join(current))
+            current = []
+            i += 5
+            continue
+        current.append(char)
+        i += 1
+    clauses.append("".join(current))
+    return [clause for clause in clauses if clause.strip()]
+
+
+def check_operand(field: str, kind: str, op: str, operand: Any):
+    """Raise ValueError when an operand (each value of an in list) cannot be compared with a column of this kind"""
+    values = operand if op in ("in", "not in") else [operand]
+    if kind in ("int", "float"):
+        invalid = [value for value in values if isinstance(value, bool) or not isinstance(value, (int, float))]
+        if invalid:
+            raise ValueError(f"Field {field} is numeric, cannot compare it with {invalid[0]!r}")
+    elif kind == "bool":
+        invalid = [value for value in values if value not in (True, False)]
+        if invalid:
+            raise ValueError(f"Field {field} is true or false, cannot compare it with {invalid[0]!r}")
+
+
+def parse_filter(expression: str, kinds: Dict[str, str] = None) -> List[Predicate]:
+    """
+    Parse a filter expression into predicates, e.g.
+    'rating <= 2 and location in ["Hillsboro, OR", "Chandler, AZ"] and employment_status contains "10 years"'.
+    Clauses are joined with 'and'; values are Python literals, bare words are read as strings.
+    With the column kinds of a store (PersonaStore.column_kinds), unknown fields and values of the
+    wrong type for their field are rejected too.
+    """
+    predicates = []
+    for clause in _split_clauses(expression or ""):
+        match = FILTER_CLAUSE.match(clause)
+        if not match:
+            raise ValueError(f"Invalid filter clause: {clause.strip()}")
+        field, op, raw_value = match.groups()
+        op = " ".join(op.lower().split())
+        op = "==" if op == "=" else op
+        try:
+            value = ast.literal_eval(raw_value)
+        except (ValueError, SyntaxError):
+            value = raw_value
+        if op in ("in", "not in") and not isinstance(value, (list, tuple, set)):
+            raise ValueError(f"Operator {op} needs a list of values: {clause.strip()}")
+        if kinds is not None:
+            if field not in kinds:
+                raise ValueError(f"Unknown persona field {field}")
+            check_operand(field, kinds[field], op, value)
+        predicates.append((field, op, value))
+    return predicates
+
+
+VALUE, NULL, ABSENT = 0, 1, 2
+FIXED_WIDTH_DTYPES = {"int": np.int64, "float": np.float64, "bool": np.int8, "category": np.int32}
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+
+class _ColumnFileWriter:
+    """Appends the values of one column to its files"""
+
+    def __init__(self, directory: str, name: str, kind: str):
+        self.name = name
+        self.kind = kind
+        self.categories: List[str] = []
+        self._lookup: Dict[str, int] = {}
+        self._state = open(os.path.join(directory, f"{name}.state"), "wb")
+        if kind in FIXED_WIDTH_DTYPES:
+            self._data = open(os.path.join(directory, f"{name}.data"), "wb")
+        else:
+            self._offsets = open(os.path.join(directory, f"{name}.offsets"), "wb")
+            self._heap = open(os.path.join(directory, f"{name}.heap"), "wb")
+            self._heap_size = 0
+            self._offsets.write(np.array([0], dtype=np.int64).tobytes())
+
+    def _encode(self, value: Any) -> Any:
+        if self.kind == "category":
+            value = str(value)
+            if value not in self._lookup:
+                self._lookup[value] = len(self.categories)
+                self.categories.append(value)
+            return self._lookup[value]
+        if self.kind == "bool":
+            return int(bool(value))
+        if self.kind == "text":
+            return str(value).encode("utf-8")
+        if self.kind == "json":
+            return json.dumps(value, ensure_ascii=False).encode("utf-8")
+        return value
+
+    def append(self, values: List[Any]):
+        states = np.array([ABSENT if value is _MISSING else NULL if value is None else VALUE for value in values], dtype=np.uint8)
+        self._state.write(states.tobytes())
+        encoded = [self._encode(value) if state == VALUE else None for value, state in zip(values, states)]
+        if self.kind in FIXED_WIDTH_DTYPES:
+            null_value = -1 if self.kind in ("bool", "category") else 0
+            data = np.array([null_value if value is None else value for value in encoded], dtype=FIXED_WIDTH_DTYPES[self.kind])
+            self._data.write(data.tobytes())
+        else:
+            ends = []
+            for value in encoded:
+                if value:
+                    self._heap.write(value)
+                    self._heap_size += len(value)
+                ends.append(self._heap_size)
+            self._offsets.write(np.array(ends, dtype=np.int64).tobytes())
+
+    def close(self):
+        self._state.close()
+        if self.kind in FIXED_WIDTH_DTYPES:
+            self._data.close()
+        else:
+            self._offsets.close()
+            self._heap.close()
+
+
+class ColumnarWriter:
+    """
+    Writes persona records to the on-disk columnar layout chunk by chunk, so memory stays bounded
+    by the chunk size and the number of distinct categorical values. The catalog is assembled in a
+    temporary directory and moved into place on close, so readers never see a partial catalog.
+    """
+
+    def __init__(self, directory: str, kinds: Dict[str, str] = None, default_kind: str = "json", derived: Dict[str, Callable[[Dict[str, Any]], Any]] = None):
+        """
+        Args:
+            directory: Catalog directory, replaced on close
+            kinds: Column kind per field (int, float, bool, category, text or json)
+            default_kind: Kind of the fields missing from kinds
+            derived: Extra categorical columns computed from each record, as in PersonaStore
+        """
+        self.directory = directory
+        self.kinds = kinds or {}
+        self.default_kind = default_kind
+        self.derived = derived or {}
+        self._tmp = f"{directory.rstrip(os.sep)}.tmp-{os.getpid()}"
+        shutil.rmtree(self._tmp, ignore_errors=True)
+        os.makedirs(self._tmp)
+        self.fields: List[str] = []
+        self._writers: Dict[str, _ColumnFileWriter] = {}
+        self._derived_writers = {name: _ColumnFileWriter(self._tmp, name, "category") for name in self.derived}
+        self.rows = 0
+
+    def _add_field(self, field: str):
+        writer = _ColumnFileWriter(self._tmp, field, self.kinds.get(field, self.default_kind))
+        if self.rows:
+            # Records written before this field first appeared do not have it
+            writer.append([_MISSING] * self.rows)
+        self.fields.append(field)
+        self._writers[field] = writer
+
+    def append(self, records: Sequence[Dict[str, Any]]):
+        for record in records:
+            for field in record:
+                if field not in self._writers:
+                    self._add_field(field)
+        for field in self.fields:
+            self._writers[field].append([record.get(field, _MISSING) for record in records])
+        for name, extract in self.derived.items():
+            values = []
+            for record in records:
+                try:
+                    values.append(extract(record))
+                except (KeyError, TypeError, AttributeError):
+                    values.append(None)
+            self._derived_writers[name].append(values)
+        self.rows += len(records)
+
+    def write_column(self, name: str, kind: str, values: Sequence[Any]):
+        """Write a computed column covering every row, e.g. one only known once all records were seen"""
+        if len(values) != self.rows:
+            raise ValueError(f"Column {name} has {len(values)} values for {self.rows} rows")
+        writer = _ColumnFileWriter(self._tmp, name, kind)
+        writer.append(list(values))
+        self._derived_writers[name] = writer
+
+    def close(self, metadata: Dict[str, Any] = None) -> str:
+        columns = {}
+        for field, writer in {**self._writers, **self._derived_writers}.items():
+            writer.close()
+            columns[field] = {"kind": writer.kind}
+            if writer.kind == "category":
+                columns[field]["categories"] = writer.categories
+            if writer.kind in FIXED_WIDTH_DTYPES:
+                columns[field].update(_write_index(self._tmp, field, writer.kind, self.rows, len(writer.categories)))
+        manifest = {
+            "format": FORMAT_VERSION,
+            "rows": self.rows,
+            "fields": self.fields,
+            "derived_fields": list(self._derived_writers),
+            "columns": columns,
+            **(metadata or {})
+        }
+        with open(os.path.join(self._tmp, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f)
+        previous = None
+        if os.path.exists(self.directory):
+            previous = f"{self.directory.rstrip(os.sep)}.old-{os.getpid()}"
+            os.rename(self.directory, previous)
+        os.rename(self._tmp, self.directory)
+        if previous:
+            shutil.rmtree(previous, ignore_errors=True)
+        return self.directory
+
+
+def _map(path: str, dtype, count: int) -> np.ndarray:
+    """Read-only memory map of a column file (an empty array for empty files)"""
+    if count == 0 or os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+def _write_index(directory: str, name: str, kind: str, rows: int, codes: int = 0) -> Dict[str, Any]:
+    """Write the index files of a fixed-width column and return the manifest entries describing them"""
+    data = _map(os.path.join(directory, f"{name}.data"), FIXED_WIDTH_DTYPES[kind], rows)
+    order_path = os.path.join(directory, f"{name}.order")
+    if kind in ("category", "bool"):
+        order = np.argsort(data, kind="stable").astype(np.int64)
+        order.tofile(order_path)
+        return {"bounds": np.searchsorted(data[order], np.arange((2 if kind == "bool" else codes) + 1), "left").tolist()}
+    state = _map(os.path.join(directory, f"{name}.state"), np.uint8, rows)
+    valid_rows = np.flatnonzero(state == VALUE)
+    sorted_rows = valid_rows[np.argsort(data[valid_rows], kind="stable")].astype(np.int64)
+    sorted_rows.tofile(order_path)
+    np.ascontiguousarray(data[sorted_rows]).tofile(os.path.join(directory, f"{name}.sorted"))
+    return {"indexed": len(sorted_rows)}
+
+
+class MappedColumn(PersonaColumn):
+    """A column whose data and index files are memory-mapped"""
+
+    def __init__(self, directory: str, name: str, spec: Dict[str, Any], rows: int):
+        self.name = name
+        self.kind = spec["kind"]
+        self.categories = list(spec.get("categories", []))
+        self._lookup = {category: code for code, category in enumerate(self.categories)}
+        self._rows = rows
+        self._state = _map(os.path.join(directory, f"{name}.state"), np.uint8, rows)
+        if self.kind in FIXED_WIDTH_DTYPES:
+            self.data = _map(os.path.join(directory, f"{name}.data"), FIXED_WIDTH_DTYPES[self.kind], rows)
+        else:
+            self._offsets = _map(os.path.join(directory, f"{name}.offsets"), np.int64, rows + 1)
+            heap_path = os.path.join(directory, f"{name}.heap")
+            self._heap = _map(heap_path, np.uint8, os.path.getsize(heap_path))
+        # Indexes written by ColumnarWriter: rows ordered by category code (with the bounds of
+        # each code) or by value (with the sorted values), mapped like the column itself
+        order_path = os.path.join(directory, f"{name}.order")
+        if self.kind in ("category", "bool"):
+            self._order = _map(order_path, np.int64, rows)
+            self._bounds = np.array(spec["bounds"], dtype=np.int64)
+        elif self.kind in ("int", "float"):
+            self._sorted_rows = _map(order_path, np.int64, spec["indexed"])
+            self._sorted_values = _map(os.path.join(directory, f"{name}.sorted"), FIXED_WIDTH_DTYPES[self.kind], spec["indexed"])
+
+    @property
+    def null(self) -> np.ndarray:
+        return self._state != VALUE
+
+    @property
+    def present(self) -> np.ndarray:
+        return self._state != ABSENT
+
+    def is_present(self, row: int) -> bool:
+        return self._state[row] != ABSENT
+
+    def value(self, row: int) -> Any:
+        if self._state[row] != VALUE:
+            return None
+        if self.kind == "category":
+            return self.categories[self.data[row]]
+        if self.kind == "bool":
+            return bool(self.data[row])
+        if self.kind in ("int", "float"):
+            return self.data[row].item()
+        raw = self._heap[self._offsets[row]:self._offsets[row + 1]].tobytes().decode("utf-8")
+        return json.loads(raw) if self.kind == "json" else raw
+
+    def _posting(self, key: int) -> np.ndarray:
+        # The order file is a stable sort by code, so the rows of a code are already ascending
+        return self._order[self._bounds[key]:self._bounds[key + 1]]
+
+
+class MappedPersonaStore(PersonaStore):
+    """
+    A PersonaStore over a catalog directory written by ColumnarWriter. Column files are
+    memory-mapped read-only, so opening is cheap and the pages are shared between processes.
+    """
+
+    def __init__(self, directory: str):
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported persona catalog format in {directory}: {self.manifest.get('format')}")
+        self.directory = directory
+        self._size = self.manifest["rows"]
+        self.fields = list(self.manifest["fields"])
+        self.derived_fields = list(self.manifest.get("derived_fields", []))
+        self.columns = {
+            name: MappedColumn(directory, name, spec, self._size)
+            for name, spec in self.manifest["columns"].items()
+        }
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, MANIFEST_FILE))
@@ -1,79 +1,206 @@
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple, Sequence
 import json
 from pydantic import BaseModel
 from prompts import build_employee_prompt_v1, build_employee_prompt_v2, build_employee_prompt_v3, build_employee_prompt_v4, build_employee_personality_summary_prompt, build_product_reviewer_prompt_v1, build_product_reviewer_prompt_v2, build_product_reviewer_prompt_v3, build_product_reviewer_prompt_v4, build_product_reviewer_personality_summary_prompt
 from schema import Persona, PersonaType
+from persona_store import MappedPersonaStore, PersonaStore, Predicate
+from persona_dedup import DEDUP_FIELDS, deduplicate
+import numpy as np
+import os
 import random
+import threading
 
-class PersonaManager:
-    def __init__(self, persona_type: PersonaType):
-        self._personas: Dict[str, Persona] = {}
-        self._conversation_memory: Dict[str, List[Dict[str, str]]] = {}
+DATA_SOURCES = {
+    PersonaType.INTEL_EMPLOYEE: "glassdoor.json",
+    PersonaType.INTEL_PRODUCT_REVIEWER: "product-reviews.json",
+}
+
+
+CATEGORICAL_FIELDS = ["role", "location", "employment_status", "product_category", "technical_level", "use_case", "manufacturer", "product_name"]
+# Column kinds of ingested catalogs; the remaining fields (pros, cons, themes, suggestions) are stored as JSON
+COLUMN_KINDS = {
+    **{field: "category" for field in CATEGORICAL_FIELDS},
+    **{field: "text" for field in ["id", "name", "date", "title", "advice_to_management", "summary"]},
+    **{field: "bool" for field in ["recommend", "ceo_approval", "business_outlook"]},
+    "rating": "float",
+}
+# Per-run persona state, never part of the catalog
+PERSONA_STATE_FIELDS = {"conversation_history", "personality_summary"}
+PERSONA_CATALOG_DIR = os.getenv("PERSONA_CATALOG_DIR", "persona_catalog")
+# Compile the JSON data sources into memory-mapped catalogs on first use (see persona_ingest.ensure_catalog)
+COMPILE_CATALOGS = os.getenv("PERSONA_CATALOG_COMPILE", "1") == "1"
+# Near-duplicate reviews at or above this MinHash similarity collapse into one weighted persona; 0 disables
+DEDUP_THRESHOLD = float(os.getenv("PERSONA_DEDUP_THRESHOLD", "0.8"))
+# Catalog column holding the number of reviews a persona stands for
+WEIGHT_COLUMN = "weight"
+# Ingested catalog column holding the position of each persona's review in the source file
+SOURCE_ROW_COLUMN = "source_row"
+
+
+def persona_record(persona_type: PersonaType, persona_id: str, data: Dict) -> Dict:
+    """Map a raw review of a data source to the fields of a Persona"""
+    if persona_type == PersonaType.INTEL_EMPLOYEE:
+        return {
+            "id": persona_id,
+            "name": data.get("name"),
+            "rating": data.get("rating"),
+            "date": data.get("date"),
+            "title": data.get("title"),
+            "role": data.get("role"),
+            "location": data.get("location"),
+            "recommend": data.get("recommend"),
+            "employment_status": data.get("employment_status"),
+            "pros": data.get("pros"),
+            "cons": data.get("cons"),
+            "advice_to_management": data.get("advice_to_management"),
+            "conversation_history": []
+        }
+    # INTEL_PRODUCT_REVIEWER
+    review_data = data.get("review", {})
+    product_data = data.get("product", {})
+    user_context = data.get("user_context", {})
+    return {
+        "id": persona_id,
+        "name": review_data.get("name"),
+        "rating": review_data.get("rating", {}).get("score"),
+        "date": review_data.get("publication_date"),
+        "title": review_data.get("title"),
+        "summary": review_data.get("summary"),
+        "pros": review_data.get("pros", []),
+        "cons": review_data.get("cons", []),
+        "recommend": review_data.get("recommend"),
+        "themes": review_data.get("themes", []),
+        "suggestions": review_data.get("suggestions", []),
+        "product_name": product_data.get("name"),
+        "product_category": product_data.get("category"),
+        "manufacturer": product_data.get("manufacturer"),
+        "location": product_data.get("location"),
+        "use_case": user_context.get("use_case"),
+        "technical_level": user_context.get("technical_level"),
+        "conversation_history": []
+    }
+
+
+class SourceRowIds(Sequence):
+    """
+    Persona ids of an ingested catalog. Ids are the positions of the reviews in the source file,
+    read from the (ascending) source row column, so no per-id objects are kept in memory.
+    """
+
+    def __init__(self, source_rows: np.ndarray):
+        self._source_rows = source_rows
+
+    def __len__(self) -> int:
+        return len(self._source_rows)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [str(position) for position in self._source_rows[row].tolist()]
+        return str(int(self._source_rows[row]))
+
+    def row(self, persona_id: str) -> int:
+        try:
+            position = int(persona_id)
+        except (TypeError, ValueError):
+            raise KeyError(persona_id)
+        row = int(np.searchsorted(self._source_rows, position))
+        if row >= len(self._source_rows) or self._source_rows[row] != position or str(position) != persona_id:
+            raise KeyError(persona_id)
+        return row
+
+
+class PersonaCatalog:
+    """
+    Immutable, process-wide set of personas parsed from a data source.
+
+    The JSON file is parsed and validated once per persona type and shared by every request.
+    Personas are kept in a columnar PersonaStore and materialized as Persona models on access,
+    so the catalog itself is never mutated; per-run state lives in a PersonaManager overlay.
+
+    Catalogs are memory-mapped from PERSONA_CATALOG_DIR/<persona type>: either a dataset ingested
+    with persona_ingest.py, or the JSON data source compiled there on first use. Every process
+    maps the same read-only files, so startup does no parsing and the pages are shared. Passing
+    an explicit data_source (or PERSONA_CATALOG_COMPILE=0) loads the JSON file in memory instead.
+
+    Near-duplicate reviews are collapsed into one persona (see persona_dedup.py) whose weight
+    column counts the reviews it represents.
+    """
+    _catalogs: Dict[PersonaType, "PersonaCatalog"] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, persona_type: PersonaType, data_source: str = None):
         self.persona_type = persona_type
-        self.employee_prompt_variations = [build_employee_prompt_v1, build_employee_prompt_v2, 
-                                        build_employee_prompt_v3, build_employee_prompt_v4]
-        self.product_reviewer_prompt_variations = [build_product_reviewer_prompt_v1, 
-                                                 build_product_reviewer_prompt_v2, 
-                                                 build_product_reviewer_prompt_v3, 
-                                                 build_product_reviewer_prompt_v4]
+        catalog_dir = os.path.join(PERSONA_CATALOG_DIR, persona_type.value)
+        if data_source is None and COMPILE_CATALOGS and persona_type in DATA_SOURCES:
+            from persona_ingest import ensure_catalog  # persona_ingest imports this module
+            ensure_catalog(DATA_SOURCES[persona_type], persona_type, catalog_dir, dedup_threshold=DEDUP_THRESHOLD)
+        if data_source is None and MappedPersonaStore.exists(catalog_dir):
+            self.data_source = catalog_dir
+            self.store = MappedPersonaStore(catalog_dir)
+            self.ids = SourceRowIds(self.store.columns[SOURCE_ROW_COLUMN].data)
+            self._row = self.ids.row
+            return
+        self.data_source = data_source or DATA_SOURCES.get(persona_type, "product-reviews.json")
+        records = [
+            persona.model_dump(exclude=PERSONA_STATE_FIELDS)
+            for persona in self._load_personas()
+        ]
+        weights = None
+        if DEDUP_THRESHOLD > 0 and persona_type in DEDUP_FIELDS:
+            kept, weights = deduplicate(records, DEDUP_FIELDS[persona_type], DEDUP_THRESHOLD)
+            records = [records[position] for position in kept]
+        self.store = PersonaStore(records, categorical=CATEGORICAL_FIELDS)
+        if weights is not None:
+            self.store.add_column(WEIGHT_COLUMN, "float", weights)
+        self.ids: Sequence[str] = [record["id"] for record in records]
+        self._row = {persona_id: row for row, persona_id in enumerate(self.ids)}.__getitem__
 
-        if persona_type == PersonaType.INTEL_EMPLOYEE:
-            self.data_source = "glassdoor.json"
-        else:
-            self.data_source = "product-reviews.json"
-        self._load_personas()
+    @classmethod
+    def get(cls, persona_type: PersonaType) -> "PersonaCatalog":
+        """Return the shared catalog of a persona type, loading it on first use"""
+        catalog = cls._catalogs.get(persona_type)
+        if catalog is None:
+            with cls._lock:
+                catalog = cls._catalogs.get(persona_type)
+                if catalog is None:
+                    catalog = cls(persona_type)
+                    cls._catalogs[persona_type] = catalog
+        return catalog
 
-    def _load_personas(self):
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, persona_id: str) -> Persona:
+        """Materialize a fresh Persona for a persona id. Records were validated when the catalog was loaded."""
+        record = self.store.record(self._row(persona_id))
+        return Persona.model_construct(**record, conversation_history=[])
+
+    def select(self, predicates: Sequence[Predicate] = (), limit: int = None) -> List[str]:
+        """Ids of the personas matching all predicates, in catalog order"""
+        return [self.ids[row] for row in self.store.select(predicates, limit)]
+
+    def weights(self, rows: Sequence[int]) -> np.ndarray:
+        """Number of reviews each of the given rows represents (1 for catalogs without duplicates)"""
+        if WEIGHT_COLUMN not in self.store.columns:
+            return np.ones(len(rows))
+        return np.asarray(self.store.columns[WEIGHT_COLUMN].data)[np.asarray(rows, dtype=np.int64)]
+
+    def persona_weights(self, persona_ids: Sequence[str]) -> Optional[Dict[str, float]]:
+        """Analysis weights (mean 1) of a set of personas, or None when they all represent one review"""
+        weights = self.weights([self._row(persona_id) for persona_id in persona_ids])
+        if not len(weights) or np.all(weights == weights[0]):
+            return None
+        weights = weights / weights.mean()
+        return {persona_id: round(float(weight), 6) for persona_id, weight in zip(persona_ids, weights)}
+
+    def _load_personas(self) -> List[Persona]:
         """Load personas from JSON file"""
+        personas = []
         try:
             with open(f"{self.data_source}", "r") as f:
                 personas_data = json.load(f)
                 for idx, data in enumerate(personas_data):
-                    persona_id = str(idx)
-                    
-                    if self.persona_type == PersonaType.INTEL_EMPLOYEE:
-                        persona_data = {
-                            "id": persona_id,
-                            "name": data.get("name"),
-                            "rating": data.get("rating"),
-                            "date": data.get("date"),
-                            "title": data.get("title"),
-                            "role": data.get("role"),
-                            "location": data.get("location"),
-                            "recommend": data.get("recommend"),
-                            "employment_status": data.get("employment_status"),
-                            "pros": data.get("pros"),
-                            "cons": data.get("cons"),
-                            "advice_to_management": data.get("advice_to_management"),
-                            "conversation_history": []
-                        }
-                    else:  # INTEL_PRODUCT_REVIEWER
-                        review_data = data.get("review", {})
-                        product_data = data.get("product", {})
-                        user_context = data.get("user_context", {})
-                        
-                        persona_data = {
-                            "id": persona_id,
-                            "name": review_data.get("name"),
-                            "rating": review_data.get("rating", {}).get("score"),
-                            "date": review_data.get("publication_date"),
-                            "title": review_data.get("title"),
-                            "summary": review_data.get("summary"),
-                            "pros": review_data.get("pros", []),
-                            "cons": review_data.get("cons", []),
-                            "recommend": review_data.get("recommend"),
-                            "themes": review_data.get("themes", []),
-                            "suggestions": review_data.get("suggestions", []),
-                            "product_name": product_data.get("name"),
-                            "product_category": product_data.get("category"),
-                            "manufacturer": product_data.get("manufacturer"),
-                            "location": product_data.get("location"),
-                            "use_case": user_context.get("use_case"),
-                            "technical_level": user_context.get("technical_level"),
-                            "conversation_history": []
-                        }
-
-                    self._personas[persona_id] = Persona(**persona_data)
+                    personas.append(Persona(**persona_record(self.persona_type, str(idx), data)))
 
         except FileNotFoundError:
             raise Exception(f"Personas data file {self.data_source} not found")
@@ -83,27 +210,79 @@ class PersonaManager:
             print(f"Error loading persona: {e}")  # Debug print
             print(f"Error traceback: {error_trace}")
             raise
+        return personas
+
+
+class PersonaManager:
+    """
+    Per-run view of a PersonaCatalog. Personas are shared with the catalog until a run changes
+    their conversation history or personality summary; only then is a private copy made, so the
+    setup cost and memory of a run grow with the personas it touches.
+    """
+
+    def __init__(self, persona_type: PersonaType, catalog: PersonaCatalog = None):
+        self._catalog = catalog or PersonaCatalog.get(persona_type)
+        self._overlay: Dict[str, Persona] = {}
+        self.persona_type = persona_type
+        self.data_source = self._catalog.data_source
+        self.employee_prompt_variations = [build_employee_prompt_v1, build_employee_prompt_v2, 
+                                        build_employee_prompt_v3, build_employee_prompt_v4]
+        self.product_reviewer_prompt_variations = [build_product_reviewer_prompt_v1, 
+                                                 build_product_reviewer_prompt_v2, 
+                                                 build_product_reviewer_prompt_v3, 
+                                                 build_product_reviewer_prompt_v4]
+
+    def _writable_persona(self, persona_id: str) -> Persona:
+        """Return this run's own copy of a persona, taking it from the catalog on first write"""
+        persona = self._overlay.get(persona_id)
+        if persona is None:
+            persona = self._catalog[persona_id]
+            self._overlay[persona_id] = persona
+        return persona
+
+    @property
+    def catalog(self) -> PersonaCatalog:
+        return self._catalog
+
+    def persona_count(self) -> int:
+        return len(self._catalog)
 
     def get_all_personas(self) -> List[Persona]:
         """Return all personas"""
-        return list(self._personas.values())
+        return [self.get_persona(persona_id) for persona_id in self._catalog.ids]
+
+    def select_personas(self, predicates: Sequence[Predicate] = (), limit: int = None) -> List[Persona]:
+        """Return the personas matching all predicates (field, operator, value), in catalog order"""
+        return [self.get_persona(persona_id) for persona_id in self._catalog.select(predicates, limit)]
 
     def get_persona(self, persona_id: str) -> Persona:
         """Get a specific persona"""
-        return self._personas[persona_id]
+        return self._overlay.get(persona_id) or self._catalog[persona_id]
+
+    def restore_persona_state(self, persona_id: str, personality_summary: str, conversation_history: List[Dict[str, str]]):
+        """Restore the conversation state of a persona saved by an earlier survey run"""
+        try:
+            persona = self._writable_persona(persona_id)
+        except KeyError:
+            return
+        persona.personality_summary = personality_summary
+        persona.conversation_history = list(conversation_history)
 
     def update_conversation_history(self, persona_id: str, question: str, distribution: Dict[str, float]):
         """Update persona's conversation history"""
-        persona = self._personas[persona_id]
+        persona = self._writable_persona(persona_id)
         summary = self._create_response_summary(question, distribution)
+        max_option = max(distribution.items(), key=lambda x: x[1])
         persona.conversation_history.append({
             "question": question,
-            "summary": summary
+            "summary": summary,
+            "option": max_option[0],
+            "probability": f"{max_option[1]:.2f}"
         })
 
     def update_personality_summary(self, persona_id: str, personality_summary: str):
         """Update persona's personality summary"""
-        persona = self._personas[persona_id]
+        persona = self._writable_persona(persona_id)
         persona.personality_summary = personality_summary
 
     def _create_response_summary(self, question: str, distribution: Dict[str, float]) -> str:
@@ -123,7 +302,7 @@ class PersonaManager:
 
     def build_prompt(self, persona_id: str, question: str, options: List[str]) -> Tuple[str, Dict]:
         """Build a prompt for the LLM including persona context and conversation history"""
-        persona = self._personas[persona_id]
+        persona = self.get_persona(persona_id)
         if self.persona_type == PersonaType.INTEL_EMPLOYEE:
             prompt, prompt_schema = self._build_employee_prompt(persona, question, options)
         elif self.persona_type == PersonaType.INTEL_PRODUCT_REVIEWER:
@@ -135,7 +314,7 @@ class PersonaManager:
 
     def get_personality_summary_prompt(self, persona_id: str) -> str:
         """Get a summary of the personality of a persona"""
-        persona = self._personas[persona_id]
+        persona = self.get_persona(persona_id)
         if self.persona_type == PersonaType.INTEL_EMPLOYEE:
             prompt = build_employee_personality_summary_prompt(persona)
         elif self.persona_type == PersonaType.INTEL_PRODUCT_REVIEWER:
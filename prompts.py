@@ -1,73 +1,37 @@
+"""
+Survey response prompts.
+
+Each prompt variant is a PromptTemplate compiled into two parts. The static part (task, persona
+profile and response format) only depends on the catalog fields of a persona, so it is rendered
+once per (persona, variant) and cached. At request time only the conversation history (compacted
+to a token budget, see persona_history.py), the question and its options are appended. Keeping
+the static part first gives every prompt of a persona a stable prefix, which the provider's
+automatic prompt caching can reuse across temperatures and questions. The JSON schemas are shared
+constants.
+"""
+
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Tuple
+from persona_history import compact_history
 from schema import Persona
-from typing import List, Dict, Tuple
-from pydantic import BaseModel, Field
 
-def build_employee_prompt_v1(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
-    """Generate a survey simulation prompt for an employee profile."""
-    prompt = f"""You are a company survey response predictor. 
-    Your task is to estimate realistic probability distributions for how an employee with the following profile might respond, acknowledging that even predictable employees can vary their responses due to recent events or changes in mood.
-
-    Employee profile:
-    - Job role: {persona.role} based in {persona.location}
-    - Employment details: {persona.employment_status}
-    - Positive aspects of their role: {persona.pros}
-    - Challenges or negatives of their role: {persona.cons}
-    - Company rating: {persona.rating}/5
-    - Overall attitude: {'Likely to recommend' if persona.recommend else 'Unlikely to recommend'}, {'Approves of CEO' if persona.ceo_approval else 'unlikely to approve of CEO'}, {'Optimistic' if persona.business_outlook else 'pessimistic'} outlook on company performance
-    - Core concerns: {persona.advice_to_management}
-
-    Context from previous interactions:
-    """
-    if persona.conversation_history:
-        prompt += "The individual has previously answered the following questions:\n"
-        for hist in persona.conversation_history:
-            prompt += f"- {hist['summary']}\n"
-
-    prompt += f"""
-    Based on this information, predict the probability distribution for how this employee would answer the question: "{question}"
+PROMPT_PREFIX_CACHE_SIZE = int(os.getenv("PROMPT_PREFIX_CACHE_SIZE", "4096"))
 
-    Account for:
-    - Variations in daily experiences and emotions
-    - Their earlier feedback and attitudes
-    - How frustrations and benefits might influence their response
-    - Patterns reflected in their sentiment and ratings
-
-    Provide probabilities for each response option, ensuring they sum to 1:
-    """
-    for i, opt in enumerate(options, 1):
-        prompt += f"        {i}. {opt}\n"
-
-    prompt += """
-    Return your response in this JSON format:
-    {
-        "relevant": boolean (true if the question is related to the profile, false otherwise),
-        "option": [
-            {
-                "option": "option1",
-                "probability": probability
-            },
-            {
-                "option": "option2",
-                "probability": probability
-            },
-            ...
-        ],
-        "reason": "Detailed reasoning for the assigned probabilities based on the persona"
-    }
-    
-    If the question is unrelated to the employee's experience, set "relevant": false and leave other fields as empty strings.
-    """
 
-    schema = {
-        "name": "employee_response_v1",
-        "description": "Simulated employee survey response with probability distribution using an array of option-probability objects.",
+def _response_schema(name: str, description: str, subject: str) -> Dict[str, Any]:
+    """JSON schema of a simulated survey response"""
+    return {
+        "name": name,
+        "description": description,
         "strict": True,
         "schema": {
             "type": "object",
             "properties": {
                 "relevant": {
                     "type": "boolean",
-                    "description": "True if the question relates to the employee's experience, false otherwise."
+                    "description": f"True if the question relates to the {subject}'s experience, false otherwise."
                 },
                 "option": {
                     "type": "array",
@@ -98,12 +62,131 @@ def build_employee_prompt_v1(persona: Persona, question: str, options: List[str]
         }
     }
 
-    # Return the prompt and the schema
-    return prompt, schema
 
-def build_employee_prompt_v2(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
-    """Create a tailored prompt to simulate employee survey responses."""
-    prompt = f"""You are an AI model tasked with simulating employee survey responses. 
+EMPLOYEE_RESPONSE_DESCRIPTION = "Simulated employee survey response with probability distribution using an array of option-probability objects."
+PRODUCT_REVIEWER_RESPONSE_DESCRIPTION = "Simulated product reviewer survey response with probability distribution using an array of option-probability objects."
+
+EMPLOYEE_RESPONSE_SCHEMAS = {
+    version: _response_schema(f"employee_response_v{version}", EMPLOYEE_RESPONSE_DESCRIPTION, "employee")
+    for version in range(1, 5)
+}
+PRODUCT_REVIEWER_RESPONSE_SCHEMAS = {
+    version: _response_schema(f"product_reviewer_response_v{version}", PRODUCT_REVIEWER_RESPONSE_DESCRIPTION, "customer")
+    for version in range(1, 5)
+}
+
+_prefix_cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+_prefix_stats = {"hits": 0, "misses": 0}
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    A prompt variant. profile renders the task and persona profile, response_format is the
+    static output instructions, question is formatted with the question text.
+    """
+    name: str
+    profile: Callable[[Persona], str]
+    response_format: str
+    history_label: str
+    history_intro: str
+    question: str
+    schema: Dict[str, Any]
+
+    def static_section(self, persona: Persona) -> str:
+        """The persona-specific but survey-independent start of the prompt, rendered once per persona"""
+        key = (self.name, persona.id)
+        prefix = _prefix_cache.get(key)
+        if prefix is not None:
+            _prefix_cache.move_to_end(key)
+            _prefix_stats["hits"] += 1
+            return prefix
+        _prefix_stats["misses"] += 1
+        prefix = self.profile(persona) + self.response_format
+        _prefix_cache[key] = prefix
+        if len(_prefix_cache) > PROMPT_PREFIX_CACHE_SIZE:
+            _prefix_cache.popitem(last=False)
+        return prefix
+
+    def render(self, persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
+        prompt = self.static_section(persona) + f"\n    {self.history_label}\n    "
+        history = compact_history(persona.conversation_history)
+        if history:
+            prompt += self.history_intro
+            for line in history:
+                prompt += f"- {line}\n"
+        prompt += self.question.format(question=question)
+        for i, opt in enumerate(options, 1):
+            prompt += f"        {i}. {opt}\n"
+        return prompt, self.schema
+
+
+def prefix_cache_stats() -> Dict[str, int]:
+    return {**_prefix_stats, "size": len(_prefix_cache)}
+
+
+def _employee_profile_v1(persona: Persona) -> str:
+    return f"""You are a company survey response predictor. 
+    Your task is to estimate realistic probability distributions for how an employee with the following profile might respond, acknowledging that even predictable employees can vary their responses due to recent events or changes in mood.
+
+    Employee profile:
+    - Job role: {persona.role} based in {persona.location}
+    - Employment details: {persona.employment_status}
+    - Positive aspects of their role: {persona.pros}
+    - Challenges or negatives of their role: {persona.cons}
+    - Company rating: {persona.rating}/5
+    - Overall attitude: {'Likely to recommend' if persona.recommend else 'Unlikely to recommend'}, {'Approves of CEO' if persona.ceo_approval else 'unlikely to approve of CEO'}, {'Optimistic' if persona.business_outlook else 'pessimistic'} outlook on company performance
+    - Core concerns: {persona.advice_to_management}
+    """
+
+
+EMPLOYEE_PROMPT_V1 = PromptTemplate(
+    name="employee_v1",
+    profile=_employee_profile_v1,
+    response_format="""
+    Return your response in this JSON format:
+    {
+        "relevant": boolean (true if the question is related to the profile, false otherwise),
+        "option": [
+            {
+                "option": "option1",
+                "probability": probability
+            },
+            {
+                "option": "option2",
+                "probability": probability
+            },
+            ...
+        ],
+        "reason": "Detailed reasoning for the assigned probabilities based on the persona"
+    }
+    
+    If the question is unrelated to the employee's experience, set "relevant": false and leave other fields as empty strings.
+    """,
+    history_label="Context from previous interactions:",
+    history_intro="The individual has previously answered the following questions:\n",
+    question="""
+    Based on this information, predict the probability distribution for how this employee would answer the question: "{question}"
+
+    Account for:
+    - Variations in daily experiences and emotions
+    - Their earlier feedback and attitudes
+    - How frustrations and benefits might influence their response
+    - Patterns reflected in their sentiment and ratings
+
+    Provide probabilities for each response option, ensuring they sum to 1:
+    """,
+    schema=EMPLOYEE_RESPONSE_SCHEMAS[1]
+)
+
+
+def build_employee_prompt_v1(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
+    """Generate a survey simulation prompt for an employee profile."""
+    return EMPLOYEE_PROMPT_V1.render(persona, question, options)
+
+
+def _employee_profile_v2(persona: Persona) -> str:
+    return f"""You are an AI model tasked with simulating employee survey responses. 
     Your objective is to generate probability distributions for each option based on the following employee's profile, recognizing that responses may vary depending on recent experiences or emotions.
 
     Employee details:
@@ -114,15 +197,25 @@ def build_employee_prompt_v2(persona: Persona, question: str, options: List[str]
     - Company rating: {persona.rating}/5
     - Sentiment summary: {'Recommends' if persona.recommend else 'Does not recommend'}, {'Approves of CEO' if persona.ceo_approval else 'does not approve of CEO'}, {'Positive' if persona.business_outlook else 'poor'} business outlook
     - Major concerns or feedback: {persona.advice_to_management}
-
-    Previous survey responses:
     """
-    if persona.conversation_history:
-        prompt += "The employee has previously responded as follows:\n"
-        for hist in persona.conversation_history:
-            prompt += f"- {hist['summary']}\n"
 
-    prompt += f"""
+
+EMPLOYEE_PROMPT_V2 = PromptTemplate(
+    name="employee_v2",
+    profile=_employee_profile_v2,
+    response_format="""
+    Provide a response in the following JSON format:
+    {
+        "relevant": boolean (true if the question aligns with their profile, false otherwise),
+        "option": {option1: probability, option2: probability, ...},
+        "reason": "A clear explanation of how the persona's profile informed the distribution"
+    }
+    
+    If the question does not align with the persona, set "relevant": false and leave the other fields blank.
+    """,
+    history_label="Previous survey responses:",
+    history_intro="The employee has previously responded as follows:\n",
+    question="""
     Given this context, simulate the probability distribution for their answer to the question: "{question}"
 
     Consider the following factors:
@@ -132,67 +225,18 @@ def build_employee_prompt_v2(persona: Persona, question: str, options: List[str]
     - General tendencies based on their sentiment and ratings
 
     List probabilities for each option below, ensuring they total 1:
-    """
-    for i, opt in enumerate(options, 1):
-        prompt += f"        {i}. {opt}\n"
+    """,
+    schema=EMPLOYEE_RESPONSE_SCHEMAS[2]
+)
 
-    prompt += """
-    Provide a response in the following JSON format:
-    {
-        "relevant": boolean (true if the question aligns with their profile, false otherwise),
-        "option": {option1: probability, option2: probability, ...},
-        "reason": "A clear explanation of how the persona's profile informed the distribution"
-    }
-    
-    If the question does not align with the persona, set "relevant": false and leave the other fields blank.
-    """
 
-    schema = {
-        "name": "employee_response_v2",
-        "description": "Simulated employee survey response with probability distribution using an array of option-probability objects.",
-        "strict": True,
-        "schema": {
-            "type": "object",
-            "properties": {
-                "relevant": {
-                    "type": "boolean",
-                    "description": "True if the question relates to the employee's experience, false otherwise."
-                },
-                "option": {
-                    "type": "array",
-                    "description": "An array of objects, each representing a response option and its probability.",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "option": {
-                                "type": "string",
-                                "description": "The text of the response option."
-                            },
-                            "probability": {
-                                "type": "number",
-                                "description": "The probability assigned to this option."
-                            }
-                        },
-                        "required": ["option", "probability"],
-                        "additionalProperties": False
-                    }
-                },
-                "reason": {
-                    "type": "string",
-                    "description": "A detailed explanation of how the probability distribution was determined."
-                }
-            },
-            "required": ["relevant", "option", "reason"],
-            "additionalProperties": False
-        }
-    }
+def build_employee_prompt_v2(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
+    """Create a tailored prompt to simulate employee survey responses."""
+    return EMPLOYEE_PROMPT_V2.render(persona, question, options)
 
-    # Return the prompt and the schema
-    return prompt, schema
 
-def build_employee_prompt_v3(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
-    """Generate a probability-based survey response prediction prompt."""
-    prompt = f"""You are a simulation model for employee surveys. 
+def _employee_profile_v3(persona: Persona) -> str:
+    return f"""You are a simulation model for employee surveys. 
     Your role is to predict the probability distribution of responses an employee might give, considering the nuances of their profile and the potential for variation influenced by recent experiences or emotional states.
 
     Employee profile summary:
@@ -203,15 +247,25 @@ def build_employee_prompt_v3(persona: Persona, question: str, options: List[str]
     - Overall company rating: {persona.rating}/5
     - Sentiment analysis: {'Likely to recommend' if persona.recommend else 'Not likely to recommend'}, {'Positive CEO approval' if persona.ceo_approval else 'negative CEO approval'}, {'Positive business outlook' if persona.business_outlook else 'poor business outlook'}
     - Primary concerns: {persona.advice_to_management}
-
-    Historical responses:
     """
-    if persona.conversation_history:
-        prompt += "The following context is derived from their earlier responses:\n"
-        for hist in persona.conversation_history:
-            prompt += f"- {hist['summary']}\n"
 
-    prompt += f"""
+
+EMPLOYEE_PROMPT_V3 = PromptTemplate(
+    name="employee_v3",
+    profile=_employee_profile_v3,
+    response_format="""
+    Deliver your output as a JSON object with the following structure:
+    {
+        "relevant": boolean (true if the question applies to the persona, false otherwise),
+        "option": {option1: probability, option2: probability, ...},
+        "reason": "Explanation of the assigned probabilities based on the persona's attributes"
+    }
+    
+    If the question is irrelevant, set "relevant": false and leave the other fields blank.
+    """,
+    history_label="Historical responses:",
+    history_intro="The following context is derived from their earlier responses:\n",
+    question="""
     Based on the above, estimate the likelihood of their response to the question: "{question}"
 
     Take into account:
@@ -221,67 +275,18 @@ def build_employee_prompt_v3(persona: Persona, question: str, options: List[str]
     - Their typical rating and sentiment trends
 
     Specify the probabilities for each option, ensuring the total equals 1:
-    """
-    for i, opt in enumerate(options, 1):
-        prompt += f"        {i}. {opt}\n"
+    """,
+    schema=EMPLOYEE_RESPONSE_SCHEMAS[3]
+)
 
-    prompt += """
-    Deliver your output as a JSON object with the following structure:
-    {
-        "relevant": boolean (true if the question applies to the persona, false otherwise),
-        "option": {option1: probability, option2: probability, ...},
-        "reason": "Explanation of the assigned probabilities based on the persona's attributes"
-    }
-    
-    If the question is irrelevant, set "relevant": false and leave the other fields blank.
-    """
 
-    schema = {
-        "name": "employee_response_v3",
-        "description": "Simulated employee survey response with probability distribution using an array of option-probability objects.",
-        "strict": True,
-        "schema": {
-            "type": "object",
-            "properties": {
-                "relevant": {
-                    "type": "boolean",
-                    "description": "True if the question relates to the employee's experience, false otherwise."
-                },
-                "option": {
-                    "type": "array",
-                    "description": "An array of objects, each representing a response option and its probability.",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "option": {
-                                "type": "string",
-                                "description": "The text of the response option."
-                            },
-                            "probability": {
-                                "type": "number",
-                                "description": "The probability assigned to this option."
-                            }
-                        },
-                        "required": ["option", "probability"],
-                        "additionalProperties": False
-                    }
-                },
-                "reason": {
-                    "type": "string",
-                    "description": "A detailed explanation of how the probability distribution was determined."
-                }
-            },
-            "required": ["relevant", "option", "reason"],
-            "additionalProperties": False
-        }
-    }
+def build_employee_prompt_v3(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
+    """Generate a probability-based survey response prediction prompt."""
+    return EMPLOYEE_PROMPT_V3.render(persona, question, options)
 
-    # Return the prompt and the schema
-    return prompt, schema
 
-def build_employee_prompt_v4(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
-    """Build a prompt of employee for the LLM including persona context and conversation history"""
-    prompt = f"""You are a survey response simulator for company surveys. 
+def _employee_profile_v4(persona: Persona) -> str:
+    return f"""You are a survey response simulator for company surveys. 
     Your task is to generate realistic probability distributions for how an employee with this profile would respond, considering that even consistent employees might occasionally give different responses depending on their recent experiences and mood.
 
     Consider the following employee profile:
@@ -292,85 +297,46 @@ def build_employee_prompt_v4(persona: Persona, question: str, options: List[str]
     - Rating of the company: {persona.rating}/5
     - Overall sentiment: {'' if persona.recommend else 'Does not recommend'}, {'' if persona.ceo_approval else 'does not approve of CEO'}, {'' if persona.business_outlook else 'negative'} business outlook
     - Key concerns: {persona.advice_to_management}
-
-    Previous conversation context:
     """
-    if persona.conversation_history:
-        prompt += "The person responded to the following questions with following answers:\n"
-        for hist in persona.conversation_history:
-            prompt += f"- {hist['summary']}\n"
 
-    prompt += f"""
-    Based on this profile, simulate the probability distribution for how this employee would respond to: "{question}"
 
-    Consider:
-    - Day-to-day variations in mood and experiences
-    - Recent interactions reflected in their review
-    - Impact of mentioned frustrations and positive points
-    - Overall sentiment and rating tendency
-    
-    Provide probabilities for each option, ensuring they sum to 1:
-    """
-    for i, opt in enumerate(options, 1):
-        prompt += f"        {i}. {opt}\n"
-
-    prompt += """
+EMPLOYEE_PROMPT_V4 = PromptTemplate(
+    name="employee_v4",
+    profile=_employee_profile_v4,
+    response_format="""
     Return a JSON object with:
     {
         "relevant": boolean (true if question relates to their experience, false otherwise),
         "option": {option1: probability, option2: probability, ...},
         "reason": "Detailed explanation of why this distribution makes sense for this persona"
     }
-    
-    If the question is not relevant to the persona's experience, set "relevant": false and leave other fields as empty strings.
-    """
-
-    schema = {
-        "name": "employee_response_v4",
-        "description": "Simulated employee survey response with probability distribution using an array of option-probability objects.",
-        "strict": True,
-        "schema": {
-            "type": "object",
-            "properties": {
-                "relevant": {
-                    "type": "boolean",
-                    "description": "True if the question relates to the employee's experience, false otherwise."
-                },
-                "option": {
-                    "type": "array",
-                    "description": "An array of objects, each representing a response option and its probability.",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "option": {
-                                "type": "string",
-                                "description": "The text of the response option."
-                            },
-                            "probability": {
-                                "type": "number",
-                                "description": "The probability assigned to this option."
-                            }
-                        },
-                        "required": ["option", "probability"],
-                        "additionalProperties": False
-                    }
-                },
-                "reason": {
-                    "type": "string",
-                    "description": "A detailed explanation of how the probability distribution was determined."
-                }
-            },
-            "required": ["relevant", "option", "reason"],
-            "additionalProperties": False
-        }
-    }
+    
+    If the question is not relevant to the persona's experience, set "relevant": false and leave other fields as empty strings.
+    """,
+    history_label="Previous conversation context:",
+    history_intro="The person responded to the following questions with following answers:\n",
+    question="""
+    Based on this profile, simulate the probability distribution for how this employee would respond to: "{question}"
+
+    Consider:
+    - Day-to-day variations in mood and experiences
+    - Recent interactions reflected in their review
+    - Impact of mentioned frustrations and positive points
+    - Overall sentiment and rating tendency
+    
+    Provide probabilities for each option, ensuring they sum to 1:
+    """,
+    schema=EMPLOYEE_RESPONSE_SCHEMAS[4]
+)
 
-    # Return the prompt and the schema
-    return prompt, schema
 
-def build_product_reviewer_prompt_v1(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
-    """Generate a survey simulation prompt for a product reviewer profile."""
-    prompt = f"""You are a product survey response predictor. 
+def build_employee_prompt_v4(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
+    """Build a prompt of employee for the LLM including persona context and conversation history"""
+    return EMPLOYEE_PROMPT_V4.render(persona, question, options)
+
+
+def _product_reviewer_profile_v1(persona: Persona) -> str:
+    return f"""You are a product survey response predictor. 
     Your task is to estimate realistic probability distributions for how a customer with the following profile might respond, acknowledging that even satisfied customers can vary their responses based on recent experiences and product usage.
 
     Customer profile:
@@ -384,15 +350,25 @@ def build_product_reviewer_prompt_v1(persona: Persona, question: str, options: L
     - Overall attitude: {'Recommends product' if persona.recommend else 'Does not recommend product'}
     - Usage context: {persona.use_case}
     - Technical expertise: {persona.technical_level}
-
-    Context from previous interactions:
     """
-    if persona.conversation_history:
-        prompt += "The customer has previously answered the following questions:\n"
-        for hist in persona.conversation_history:
-            prompt += f"- {hist['summary']}\n"
 
-    prompt += f"""
+
+PRODUCT_REVIEWER_PROMPT_V1 = PromptTemplate(
+    name="product_reviewer_v1",
+    profile=_product_reviewer_profile_v1,
+    response_format="""
+    Return your response in this JSON format:
+    {
+        "relevant": boolean (true if the question relates to their experience, false otherwise),
+        "option": {option1: probability, option2: probability, ...},
+        "reason": "Detailed reasoning for the assigned probabilities based on the persona"
+    }
+    
+    If the question is unrelated to the customer's experience, set "relevant": false and leave other fields as empty strings.
+    """,
+    history_label="Context from previous interactions:",
+    history_intro="The customer has previously answered the following questions:\n",
+    question="""
     Based on this information, predict the probability distribution for how this customer would answer the question: "{question}"
 
     Account for:
@@ -402,67 +378,18 @@ def build_product_reviewer_prompt_v1(persona: Persona, question: str, options: L
     - Pattern of likes and dislikes
 
     Provide probabilities for each response option, ensuring they sum to 1:
-    """
-    for i, opt in enumerate(options, 1):
-        prompt += f"        {i}. {opt}\n"
+    """,
+    schema=PRODUCT_REVIEWER_RESPONSE_SCHEMAS[1]
+)
 
-    prompt += """
-    Return your response in this JSON format:
-    {
-        "relevant": boolean (true if the question relates to their experience, false otherwise),
-        "option": {option1: probability, option2: probability, ...},
-        "reason": "Detailed reasoning for the assigned probabilities based on the persona"
-    }
-    
-    If the question is unrelated to the customer's experience, set "relevant": false and leave other fields as empty strings.
-    """
 
-    schema = {
-        "name": "product_reviewer_response_v1",
-        "description": "Simulated product reviewer survey response with probability distribution using an array of option-probability objects.",
-        "strict": True,
-        "schema": {
-            "type": "object",
-            "properties": {
-                "relevant": {
-                    "type": "boolean",
-                    "description": "True if the question relates to the customer's experience, false otherwise."
-                },
-                "option": {
-                    "type": "array",
-                    "description": "An array of objects, each representing a response option and its probability.",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "option": {
-                                "type": "string",
-                                "description": "The text of the response option."
-                            },
-                            "probability": {
-                                "type": "number",
-                                "description": "The probability assigned to this option."
-                            }
-                        },
-                        "required": ["option", "probability"],
-                        "additionalProperties": False
-                    }
-                },
-                "reason": {
-                    "type": "string",
-                    "description": "A detailed explanation of how the probability distribution was determined."
-                }
-            },
-            "required": ["relevant", "option", "reason"],
-            "additionalProperties": False
-        }
-    }
+def build_product_reviewer_prompt_v1(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
+    """Generate a survey simulation prompt for a product reviewer profile."""
+    return PRODUCT_REVIEWER_PROMPT_V1.render(persona, question, options)
 
-    # Return the prompt and the schema
-    return prompt, schema
 
-def build_product_reviewer_prompt_v2(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
-    """Create a tailored prompt to simulate product reviewer survey responses."""
-    prompt = f"""You are an AI model tasked with simulating product review survey responses. 
+def _product_reviewer_profile_v2(persona: Persona) -> str:
+    return f"""You are an AI model tasked with simulating product review survey responses. 
     Your objective is to generate probability distributions for each option based on the following customer's profile, recognizing that responses may vary depending on usage patterns and experiences.
 
     Product review details:
@@ -476,15 +403,25 @@ def build_product_reviewer_prompt_v2(persona: Persona, question: str, options: L
     - Recommendations: {', '.join(persona.suggestions) if persona.suggestions else 'None provided'}
     - Usage scenario: {persona.use_case}
     - Technical background: {persona.technical_level}
-
-    Previous survey responses:
     """
-    if persona.conversation_history:
-        prompt += "The customer has previously responded as follows:\n"
-        for hist in persona.conversation_history:
-            prompt += f"- {hist['summary']}\n"
 
-    prompt += f"""
+
+PRODUCT_REVIEWER_PROMPT_V2 = PromptTemplate(
+    name="product_reviewer_v2",
+    profile=_product_reviewer_profile_v2,
+    response_format="""
+    Provide a response in the following JSON format:
+    {
+        "relevant": boolean (true if the question aligns with their experience, false otherwise),
+        "option": {option1: probability, option2: probability, ...},
+        "reason": "A clear explanation of how the reviewer's profile informed the distribution"
+    }
+    
+    If the question doesn't align with the reviewer's experience, set "relevant": false and leave other fields blank.
+    """,
+    history_label="Previous survey responses:",
+    history_intro="The customer has previously responded as follows:\n",
+    question="""
     Given this context, simulate the probability distribution for their answer to: "{question}"
 
     Consider these factors:
@@ -494,67 +431,18 @@ def build_product_reviewer_prompt_v2(persona: Persona, question: str, options: L
     - Use case requirements and expectations
 
     List probabilities for each option below, ensuring they total 1:
-    """
-    for i, opt in enumerate(options, 1):
-        prompt += f"        {i}. {opt}\n"
+    """,
+    schema=PRODUCT_REVIEWER_RESPONSE_SCHEMAS[2]
+)
 
-    prompt += """
-    Provide a response in the following JSON format:
-    {
-        "relevant": boolean (true if the question aligns with their experience, false otherwise),
-        "option": {option1: probability, option2: probability, ...},
-        "reason": "A clear explanation of how the reviewer's profile informed the distribution"
-    }
-    
-    If the question doesn't align with the reviewer's experience, set "relevant": false and leave other fields blank.
-    """
 
-    schema = {
-        "name": "product_reviewer_response_v2",
-        "description": "Simulated product reviewer survey response with probability distribution using an array of option-probability objects.",
-        "strict": True,
-        "schema": {
-            "type": "object",
-            "properties": {
-                "relevant": {
-                    "type": "boolean",
-                    "description": "True if the question relates to the customer's experience, false otherwise."
-                },
-                "option": {
-                    "type": "array",
-                    "description": "An array of objects, each representing a response option and its probability.",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "option": {
-                                "type": "string",
-                                "description": "The text of the response option."
-                            },
-                            "probability": {
-                                "type": "number",
-                                "description": "The probability assigned to this option."
-                            }
-                        },
-                        "required": ["option", "probability"],
-                        "additionalProperties": False
-                    }
-                },
-                "reason": {
-                    "type": "string",
-                    "description": "A detailed explanation of how the probability distribution was determined."
-                }
-            },
-            "required": ["relevant", "option", "reason"],
-            "additionalProperties": False
-        }
-    }
+def build_product_reviewer_prompt_v2(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
+    """Create a tailored prompt to simulate product reviewer survey responses."""
+    return PRODUCT_REVIEWER_PROMPT_V2.render(persona, question, options)
 
-    # Return the prompt and the schema
-    return prompt, schema
 
-def build_product_reviewer_prompt_v3(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
-    """Generate a probability-based survey response prediction prompt for product reviews."""
-    prompt = f"""You are a simulation model for product review surveys. 
+def _product_reviewer_profile_v3(persona: Persona) -> str:
+    return f"""You are a simulation model for product review surveys. 
     Your role is to predict the probability distribution of responses a customer might give, considering their experience with the product and their technical background.
 
     Review profile:
@@ -566,15 +454,25 @@ def build_product_reviewer_prompt_v3(persona: Persona, question: str, options: L
     - Highlighted features: {', '.join(persona.pros) if isinstance(persona.pros, list) else persona.pros}
     - Reported issues: {', '.join(persona.cons) if isinstance(persona.cons, list) else persona.cons}
     - Key themes identified: {', '.join(persona.themes) if persona.themes else 'None specified'}
-
-    Previous interactions:
     """
-    if persona.conversation_history:
-        prompt += "Context from earlier responses:\n"
-        for hist in persona.conversation_history:
-            prompt += f"- {hist['summary']}\n"
 
-    prompt += f"""
+
+PRODUCT_REVIEWER_PROMPT_V3 = PromptTemplate(
+    name="product_reviewer_v3",
+    profile=_product_reviewer_profile_v3,
+    response_format="""
+    Deliver your output as a JSON object with the following structure:
+    {
+        "relevant": boolean (true if the question applies to their experience, false otherwise),
+        "option": {option1: probability, option2: probability, ...},
+        "reason": "Explanation of the probability distribution based on the reviewer's profile"
+    }
+    
+    If the question is irrelevant, set "relevant": false and leave other fields blank.
+    """,
+    history_label="Previous interactions:",
+    history_intro="Context from earlier responses:\n",
+    question="""
     Based on the above, estimate the likelihood of their response to: "{question}"
 
     Consider:
@@ -584,67 +482,18 @@ def build_product_reviewer_prompt_v3(persona: Persona, question: str, options: L
     - Overall sentiment patterns
 
     Specify probabilities for each option, ensuring the total equals 1:
-    """
-    for i, opt in enumerate(options, 1):
-        prompt += f"        {i}. {opt}\n"
+    """,
+    schema=PRODUCT_REVIEWER_RESPONSE_SCHEMAS[3]
+)
 
-    prompt += """
-    Deliver your output as a JSON object with the following structure:
-    {
-        "relevant": boolean (true if the question applies to their experience, false otherwise),
-        "option": {option1: probability, option2: probability, ...},
-        "reason": "Explanation of the probability distribution based on the reviewer's profile"
-    }
-    
-    If the question is irrelevant, set "relevant": false and leave other fields blank.
-    """
 
-    schema = {
-        "name": "product_reviewer_response_v3",
-        "description": "Simulated product reviewer survey response with probability distribution using an array of option-probability objects.",
-        "strict": True,
-        "schema": {
-            "type": "object",
-            "properties": {
-                "relevant": {
-                    "type": "boolean",
-                    "description": "True if the question relates to the customer's experience, false otherwise."
-                },
-                "option": {
-                    "type": "array",
-                    "description": "An array of objects, each representing a response option and its probability.",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "option": {
-                                "type": "string",
-                                "description": "The text of the response option."
-                            },
-                            "probability": {
-                                "type": "number",
-                                "description": "The probability assigned to this option."
-                            }
-                        },
-                        "required": ["option", "probability"],
-                        "additionalProperties": False
-                    }
-                },
-                "reason": {
-                    "type": "string",
-                    "description": "A detailed explanation of how the probability distribution was determined."
-                }
-            },
-            "required": ["relevant", "option", "reason"],
-            "additionalProperties": False
-        }
-    }
+def build_product_reviewer_prompt_v3(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
+    """Generate a probability-based survey response prediction prompt for product reviews."""
+    return PRODUCT_REVIEWER_PROMPT_V3.render(persona, question, options)
 
-    # Return the prompt and the schema
-    return prompt, schema
 
-def build_product_reviewer_prompt_v4(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
-    """Build a comprehensive prompt for product review survey simulation"""
-    prompt = f"""You are a survey response simulator for product reviews. 
+def _product_reviewer_profile_v4(persona: Persona) -> str:
+    return f"""You are a survey response simulator for product reviews. 
     Your task is to generate realistic probability distributions for how a customer with this profile would respond, considering their product experience and technical background.
 
     Customer and product profile:
@@ -656,15 +505,25 @@ def build_product_reviewer_prompt_v4(persona: Persona, question: str, options: L
     - Technical proficiency: {persona.technical_level}
     - Main themes: {', '.join(persona.themes) if persona.themes else 'None specified'}
     - Suggested improvements: {', '.join(persona.suggestions) if persona.suggestions else 'None provided'}
-
-    Previous response history:
     """
-    if persona.conversation_history:
-        prompt += "The reviewer has provided these previous responses:\n"
-        for hist in persona.conversation_history:
-            prompt += f"- {hist['summary']}\n"
 
-    prompt += f"""
+
+PRODUCT_REVIEWER_PROMPT_V4 = PromptTemplate(
+    name="product_reviewer_v4",
+    profile=_product_reviewer_profile_v4,
+    response_format="""
+    Return a JSON object with:
+    {
+        "relevant": boolean (true if question relates to their product experience, false otherwise),
+        "option": {option1: probability, option2: probability, ...},
+        "reason": "Detailed explanation of why this distribution makes sense for this reviewer"
+    }
+    
+    If the question is not relevant to the reviewer's experience, set "relevant": false and leave other fields as empty strings.
+    """,
+    history_label="Previous response history:",
+    history_intro="The reviewer has provided these previous responses:\n",
+    question="""
     Based on this profile, simulate the probability distribution for how this customer would respond to: "{question}"
 
     Consider:
@@ -674,63 +533,15 @@ def build_product_reviewer_prompt_v4(persona: Persona, question: str, options: L
     - Key themes and suggestions mentioned
     
     Provide probabilities for each option, ensuring they sum to 1:
-    """
-    for i, opt in enumerate(options, 1):
-        prompt += f"        {i}. {opt}\n"
+    """,
+    schema=PRODUCT_REVIEWER_RESPONSE_SCHEMAS[4]
+)
 
-    prompt += """
-    Return a JSON object with:
-    {
-        "relevant": boolean (true if question relates to their product experience, false otherwise),
-        "option": {option1: probability, option2: probability, ...},
-        "reason": "Detailed explanation of why this distribution makes sense for this reviewer"
-    }
-    
-    If the question is not relevant to the reviewer's experience, set "relevant": false and leave other fields as empty strings.
-    """
 
-    schema = {
-        "name": "product_reviewer_response_v4",
-        "description": "Simulated product reviewer survey response with probability distribution using an array of option-probability objects.",
-        "strict": True,
-        "schema": {
-            "type": "object",
-            "properties": {
-                "relevant": {
-                    "type": "boolean",
-                    "description": "True if the question relates to the customer's experience, false otherwise."
-                },
-                "option": {
-                    "type": "array",
-                    "description": "An array of objects, each representing a response option and its probability.",
-                    "items": {
-                        "type": "object",
-                        "properties": {
-                            "option": {
-                                "type": "string",
-                                "description": "The text of the response option."
-                            },
-                            "probability": {
-                                "type": "number",
-                                "description": "The probability assigned to this option."
-                            }
-                        },
-                        "required": ["option", "probability"],
-                        "additionalProperties": False
-                    }
-                },
-                "reason": {
-                    "type": "string",
-                    "description": "A detailed explanation of how the probability distribution was determined."
-                }
-            },
-            "required": ["relevant", "option", "reason"],
-            "additionalProperties": False
-        }
-    }
+def build_product_reviewer_prompt_v4(persona: Persona, question: str, options: List[str]) -> Tuple[str, Dict]:
+    """Build a comprehensive prompt for product review survey simulation"""
+    return PRODUCT_REVIEWER_PROMPT_V4.render(persona, question, options)
 
-    # Return the prompt and the schema
-    return prompt, schema
 
 def build_employee_personality_summary_prompt(persona: Persona) -> str:
     """Generate a prompt to summarize an employee's personality based on their profile."""
@@ -817,4 +628,3 @@ def build_product_reviewer_personality_summary_prompt(persona: Persona) -> str:
         prompt += f"- Suggested improvements: {suggestions}\n"
 
     return prompt
-
@@ -57,12 +57,11 @@ react-vis for heatmaps
 
 """
 
-from typing import List, Dict, Any, Type
+from typing import List, Dict, Any, Optional, Set, Type
 from pydantic import BaseModel
 import numpy as np
-from google.generativeai import GenerativeModel
 import os
-import google.generativeai as genai
+from functools import lru_cache
 from dotenv import load_dotenv
 from schema import THEME_RADAR_SCHEMA, PERSONA_NETWORK_SCHEMA, SENTIMENT_FLOW_SCHEMA, RESPONSE_HEATMAP_SCHEMA
 from tenacity import retry, stop_after_attempt, wait_exponential
@@ -71,15 +70,24 @@ import asyncio
 import time 
 from transform_schema import SchemaTransformer
 from openai import AsyncAzureOpenAI
+from metrics import count_retry, gemini_provider, observe_call, observe_step
 
 
 load_dotenv()
 
+
+@lru_cache(maxsize=1)
+def _genai():
+    """Import the Gemini SDK on first use; it takes most of a second and is only needed for analysis"""
+    import google.generativeai as genai
+    return genai
+
 class QuestionQualitativeAnalysis:
     def __init__(self, responses: List[Dict[str, Any]]):
         self.responses = responses
         
         gemini_api_key = os.getenv("GEMINI_API_KEY")
+        genai = _genai()
         genai.configure(api_key=gemini_api_key)
         self.model = genai.GenerativeModel('gemini-2.0-flash-001')
         self.azure_openai_api_key = os.getenv("AZURE_OPENAI_API_KEY")
@@ -92,24 +100,19 @@ class QuestionQualitativeAnalysis:
         self.use_azure_openai = False
 
 
-    async def analyze_question(self, question: str, options: List[str]) -> Dict[str, Any]:
-        """Run all analyses concurrently and combine results"""
+    async def analyze_question(self, question: str, options: List[str], sections: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """Run the analyses concurrently (only those in sections, if given) and combine results"""
         start_time = time.time()
-        theme_task = self._analyze_themes(question, options)
-        network_task = self._analyze_network(question, options)
-        sentiment_task = self._analyze_sentiment(question, options)
-        pattern_task = self._analyze_patterns(question, options)
-
-        theme_results, network_results, sentiment_results, pattern_results = await asyncio.gather(
-            theme_task, network_task, sentiment_task, pattern_task
-        )
-        print(f"--- Time taken to analyze question: {time.time() - start_time}")
-        return {
-            "theme_analysis": theme_results,
-            "network_analysis": network_results,
-            "sentiment_analysis": sentiment_results,
-            "response_patterns": pattern_results
+        analyses = {
+            "theme_analysis": self._analyze_themes,
+            "network_analysis": self._analyze_network,
+            "sentiment_analysis": self._analyze_sentiment,
+            "response_patterns": self._analyze_patterns
         }
+        names = [name for name in analyses if sections is None or name in sections]
+        results = await asyncio.gather(*(analyses[name](question, options) for name in names))
+        observe_step("qualitative_analysis", time.time() - start_time)
+        return dict(zip(names, results))
 
     async def _analyze_themes(self, question: str, options: List[str]) -> Dict[str, Any]:
         """Analyze thematic elements with detailed theme extraction"""
@@ -260,20 +263,20 @@ class QuestionQualitativeAnalysis:
             formatted_data.append(data)
         return "\n".join(formatted_data)
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), before_sleep=count_retry("qualitative_analysis", gemini_provider))
     async def _get_azure_openai_response(self, prompt: str, schema: Dict[str, Any]) -> Dict:
         """Get structured response from Azure OpenAI API."""
         schema_transformer = SchemaTransformer()
         wrapped_schema = schema_transformer.wrap_schema(schema, "theme", "Theme analysis schema", strict=True)
         try:
-            response = await self.azure_openai_client.chat.completions.create(
+            response = await observe_call("qualitative_analysis", "azure", self.azure_openai_client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": prompt}],
                 response_format={
                     "type": "json_schema",
                     "json_schema": wrapped_schema
                 }
-            )
+            ))
             response_data = json.loads(response.choices[0].message.content)
             if isinstance(response_data, dict):
                 return response_data
@@ -283,20 +286,20 @@ class QuestionQualitativeAnalysis:
             print(f"Azure OpenAI API error: {str(e)}")
             return {"error": str(e)}
         
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), before_sleep=count_retry("qualitative_analysis", gemini_provider))
     async def _get_gemini_response(self, prompt: str, schema: Dict[str, Any]) -> Dict:
         """Get structured response from Gemini"""
         try:
             if self.use_azure_openai:
                 return await self._get_azure_openai_response(prompt, schema)
             else:
-                response = await self.model.generate_content_async(
+                response = await observe_call("qualitative_analysis", "gemini", self.model.generate_content_async(
                     prompt,
-                    generation_config=genai.GenerationConfig(
+                    generation_config=_genai().GenerationConfig(
                     response_mime_type="application/json",
                     response_schema=schema
                     )
-                )
+                ))
                 try:
                     response_data = json.loads(response.text)
                     if isinstance(response_data, dict):
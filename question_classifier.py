@@ -8,6 +8,7 @@ from pydantic import BaseModel, Field
 from typing import List
 load_dotenv()
 from openai import AsyncAzureOpenAI
+from metrics import count_retry, observe_call
 
 class QuestionClassifier:
     def __init__(self):
@@ -23,10 +24,10 @@ class QuestionClassifier:
             api_version = "2024-08-01-preview",
         )
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=4, max=60), retry=retry_if_exception_type(Exception))
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=4, max=60), retry=retry_if_exception_type(Exception), before_sleep=count_retry("question_classification"))
     async def _make_azure_openai_request(self, prompt: str, temperature: float, schema=None):
         if schema is not None:
-            response = await self.azure_openai_client.chat.completions.create(
+            response = await observe_call("question_classification", "azure", self.azure_openai_client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": prompt}],
                 response_format={
@@ -34,24 +35,24 @@ class QuestionClassifier:
                     "json_schema": schema
                 },
                 seed=123
-            ) 
+            )) 
         else:
-            response = await self.azure_openai_client.chat.completions.create(
+            response = await observe_call("question_classification", "azure", self.azure_openai_client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=temperature,
                 response_format={"type": "json_object"},
                 seed=123
-            )
+            ))
         return response
     
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=4, max=60), retry=retry_if_exception_type(Exception))
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=2, min=4, max=60), retry=retry_if_exception_type(Exception), before_sleep=count_retry("question_classification"))
     async def _make_openai_request(self, prompt: str, temperature: float, schema=None):
         if self.use_azure_openai:
             response = await self._make_azure_openai_request(prompt, temperature, schema)
         else:
             if schema is not None:
-                response = await self.openai_client.chat.completions.create(
+                response = await observe_call("question_classification", "openai", self.openai_client.chat.completions.create(
                     model="gpt-4o-mini",
                     messages=[{"role": "user", "content": prompt}],
                     response_format={
@@ -59,15 +60,15 @@ class QuestionClassifier:
                         "json_schema": schema
                     },
                     seed=123
-                )
+                ))
             else:
-                response = await self.openai_client.chat.completions.create(
+                response = await observe_call("question_classification", "openai", self.openai_client.chat.completions.create(
                     model="gpt-4o-mini",
                     messages=[{"role": "user", "content": prompt}],
                     temperature=temperature,
                     response_format={"type": "json_object"},
                     seed=123
-                )
+                ))
         try:
             json_response = json.loads(response.choices[0].message.content)
         except Exception as e:
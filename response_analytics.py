@@ -1,38 +1,59 @@
 # survey_analytics.py
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set
 import numpy as np
-import statsmodels.stats.proportion as smp
 from question_classifier import QuestionClassifier
-from anthropic import AsyncAnthropicBedrock
 import json
 from qualitative_analytics import QuestionQualitativeAnalysis
 import time
+from metrics import observe_step
 class QuestionAnalytics:
-    def __init__(self, all_responses: List[Dict[str, float]], n_samples: int = 2000):
+    def __init__(self, all_responses: List[Dict[str, float]], n_samples: int = 2000, weights: Dict[str, float] = None):
         """
         Initialize QuestionAnalytics with the list of persona responses
 
         Args:
             all_responses: List[Dict[str, float]] - List of probability distributions from LLM
             n_samples: int - Number of samples to generate per distribution
+            weights: Dict[str, float] - Optional sampling weight per persona id; each persona
+                contributes samples in proportion to its weight
         """
         self.valid_responses = [resp for resp in all_responses if not resp.get('error')]
         self.responses = [resp.get('distribution') for resp in self.valid_responses]
         self.n_samples = n_samples
         self.combined_samples = None
+        self.weights = [
+            (weights or {}).get(resp.get('persona_id'), 1.0)
+            for resp in self.valid_responses
+        ]
     
         self.reliability_scores = [
             resp.get('reliability_score', 0) 
             for resp in self.valid_responses 
             if resp.get('reliability_score') is not None
         ]
+        self.reliability_weights = [
+            weight
+            for resp, weight in zip(self.valid_responses, self.weights)
+            if resp.get('reliability_score') is not None
+        ]
 
         self.question_classifier = QuestionClassifier()
         self.qualitative_analysis = QuestionQualitativeAnalysis(self.valid_responses) # valid responses contain the persona_id and other data
 
 
+    def sample_sizes(self) -> List[int]:
+        """Samples drawn per distribution: n_samples scaled by the persona's weight relative to the mean weight"""
+        if not self.weights:
+            return []
+        mean_weight = float(np.mean(self.weights)) or 1.0
+        return [max(1, int(round(self.n_samples * weight / mean_weight))) for weight in self.weights]
+
     def generate_samples(self) -> np.ndarray:
         """Generate samples from multiple distributions"""        
+        sizes = self.sample_sizes()
+        if any(size != self.n_samples for size in sizes):
+            return self._generate_weighted_samples(sizes)
+
         # Pre-allocate the array for all samples
         all_samples = np.empty((len(self.responses), self.n_samples), dtype=object)
         
@@ -51,11 +72,24 @@ class QuestionAnalytics:
         
         return all_samples.flatten()
 
+    def _generate_weighted_samples(self, sizes: List[int]) -> np.ndarray:
+        """Generate a different number of samples per distribution"""
+        all_samples = []
+        for i, (dist, size) in enumerate(zip(self.responses, sizes)):
+            options = np.array(list(dist.keys()))
+            probs = np.array([dist[opt] for opt in options])
+            total = np.sum(probs)
+            if not np.isclose(total, 1.0, rtol=1e-5):
+                print(f"[QuestionAnalytics][_generate_weighted_samples] Distribution {i} sums to {total}: {dict(zip(options, probs))}")
+                probs = probs / total
+            all_samples.append(np.random.choice(options, size=size, p=probs).astype(object))
+        return np.concatenate(all_samples) if all_samples else np.empty(0, dtype=object)
+
     def calculate_mean_reliability(self) -> float:
         """Calculate mean reliability score across all valid responses"""
         if not self.reliability_scores:
             return 0.0
-        return float(np.mean(self.reliability_scores))
+        return float(np.average(self.reliability_scores, weights=self.reliability_weights))
 
     def calculate_basic_stats(self) -> Dict:
         """Calculate basic statistics including counts and percentages"""
@@ -74,7 +108,8 @@ class QuestionAnalytics:
             "confidence_intervals": {}
         }
         
-        # Calculate Wilson confidence intervals
+        # Calculate Wilson confidence intervals (statsmodels is slow to import, so only on first use)
+        import statsmodels.stats.proportion as smp
         for opt, count in zip(unique, counts):
             lower, upper = smp.proportion_confint(
                 count, total, alpha=0.05, method='wilson'
@@ -182,18 +217,19 @@ class QuestionAnalytics:
         analysis = await self.question_classifier.classify(options)
         return analysis
 
-    async def analyze_survey_question(self, question: str, options: List[str]) -> Dict[str, Any]:
-        """Main method to analyze a survey question"""
+    def calculate_quantitative_metrics(self, analysis: Dict[str, Any], sections: Optional[Set[str]] = None) -> Dict[str, Any]:
+        """
+        Calculate the statistics for a question given its classification (no LLM calls). Basic
+        statistics are always computed; the other metrics only if they are in sections, when given.
+        """
         start_time = time.time()
-        # First, analyze the question type using LLM
-        analysis = await self.question_classifier.classify(question, options)
-        print(f"-- Time taken to classify question: {time.time() - start_time}")
-        
         # Calculate basic statistics
         basic_stats = self.calculate_basic_stats()
-        print(f"-- Time taken to calculate basic stats: {time.time() - start_time}")
+        observe_step("basic_statistics", time.time() - start_time)
+        start_time = time.time()
         mean_reliability = self.calculate_mean_reliability()
-        print(f"-- Time taken to calculate mean reliability: {time.time() - start_time}")
+        observe_step("mean_reliability", time.time() - start_time)
+        start_time = time.time()
         
         results = {
             "question_type": analysis["scale_type"],
@@ -203,20 +239,29 @@ class QuestionAnalytics:
         
         # Add metrics based on question type
         if analysis["is_likert"] and analysis["ordered_options"]:
-            results.update({
-                "agreement_metrics": self.calculate_agreement_metrics(analysis["ordered_options"]),
-                "polarization_metrics": self.calculate_polarization(analysis["ordered_options"]),
-                "ordered_options": analysis["ordered_options"]
-            })
-            print(f"-- Time taken to calculate agreement metrics: {time.time() - start_time}")
-        else:
+            if sections is None or "agreement_metrics" in sections:
+                results["agreement_metrics"] = self.calculate_agreement_metrics(analysis["ordered_options"])
+            if sections is None or "polarization_metrics" in sections:
+                results["polarization_metrics"] = self.calculate_polarization(analysis["ordered_options"])
+            results["ordered_options"] = analysis["ordered_options"]
+            observe_step("agreement_metrics", time.time() - start_time)
+        elif sections is None or "categorical_metrics" in sections:
             results.update({
                 "categorical_metrics": self.calculate_categorical_metrics(basic_stats)
             })
-            print(f"-- Time taken to calculate categorical metrics: {time.time() - start_time}")
+            observe_step("categorical_metrics", time.time() - start_time)
+        return results
+
+    async def analyze_survey_question(self, question: str, options: List[str]) -> Dict[str, Any]:
+        """Main method to analyze a survey question"""
+        start_time = time.time()
+        # First, analyze the question type using LLM
+        analysis = await self.question_classifier.classify(question, options)
+        observe_step("classification", time.time() - start_time)
+
+        results = self.calculate_quantitative_metrics(analysis)
         #qualititave_analysis
         qualitative_analysis = await self.qualitative_analysis.analyze_question(question, options)
-        print(f"-- Time taken to qualitative analysis: {time.time() - start_time}")
         results.update({
             "theme_analysis": qualitative_analysis["theme_analysis"] if "theme_analysis" in qualitative_analysis else {},
             "network_analysis": qualitative_analysis["network_analysis"] if "network_analysis" in qualitative_analysis else {},
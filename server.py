@@ -5,25 +5,38 @@ import uvicorn
 import json
 import os
 from dotenv import load_dotenv
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator, model_validator
 from openai import OpenAI
 from typing import List
-from fastapi import HTTPException
+from fastapi import HTTPException, Header
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from openai import AsyncOpenAI
 from openai import AsyncAzureOpenAI
 from httpx import Timeout
 from tenacity import retry, stop_after_attempt, wait_exponential
 import time
-from SurveyTypes import SurveyRequest, Question, Option
+import uuid
+import asyncio
+from SurveyTypes import SurveyRequest, SurveyExtensionRequest, Question, Option
 import random
-from llminference import LLMInference
 from typing import Dict, Any, List
-from survey_simulation import SurveySimulation, SimulationConfig
-from personas import PersonaManager
+from survey_simulation import run_cached_survey_request, resume_survey_run, extend_survey_run
+from survey_jobs import SurveyJobStore, SurveyJobRunner, stream_job_events
 from schema import PersonaType
+from personas import PersonaCatalog
 from ask_endpoint.ask_prompts import AskPromptManager
 from ask_endpoint.persona_loader import PersonaLoader
-from deep_research.run import main as research_main
+from ask_endpoint.response_stream import JSONFieldStream
+from shared_cache import get_shared_cache
+from api_responses import FastJSONResponse, CompressionMiddleware, dumps
+from persona_store import parse_filter
+from persona_history import warm_encoder
+from temporal_analysis import analyze_temporal, ANALYSIS_CHUNK_SIZE
+from admission import AdmissionController, AdmissionRejected, Lane, research_cost, survey_cost, SURVEY_CALLS_PER_UNIT
+from survey_runs import SurveyRunStore
+import metrics
+from metrics import count_retry, observe_call, record_usage
 
 use_azure_openai = True
 azure_openai_api_key = os.getenv("AZURE_OPENAI_API_KEY")
@@ -31,7 +44,7 @@ azure_openai_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
 
 load_dotenv()
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -41,6 +54,8 @@ app.add_middleware(
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
 )
+# gzip or brotli, as negotiated through Accept-Encoding
+app.add_middleware(CompressionMiddleware)
 
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
@@ -52,12 +67,96 @@ azure_openai_client = AsyncAzureOpenAI(
 
 prompt_manager = AskPromptManager()
 persona_loader = PersonaLoader()
+# This worker's share of the budget of concurrent LLM work; see admission.py
+admission = AdmissionController()
+job_store = SurveyJobStore()
+job_runner = SurveyJobRunner(job_store, admission=admission)
+shared_cache = get_shared_cache()
+# Persona calls in flight per /ask/batch request, and personas one request may ask
+ASK_BATCH_CONCURRENCY = int(os.getenv("ASK_BATCH_CONCURRENCY", "8"))
+ASK_BATCH_MAX_PERSONAS = int(os.getenv("ASK_BATCH_MAX_PERSONAS", "200"))
+
+def build_persona_catalogs():
+    """Compile (or map) the catalogs of every persona type, so no request waits on one"""
+    for persona_type in PersonaType:
+        try:
+            PersonaCatalog.get(persona_type)
+            persona_loader.get_store(persona_type.value)
+        except Exception as e:
+            # Left to load on first use
+            print(f"[startup] persona catalog {persona_type.value} not loaded: {str(e)}")
+
+@app.on_event("startup")
+async def load_persona_catalogs():
+    # Before the job runner starts and requests are served: compiling a catalog, or waiting on
+    # the file lock while another worker compiles it, would stall the event loop of its first user
+    await asyncio.to_thread(build_persona_catalogs)
+
+@app.on_event("startup")
+async def start_job_runner():
+    job_runner.start()
+
+@app.on_event("startup")
+async def warm_token_encoder():
+    # Off the event loop and without delaying startup, before the first survey prompt needs it
+    asyncio.get_running_loop().run_in_executor(None, warm_encoder)
+
+@app.on_event("shutdown")
+async def stop_job_runner():
+    await job_runner.stop()
+    metrics.mark_process_dead()
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request, exc: AdmissionRejected):
+    print(f"[admission] rejected {request.url.path}: {str(exc)}")
+    return FastJSONResponse(
+        {"detail": str(exc), "retry_after": exc.retry_after},
+        status_code=429,
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+def stored_run_cost(run_id: str, new_questions: int = None) -> int:
+    """Estimated LLM calls of resuming a run (its missing units), or of extending it with new questions"""
+    run = SurveyRunStore().get_run(run_id)
+    if run is None:
+        return 1
+    survey = run["request"]
+    if new_questions is not None:
+        return survey_cost(survey.number_of_personas, new_questions)
+    return max(survey_cost(survey.number_of_personas, len(survey.questions)) - run["completed_units"] * SURVEY_CALLS_PER_UNIT, 1)
 
 class QuestionRequest(BaseModel):
     persona_index: int
     question: str
     persona_type: PersonaType
     
+class BatchQuestionRequest(BaseModel):
+    question: str
+    persona_type: PersonaType
+    # Either explicit persona indexes or a filter such as 'location contains ", OR" and rating <= 2'
+    persona_indexes: Optional[List[int]] = None
+    persona_filter: Optional[str] = None
+    # Maximum number of personas a filter selects, in catalog order
+    limit: int = ASK_BATCH_MAX_PERSONAS
+
+    @field_validator("persona_filter")
+    @classmethod
+    def validate_persona_filter(cls, value: Optional[str]) -> Optional[str]:
+        if value:
+            parse_filter(value)
+        return value
+
+    @model_validator(mode="after")
+    def validate_selection(self):
+        if (self.persona_indexes is None) == (self.persona_filter is None):
+            raise ValueError("Provide either persona_indexes or persona_filter")
+        if self.persona_indexes is not None and len(self.persona_indexes) > ASK_BATCH_MAX_PERSONAS:
+            raise ValueError(f"At most {ASK_BATCH_MAX_PERSONAS} personas can be asked at once")
+        if not 0 < self.limit <= ASK_BATCH_MAX_PERSONAS:
+            raise ValueError(f"limit must be between 1 and {ASK_BATCH_MAX_PERSONAS}")
+        return self
+
 class Response(BaseModel):
     response: str
     name: str
@@ -82,31 +181,77 @@ class ResearchRequest(BaseModel):
     survey_results: Dict[str, Any]
     persona_responses: List[Dict[str, Any]]
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), reraise=True)
-async def make_openai_request(prompt: str):
+def llm_provider() -> str:
+    return "azure" if use_azure_openai else "openai"
+
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), reraise=True, before_sleep=count_retry("ask", lambda _: llm_provider()))
+async def make_openai_request(prompt: str, call_site: str = "ask"):
     if use_azure_openai:
-        response = await azure_openai_client.chat.completions.create(
+        response = await observe_call(call_site, "azure", azure_openai_client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
             response_format={"type": "json_object"},
             seed=123
-        )
+        ))
     else:
-        response = await openai_client.chat.completions.create(
+        response = await observe_call(call_site, "openai", openai_client.chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
             response_format={"type": "json_object"},
             seed=123
-        )
+        ))
     return response
 
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), reraise=True, before_sleep=count_retry("ask_stream", lambda _: llm_provider()))
+async def open_openai_stream(prompt: str):
+    """Streamed completion of make_openai_request's call; only opening the stream is retried"""
+    client = azure_openai_client if use_azure_openai else openai_client
+    return await observe_call("ask_stream", llm_provider(), client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.3,
+        response_format={"type": "json_object"},
+        seed=123,
+        stream=True,
+        # The last chunk reports the token usage
+        stream_options={"include_usage": True}
+    ))
+
+
+def ask_cache_parts(prompt: str) -> List[str]:
+    return [llm_provider(), "gpt-4o-mini", prompt]
+
+
+async def complete_json(prompt: str, call_site: str = "ask") -> Any:
+    """Parsed JSON answer to a prompt, shared by all server workers through the cache"""
+    async def request():
+        response = await make_openai_request(prompt, call_site=call_site)
+        return json.loads(response.choices[0].message.content.strip())
+    return await shared_cache.get_or_compute("ask", ask_cache_parts(prompt), request)
+
 @app.get("/")
 async def root():
     return {"message": "Agent Colony is running"}
 
 
+"""
+Prometheus metrics: LLM calls per call site and provider (counts by outcome, latency histograms,
+retries, 429s, token totals, calls in flight), admission control, the survey job queue and
+survey stage durations. See metrics.py.
+"""
+@app.get("/metrics")
+async def get_metrics():
+    # The job store is shared by the workers, so any of them can report the job counts
+    for state, count in (await asyncio.to_thread(job_store.count_by_state)).items():
+        metrics.SURVEY_JOBS.labels(state).set(count)
+    body, content_type = metrics.render()
+    return PlainTextResponse(body, media_type=content_type)
+
+
 # Endpoint to Get All Personas
 @app.get("/personas", response_model=List[dict])
 async def get_persona(persona_type: PersonaType):
@@ -114,26 +259,30 @@ async def get_persona(persona_type: PersonaType):
     Returns the persona with the given index.
     """
     try:
-        return persona_loader.get_personas(persona_type.value)
+        return FastJSONResponse(persona_loader.get_personas(persona_type.value))
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
 @app.post("/research")
 async def research(request: ResearchRequest):
-    try:
-        research_results = await research_main(
-            query=request.query,
-            breadth=request.breadth,
-            depth=request.depth,
-            concurrency=request.concurrency,
-            service="azure",
-            model="o3-mini",
-            quiet=False
-        )
-        print(f"[research] results: {research_results}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing research: {str(e)}")
+    # Imported on first use: the research agent pulls in firecrawl, typer and rich, which the
+    # survey endpoints never need
+    from deep_research.run import main as research_main
+    async with admission.admit(research_cost(request.breadth, request.depth)):
+        try:
+            research_results = await research_main(
+                query=request.query,
+                breadth=request.breadth,
+                depth=request.depth,
+                concurrency=request.concurrency,
+                service="azure",
+                model="o3-mini",
+                quiet=False
+            )
+            print(f"[research] completed query: {request.query}")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error processing research: {str(e)}")
     return research_results
 
 
@@ -157,14 +306,160 @@ async def ask_persona(request: QuestionRequest):
         raise HTTPException(status_code=500, detail=f"Error formatting prompt: {str(e)}")
     
     # Send Request to OpenAI API
+    async with admission.admit(1, Lane.INTERACTIVE):
+        try:
+            answer = await complete_json(prompt) or {"error": "Failed to generate a response"}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"[ask][Exception] OpenAI API error: {str(e)}")
+    
+    print(f"[ask] answered {request.persona_type.value} persona {request.persona_index}")
+    return FastJSONResponse({"answer": answer, "persona": persona})
+
+
+async def ask_stream_events(prompt: str, persona: Dict[str, Any]):
+    """
+    Yield (event, data) for a streamed /ask answer: token events with the text of the answer's
+    response field as it is generated, then the parsed answer with the time to first token and
+    total latency. A cached answer is sent as a single token event.
+    """
+    started = time.perf_counter()
+    cached = await shared_cache.get("ask", ask_cache_parts(prompt))
+    if cached:
+        if isinstance(cached.get("response"), str):
+            yield "token", {"text": cached["response"]}
+        elapsed = round(time.perf_counter() - started, 3)
+        yield "answer", {"answer": cached, "persona": persona, "cached": True, "ttft_seconds": elapsed, "total_seconds": elapsed}
+        return
+
+    field = JSONFieldStream("response")
+    first_token = None
+    stream = await open_openai_stream(prompt)
+    async for chunk in stream:
+        if getattr(chunk, "usage", None):
+            record_usage("ask_stream", llm_provider(), chunk.usage)
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        text = field.feed(chunk.choices[0].delta.content)
+        if text:
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            yield "token", {"text": text}
+    total = time.perf_counter() - started
+    answer = json.loads(field.text.strip())
+    await shared_cache.set("ask", ask_cache_parts(prompt), answer)
+    ttft = round(first_token if first_token is not None else total, 3)
+    metrics.ASK_STREAM_TTFT.observe(ttft)
+    print(f"[ask_stream] time to first token {ttft}s, total {total:.3f}s")
+    yield "answer", {"answer": answer, "persona": persona, "cached": False, "ttft_seconds": ttft, "total_seconds": round(total, 3)}
+
+
+"""
+Streaming variant of /ask over server-sent events: token events carry the text of the answer as it
+is generated, an answer event ends the stream with the parsed answer, the persona, the time to
+first token and the total latency. Failures after the stream started arrive as an error event.
+"""
+@app.post("/ask/stream")
+async def ask_persona_stream(request: QuestionRequest):
     try:
-        response = await make_openai_request(prompt)
-        answer = json.loads(response.choices[0].message.content.strip()) or {"error": "Failed to generate a response"}
+        persona = persona_loader.get_persona(request.persona_type.value, request.persona_index)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        prompt = prompt_manager.format_prompt(request.persona_type, persona, request.question)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"[ask][Exception] OpenAI API error: {str(e)}")
-    
-    print('[ask] answer: ', answer, 'persona: ', persona)
-    return {"answer": answer, "persona": persona}
+        raise HTTPException(status_code=500, detail=f"Error formatting prompt: {str(e)}")
+
+    ticket = await admission.acquire(1, Lane.INTERACTIVE)
+
+    async def stream():
+        try:
+            async for event, data in ask_stream_events(prompt, persona):
+                yield f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+        except Exception as e:
+            print(f"[ask_stream][Exception] {str(e)}")
+            yield f"event: error\ndata: {dumps({'error': str(e)}).decode()}\n\n"
+        finally:
+            admission.release(ticket)
+
+    # The background task releases the ticket when the stream never started
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}, background=BackgroundTask(admission.release, ticket))
+
+
+async def ask_batch_events(request: BatchQuestionRequest, persona_indexes: List[int]):
+    """
+    Ask the question to every persona, at most ASK_BATCH_CONCURRENCY at a time, and yield
+    (event, data) as each answer or failure arrives, then a completed event with the counts.
+    """
+    started = time.time()
+    slots = asyncio.Semaphore(ASK_BATCH_CONCURRENCY)
+
+    async def ask(persona_index: int) -> Dict[str, Any]:
+        async with slots:
+            try:
+                persona = persona_loader.get_persona(request.persona_type.value, persona_index)
+                prompt = prompt_manager.format_prompt(request.persona_type, persona, request.question)
+                answer = await complete_json(prompt)
+                if not answer:
+                    raise ValueError("Failed to generate a response")
+                return {"persona_index": persona_index, "answer": answer, "persona": persona}
+            except Exception as e:
+                return {"persona_index": persona_index, "error": str(e)}
+
+    tasks = [asyncio.create_task(ask(index)) for index in persona_indexes]
+    answered = failed = 0
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            if "error" in result:
+                failed += 1
+                yield "error", result
+            else:
+                answered += 1
+                yield "answer", result
+    finally:
+        # The client disconnected: stop asking the remaining personas
+        for task in tasks:
+            task.cancel()
+    print(f"[ask_batch] answered {answered} {request.persona_type.value} personas, {failed} failed")
+    yield "completed", {"answered": answered, "failed": failed, "duration_seconds": round(time.time() - started, 3)}
+
+
+"""
+Asks one question to many personas, chosen by index or by filter, and streams each answer as soon as
+it arrives: one JSON object per line (application/x-ndjson) with an "event" of answer, error or
+completed, or server-sent events when the request accepts text/event-stream. A persona that fails
+is reported in an error event and does not stop the others.
+"""
+@app.post("/ask/batch")
+async def ask_batch(request: BatchQuestionRequest, accept: Optional[str] = Header(default=None)):
+    if request.persona_indexes is not None:
+        persona_indexes = list(dict.fromkeys(request.persona_indexes))
+    else:
+        try:
+            store = persona_loader.get_store(request.persona_type.value)
+            persona_indexes = [int(row) for row in store.select(parse_filter(request.persona_filter, store.column_kinds()), request.limit)]
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    print(f"[ask_batch] asking {len(persona_indexes)} {request.persona_type.value} personas")
+    ticket = await admission.acquire(len(persona_indexes), Lane.INTERACTIVE)
+    sse = "text/event-stream" in (accept or "")
+
+    async def stream():
+        try:
+            async for event, data in ask_batch_events(request, persona_indexes):
+                if sse:
+                    yield f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+                else:
+                    yield dumps({"event": event, **data}) + b"\n"
+        finally:
+            admission.release(ticket)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(admission.release, ticket)
+    )
 
 
 @app.post("/ask_survey_question")
@@ -182,8 +477,7 @@ async def ask_survey_question(request: QuestionRequest):
             "options": ["option1", "option2", "option3"]
         }}
         """
-        response = await make_openai_request(prompt)
-        options = json.loads(response.choices[0].message.content.strip()) or {"error": "Failed to generate a response"}
+        options = await complete_json(prompt, call_site="survey_options") or {"error": "Failed to generate a response"}
         
         # Create Question object with options from response
         question = Question(
@@ -200,107 +494,44 @@ async def ask_survey_question(request: QuestionRequest):
             number_of_samples=2000
         )
         return await run_survey(survey_request)
+    except AdmissionRejected:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"[ask_survey_question][Exception] Error: {str(e)}")
 
 
+"""
+Temporal analysis of persona responses: sentiment over time, and themes and emotions by year.
+Responses are bucketed by month and analyzed in concurrent chunks (see temporal_analysis.py).
+"""
 @app.post("/analyze_responses")
 async def analyze_responses(request: ResponseAnalysisRequest):
+    print(f"[analyze_responses] {len(request.responses)} {request.persona_type.value} responses")
     try:
-        # Format responses based on persona type
-        print(f"[analyze_responses] request: {request}")
-        formatted_responses = []
-        for i, resp in enumerate(request.responses):
-            if request.persona_type == PersonaType.INTEL_EMPLOYEE:
-                formatted_response = (
-                    f"Response {i+1}: {resp.get('response')} "
-                    f"Date: {resp.get('date')}"
-                    f"(from {resp.get('name')}, {resp.get('role')}, {resp.get('location')}, "
-                    f"Rating: {resp.get('rating')})"
-                )
-            elif request.persona_type == PersonaType.INTEL_PRODUCT_REVIEWER:
-                formatted_response = (
-                    f"Response {i+1}: {resp.get('response')} "
-                    f"(User: {resp.get('name')}, "
-                    f"Date: {resp.get('information_cutoff')}"
-                    f"Technical Level: {resp.get('expertise_level', {}).get('level', 'Unknown')})"
-                )
-            else:
-                raise HTTPException(status_code=400, detail=f"Unsupported persona type: {request.persona_type}")
-            
-            formatted_responses.append(formatted_response)
-
-        # Rest of the analysis logic remains the same
-        analysis_prompt = (
-            f"Analyze these responses to: \"{request.question}\"\n\n"
-            f"Responses with their timestamps and details:\n"
-            f"{chr(10).join(formatted_responses)}\n\n"
-            f"Provide a comprehensive temporal analysis in this exact JSON format:\n"
-            "{\n"
-            '    "sentimentTimeSeries": [\n'
-            "        { \n"
-            '            "date": "timestamp",\n'
-            '            "positive": "percentage (0-100)",\n'
-            '            "negative": "percentage (0-100)"\n'
-            "        }\n"
-            "    ], NOTE: The timestamps should be as granular as possible based on the data provided.\n"
-            '    "themeDistribution": [\n'
-            "        {\n"
-            '            "theme": "theme name",\n'
-            '            "2022": "value (0-100)",\n'
-            '            "2023": "value (0-100)",\n'
-            '            "2024": "value (0-100)"\n'
-            "        }\n"
-            "    ],\n"
-            '    "emotionAnalysis": [\n'
-            "        {\n"
-            '            "emotion": "emotion name",\n'
-            '            "2022": "intensity (0-100)",\n'
-            '            "2023": "intensity (0-100)",\n'
-            '            "2024": "intensity (0-100)"\n'
-            "        }\n"
-            "    ],\n"
-            '    "insights": [\n'
-            "        {\n"
-            '            "title": "Key insight title",\n'
-            '            "description": "Detailed description",\n'
-            '            "type": "sentiment|themes|improvement"\n'
-            "        }\n"
-            "    ]\n"
-            "}"
-        )
-        # Generate analysis
-        response = await make_openai_request(analysis_prompt)
-        # Extract content from OpenAI response correctly
-        analysis_response = response.choices[0].message.content
-        
-        try:
-            parsed_analysis = json.loads(analysis_response)
-            
-            structured_response = {
-                "sentimentTimeSeries": parsed_analysis.get("sentimentTimeSeries", []),
-                "themeDistribution": parsed_analysis.get("themeDistribution", []),
-                "emotionAnalysis": parsed_analysis.get("emotionAnalysis", []),
-                "insights": parsed_analysis.get("insights", [])
-            }
-            
-            return structured_response
-
-        except json.JSONDecodeError as e:
-            print(f"Failed to parse JSON: {analysis_response}")
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to parse analysis response: {str(e)}"
-            )
-
+        async with admission.admit(-(-len(request.responses) // ANALYSIS_CHUNK_SIZE) + 1):
+            analysis = await analyze_temporal(request.question, request.responses, request.persona_type, lambda prompt: complete_json(prompt, call_site="analyze_responses"))
+    except AdmissionRejected:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"Analysis failed with error: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Analysis failed: {str(e)}"
         )
+    return FastJSONResponse(analysis)
 
 
+def check_persona_filter(survey: SurveyRequest):
+    """Reject a persona filter whose fields or values do not fit the persona type's catalog with 400"""
+    if not survey.persona_filter:
+        return
+    try:
+        parse_filter(survey.persona_filter, PersonaCatalog.get(survey.persona_type).store.column_kinds())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 """
 Runs a survey across all personas and analyzes the results.
@@ -316,29 +547,118 @@ This endpoint:
 """
 @app.post("/survey/run")
 async def run_survey(survey: SurveyRequest) -> Dict[str, Any]:
+    await asyncio.to_thread(check_persona_filter, survey)
+    run_id = uuid.uuid4().hex
     try:
-        print(f"[run_survey] params: {survey.persona_type}, {survey.number_of_personas}, {survey.number_of_samples}, {survey}")
-        if survey.persona_type == PersonaType.INTEL_EMPLOYEE:
-            persona_manager = PersonaManager(survey.persona_type)
-        else:
-            persona_manager = PersonaManager(survey.persona_type)
-
-        llm = LLMInference(persona_manager)
-        config = SimulationConfig(max_parallel_personas=3, thread_pool_size=2, timeout_seconds=300)
-
-        async with SurveySimulation(llm, persona_manager, config, survey.number_of_personas, survey.number_of_samples, survey.persona_type) as simulation:
-            results = await simulation.run_survey(survey.questions)
-        print(f"[run_survey] results: {results}")
-        return results
-        
-        
+        # Admitted only when the result is not already cached
+        results = await run_cached_survey_request(survey, run_id=run_id, admission=admission)
+        print(f"[run_survey] completed run {results['metadata'].get('run_id')}")
+        return FastJSONResponse(results)
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing survey (resume with /survey/runs/{run_id}/resume): {str(e)}"
+        )
+
+
+"""
+Resumes a survey run that failed part way. Persona-question results checkpointed by the failed
+attempt are reused; only the missing ones are simulated before the analytics run again.
+Survey jobs use their job id as run id, so they can be resumed the same way.
+"""
+@app.post("/survey/runs/{run_id}/resume")
+async def resume_survey(run_id: str) -> Dict[str, Any]:
+    cost = await asyncio.to_thread(stored_run_cost, run_id)
+    async with admission.admit(cost):
+        try:
+            results = await resume_survey_run(run_id)
+            print(f"[resume_survey] completed run {run_id}")
+            return FastJSONResponse(results)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Survey run {run_id} not found")
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error resuming survey run {run_id}: {str(e)}"
+            )
+
+
+"""
+Extends a completed survey run with new questions. Persona conversation history and the analysis
+of the questions already asked are restored from the run store, so only the new questions are
+simulated. The result covers all questions, with the survey level analysis recomputed.
+"""
+@app.post("/survey/runs/{run_id}/extend")
+async def extend_survey(run_id: str, request: SurveyExtensionRequest) -> Dict[str, Any]:
+    cost = await asyncio.to_thread(stored_run_cost, run_id, len(request.questions))
+    async with admission.admit(cost):
+        try:
+            results = await extend_survey_run(run_id, request.questions)
+            print(f"[extend_survey] completed run {run_id}")
+            return FastJSONResponse(results)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Survey run {run_id} not found")
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Error extending survey run {run_id} (resume with /survey/runs/{run_id}/resume): {str(e)}"
+            )
+
+
+"""
+Asynchronous variant of /survey/run for surveys that outlive proxy timeouts.
+
+POST /survey/jobs queues the survey and returns its job id. GET /survey/jobs/{job_id} returns the
+job state, the SimulationStatus (stage, current question, completed personas, errors) and, once
+the job completed, the same result /survey/run returns.
+"""
+@app.post("/survey/jobs", status_code=202)
+async def create_survey_job(survey: SurveyRequest) -> Dict[str, Any]:
+    await asyncio.to_thread(check_persona_filter, survey)
+    try:
+        job_id = await job_runner.submit(survey)
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Error processing survey: {str(e)}"
+            detail=f"Error queuing survey: {str(e)}"
         )
+    return {"job_id": job_id, "state": "queued"}
+
+
+@app.get("/survey/jobs/{job_id}")
+async def get_survey_job(job_id: str) -> Dict[str, Any]:
+    job = await asyncio.to_thread(job_store.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Survey job {job_id} not found")
+    return FastJSONResponse(job)
 
 
+"""
+Streams the progress of a survey job as server-sent events: status changes, every persona result,
+the running mean distribution of each question, stage completions and each question's statistics
+as soon as they are computed. The stream ends with a completed or failed event; the full result is
+then available from GET /survey/jobs/{job_id}.
+"""
+@app.get("/survey/jobs/{job_id}/events")
+async def stream_survey_job_events(job_id: str, last_event_id: Optional[int] = Header(default=0)):
+    if await asyncio.to_thread(job_store.get_state, job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Survey job {job_id} not found")
+    return StreamingResponse(
+        stream_job_events(job_store, job_id, last_event_id or 0),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=False) # change to False in production
+    # Worker processes share the persona catalogs (memory-mapped), the job queue, run checkpoints
+    # and the response cache, so throughput scales with WEB_CONCURRENCY
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # The workers write their metrics to a directory /metrics aggregates
+        import tempfile
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+    uvicorn.run("server:app", host="0.0.0.0", port=8000, reload=False, workers=int(os.getenv("WEB_CONCURRENCY", "1")))
@@ -0,0 +1,337 @@
+"""
+Cache shared by every server worker process.
+
+The server runs several uvicorn workers (WEB_CONCURRENCY), so an in-process cache would be
+duplicated per worker and each would pay for the same LLM calls. SharedCache stores JSON values
+in a backend all workers reach:
+
+    sqlite:///shared_cache.db   a local SQLite file (WAL), the default; shared by the workers of a machine
+    redis://host:6379/0         a Redis-compatible server, shared across machines (needs the redis package)
+    memory://                   an in-process dictionary with the same semantics, for tests and single-process runs
+    none                        caching disabled
+
+Values are keyed by a namespace (llm, personality_summary, ask, survey) and a hash of the inputs
+that determine them. get_or_compute is single-flight across processes: the first worker to miss
+takes a lease on the key and computes the value while the others wait for it, so concurrent
+identical requests cost one LLM call. If the lease holder fails or dies, its lease is released or
+expires and a waiting worker computes the value instead.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+SHARED_CACHE_URL = os.getenv("SHARED_CACHE_URL", "sqlite:///shared_cache.db")
+SHARED_CACHE_TTL = int(os.getenv("SHARED_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_LEASE_SECONDS = int(os.getenv("SHARED_CACHE_LEASE_SECONDS", "120"))
+MAX_WAIT_INTERVAL = 1.0
+_MISSING = object()
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize numpy scalars left in results as plain numbers"""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class CacheBackend:
+    """
+    Minimal key-value interface of a cache backend. Values are strings; ttl is in seconds.
+    add() stores a value only if the key is absent (or expired) and reports whether it did,
+    release() deletes a key only while it still holds the given value.
+    """
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str, ttl: int):
+        raise NotImplementedError
+
+    def add(self, key: str, value: str, ttl: int) -> bool:
+        raise NotImplementedError
+
+    def release(self, key: str, value: str):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """In-process backend with the semantics of the shared ones"""
+
+    def __init__(self):
+        self._values: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[str]:
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del self._values[key]
+            return None
+        return entry[0]
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._live(key)
+
+    def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._values[key] = (value, time.time() + ttl)
+
+    def add(self, key: str, value: str, ttl: int) -> bool:
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._values[key] = (value, time.time() + ttl)
+            return True
+
+    def release(self, key: str, value: str):
+        with self._lock:
+            if self._live(key) == value:
+                del self._values[key]
+
+    def delete(self, key: str):
+        with self._lock:
+            self._values.pop(key, None)
+
+
+class SQLiteBackend(CacheBackend):
+    """Backend in a local SQLite file, shared by the worker processes of one machine"""
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._writes = 0
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS shared_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_shared_cache_expiry ON shared_cache (expires_at)")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM shared_cache WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: int):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO shared_cache (key, value, expires_at) VALUES (?, ?, ?)", (key, value, now + ttl))
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM shared_cache WHERE expires_at <= ?", (now,))
+
+    def add(self, key: str, value: str, ttl: int) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM shared_cache WHERE key = ? AND expires_at <= ?", (key, now))
+            added = conn.execute(
+                "INSERT OR IGNORE INTO shared_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ttl)
+            ).rowcount == 1
+            conn.execute("COMMIT")
+        return added
+
+    def release(self, key: str, value: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM shared_cache WHERE key = ? AND value = ?", (key, value))
+
+    def delete(self, key: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM shared_cache WHERE key = ?", (key,))
+
+
+class RedisBackend(CacheBackend):
+    """Backend on a Redis-compatible server, shared across machines"""
+
+    # Delete the lease only if it is still ours, atomically
+    _RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("SHARED_CACHE_URL points to Redis but the redis package is not installed") from e
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self._release = self.client.register_script(self._RELEASE)
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: str, ttl: int):
+        self.client.set(key, value, ex=ttl)
+
+    def add(self, key: str, value: str, ttl: int) -> bool:
+        return bool(self.client.set(key, value, ex=ttl, nx=True))
+
+    def release(self, key: str, value: str):
+        self._release(keys=[key], args=[value])
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+
+def backend_from_url(url: str) -> Optional[CacheBackend]:
+    """Backend for a SHARED_CACHE_URL, or None when caching is disabled"""
+    if not url or url.lower() == "none":
+        return None
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported SHARED_CACHE_URL {url}")
+
+
+class SharedCache:
+    """
+    JSON values keyed by namespace and inputs, with cross-process single-flight computation.
+    Without a backend every lookup misses and values are computed each time.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend], ttl: int = SHARED_CACHE_TTL, lease_seconds: int = CACHE_LEASE_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    @staticmethod
+    def key(namespace: str, parts: Sequence[Any]) -> str:
+        digest = hashlib.sha256(json.dumps(list(parts), sort_keys=True, default=_json_default).encode("utf-8")).hexdigest()
+        return f"{namespace}:{digest}"
+
+    def _count(self, namespace: str, outcome: str):
+        counts = self.stats.setdefault(namespace, {"hits": 0, "misses": 0, "waits": 0})
+        counts[outcome] += 1
+
+    async def _get(self, key: str) -> Any:
+        try:
+            value = await asyncio.to_thread(self.backend.get, key)
+        except Exception as e:
+            print(f"[SharedCache][get] Error: {str(e)}")
+            return _MISSING
+        return _MISSING if value is None else json.loads(value)
+
+    async def get(self, namespace: str, parts: Sequence[Any]) -> Any:
+        """Cached value, or None"""
+        if self.backend is None:
+            return None
+        value = await self._get(self.key(namespace, parts))
+        return None if value is _MISSING else value
+
+    async def set(self, namespace: str, parts: Sequence[Any], value: Any, ttl: int = None):
+        if self.backend is None:
+            return
+        try:
+            await asyncio.to_thread(self.backend.set, self.key(namespace, parts), json.dumps(value, default=_json_default), ttl or self.ttl)
+        except Exception as e:
+            print(f"[SharedCache][set] Error: {str(e)}")
+
+    async def get_or_compute(self, namespace: str, parts: Sequence[Any], compute: Callable[[], Awaitable[Any]], ttl: int = None, lease_seconds: int = None) -> Any:
+        """
+        Cached value of the inputs, computing it with compute() if no worker has yet. Concurrent
+        callers in this process share one computation; callers in other processes wait on the lease.
+
+        Args:
+            namespace: Kind of value, also the prefix of its key
+            parts: JSON-serializable inputs that determine the value
+            compute: Coroutine function producing a JSON-serializable value
+            ttl: Seconds the value is kept
+            lease_seconds: Seconds other workers wait for this computation before taking over
+        """
+        if self.backend is None:
+            return await compute()
+        key = self.key(namespace, parts)
+        value = await self._get(key)
+        if value is not _MISSING:
+            self._count(namespace, "hits")
+            return value
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._count(namespace, "waits")
+            return await asyncio.shield(inflight)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await self._compute_once(namespace, key, compute, ttl or self.ttl, lease_seconds or self.lease_seconds)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when no other caller waits on it
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _compute_once(self, namespace: str, key: str, compute: Callable[[], Awaitable[Any]], ttl: int, lease_seconds: int) -> Any:
+        lease_key = f"{key}:lease"
+        token = f"{self.owner}:{uuid.uuid4().hex[:8]}"
+        interval = 0.05
+        while True:
+            try:
+                leased = await asyncio.to_thread(self.backend.add, lease_key, token, lease_seconds)
+            except Exception as e:
+                print(f"[SharedCache][lease] Error: {str(e)}")
+                return await compute()
+            if leased:
+                self._count(namespace, "misses")
+                try:
+                    value = await compute()
+                    try:
+                        await asyncio.to_thread(self.backend.set, key, json.dumps(value, default=_json_default), ttl)
+                    except Exception as e:
+                        print(f"[SharedCache][set] Error: {str(e)}")
+                    return value
+                finally:
+                    try:
+                        await asyncio.to_thread(self.backend.release, lease_key, token)
+                    except Exception as e:
+                        print(f"[SharedCache][release] Error: {str(e)}")
+            # Another worker is computing the value
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, MAX_WAIT_INTERVAL)
+            value = await self._get(key)
+            if value is not _MISSING:
+                self._count(namespace, "waits")
+                return value
+
+    def report(self) -> Dict[str, Any]:
+        return {"backend": type(self.backend).__name__ if self.backend else None, "namespaces": self.stats}
+
+
+@lru_cache(maxsize=1)
+def get_shared_cache() -> SharedCache:
+    """Process-wide cache on the SHARED_CACHE_URL backend"""
+    return SharedCache(backend_from_url(SHARED_CACHE_URL))
@@ -0,0 +1,146 @@
+"""
+Cold-start profile and benchmark of the API server.
+
+Scaled-to-zero machines pay for the import of server.py on every cold start, so provider SDKs and
+the research stack are imported on first use. This script reports where the import time goes
+(parsed from `python -X importtime`) and, with --check, fails when the median cold import exceeds
+the budget or when one of the lazily loaded modules is imported at startup again.
+
+Usage:
+    python startup_profile.py                 # import-time report
+    python startup_profile.py --check         # benchmark, exit status 1 on a regression
+    python startup_profile.py --check --runs 7 --budget 1.5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "2.0"))
+# Imported on first use only (rich still comes in through httpx's command line module)
+LAZY_MODULES = [
+    "google.generativeai",
+    "anthropic",
+    "statsmodels",
+    "scipy",
+    "firecrawl",
+    "typer",
+    "prompt_toolkit",
+    "tiktoken",
+    "deep_research",
+]
+# server.py constructs its clients at import, so provider keys only need to be present
+PLACEHOLDER_ENV = {
+    "OPENAI_API_KEY": "startup-profile",
+    "AZURE_OPENAI_API_KEY": "startup-profile",
+    "AZURE_OPENAI_ENDPOINT": "https://startup-profile.openai.azure.com",
+    "GEMINI_API_KEY": "startup-profile",
+    "AWS_ACCESS_KEY_ID": "startup-profile",
+    "AWS_SECRET_ACCESS_KEY": "startup-profile",
+    "AWS_REGION": "us-west-2",
+}
+TIMED_IMPORT = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "import server\n"
+    "elapsed = time.perf_counter() - start\n"
+    "print(json.dumps({'seconds': elapsed, 'modules': sorted(sys.modules)}))\n"
+)
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    for key, value in PLACEHOLDER_ENV.items():
+        env.setdefault(key, value)
+    return env
+
+
+def import_times() -> List[Tuple[str, int, int]]:
+    """(module, self microseconds, cumulative microseconds) of every module imported by server.py"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=ROOT, env=_env(), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import server failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def cold_import() -> Tuple[float, List[str]]:
+    """Seconds taken by `import server` in a fresh interpreter, and the modules it left loaded"""
+    result = subprocess.run([sys.executable, "-c", TIMED_IMPORT], cwd=ROOT, env=_env(), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import server failed:\n{result.stderr[-2000:]}")
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    return measurement["seconds"], measurement["modules"]
+
+
+def eager_lazy_modules(modules: List[str]) -> List[str]:
+    """Lazily loaded packages that were imported anyway"""
+    return [name for name in LAZY_MODULES if any(m == name or m.startswith(name + ".") for m in modules)]
+
+
+def report(top: int) -> Dict:
+    rows = import_times()
+    total = next((cumulative for name, _, cumulative in rows if name == "server"), sum(r[1] for r in rows))
+    # Top-level packages only: their cumulative time includes their submodules
+    packages: Dict[str, int] = {}
+    for name, _, cumulative in rows:
+        package = name.split(".")[0]
+        packages[package] = max(packages.get(package, 0), cumulative)
+    packages.pop("server", None)
+    return {
+        "import_seconds": round(total / 1e6, 3),
+        "modules": len(rows),
+        "slowest_packages": [
+            {"package": package, "seconds": round(us / 1e6, 3)}
+            for package, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        ],
+        "eager_lazy_modules": eager_lazy_modules([name for name, _, _ in rows]),
+    }
+
+
+def check(runs: int, budget: float) -> Dict:
+    timings, eager = [], set()
+    for _ in range(runs):
+        seconds, modules = cold_import()
+        timings.append(seconds)
+        eager.update(eager_lazy_modules(modules))
+    median = statistics.median(timings)
+    return {
+        "runs": runs,
+        "median_seconds": round(median, 3),
+        "max_seconds": round(max(timings), 3),
+        "budget_seconds": budget,
+        "eager_lazy_modules": sorted(eager),
+        "passed": median <= budget and not eager,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile and benchmark the cold start of the API server")
+    parser.add_argument("--check", action="store_true", help="Fail when the median cold start exceeds the budget")
+    parser.add_argument("--runs", type=int, default=5, help="Cold imports measured by --check")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS, help="Median cold start budget in seconds")
+    parser.add_argument("--top", type=int, default=15, help="Packages listed in the report")
+    args = parser.parse_args()
+    if args.check:
+        result = check(args.runs, args.budget)
+        print(json.dumps(result, indent=2))
+        sys.exit(0 if result["passed"] else 1)
+    print(json.dumps(report(args.top), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,26 +7,52 @@ The API endpoint is changed to Azure OpenAI API from Gemini API.
 
 import os
 import json
-from typing import List, Dict, Any
-import google.generativeai as genai
+from typing import List, Dict, Any, Tuple
+from functools import lru_cache
 from dotenv import load_dotenv
 from tenacity import retry, stop_after_attempt, wait_exponential
 from schema import Persona
 import time
 import asyncio
 from openai import AsyncAzureOpenAI
+from metrics import count_retry, gemini_provider, observe_call
 from SurveyTypes import Question
 from survey_meta_analysis.analysis_prompts import AnalysisPrompts
+from survey_meta_analysis.survey_statistics import SurveyStatistics
+from survey_meta_analysis.crosstab import CrosstabEngine, SegmentDefinition
 from schema import PersonaType
+from persona_history import count_tokens
 load_dotenv()
 
+# Token budget of the analysis results in the key findings prompt
+META_ANALYSIS_CONTEXT_TOKENS = int(os.getenv("META_ANALYSIS_CONTEXT_TOKENS", "24000"))
+# Longest lists kept, in turn, while the results exceed the budget. The computed lists (rank
+# correlations, divergences, segments, differences) are sorted strongest first.
+RESULT_LIST_LIMITS = [None, 20, 10, 5, 3, 1]
+
+
+@lru_cache(maxsize=1)
+def _genai():
+    """google.generativeai, imported when the first analysis is built"""
+    import google.generativeai as genai
+    return genai
+
+
+def _truncate_lists(value: Any, limit: int) -> Any:
+    """Copy of a JSON value with every list cut to its first limit entries"""
+    if isinstance(value, dict):
+        return {key: _truncate_lists(item, limit) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_truncate_lists(item, limit) for item in value[:limit]]
+    return value
+
 class SurveyMetaAnalysis:
     """
     Analyzes overall survey patterns and persona alignments across all questions.
     Uses Azure OpenAI API for generating structured insights about survey-wide patterns.
     """
     
-    def __init__(self, persona_data: List[Dict[str, Any]], response_distributions: List[Dict[str, Any]], questions: List[Question], persona_type: PersonaType):
+    def __init__(self, persona_data: List[Dict[str, Any]], response_distributions: List[Dict[str, Any]], questions: List[Question], persona_type: PersonaType, persona_responses: Dict[str, List[Dict[str, Any]]] = None, ordered_options: Dict[str, List[str]] = None, segments: List[SegmentDefinition] = None, weights: Dict[str, float] = None, context_token_budget: int = META_ANALYSIS_CONTEXT_TOKENS):
         """
         Initialize with survey responses and questions.
         
@@ -35,11 +61,22 @@ class SurveyMetaAnalysis:
             response_distributions: List of response distributions for each question
             questions: List of questions asked in the survey
             persona_type: Type of persona being analyzed
+            persona_responses: Raw per-persona responses keyed by question id, used for the local statistics
+            ordered_options: NEGATIVE to POSITIVE option order keyed by question id, for ordinal questions
+            segments: Segment definitions for the demographic crosstabs, defaults to the persona type's segments
+            weights: Sampling weight per persona id, for surveys of a stratified sample
+            context_token_budget: Maximum tokens of the analysis results in the key findings prompt
         """
         self.persona_data = persona_data
         self.response_distributions = response_distributions
         self.questions = {q.id: q for q in questions}
         self.persona_type = persona_type
+        self.context_token_budget = context_token_budget
+        self._distribution_context = None
+        self.survey_statistics = SurveyStatistics(persona_data, persona_responses or {}, self.questions, ordered_options=ordered_options, weights=weights)
+        self._statistical_analysis = None
+        self._statistical_analysis_lock = asyncio.Lock()
+        self.crosstabs = CrosstabEngine(persona_data, persona_responses or {}, self.questions, persona_type, segments=segments, ordered_options=ordered_options, weights=weights)
         
         gemini_api_key = os.getenv("GEMINI_API_KEY")
         self.azure_openai_api_key = os.getenv("AZURE_OPENAI_API_KEY")
@@ -47,6 +84,7 @@ class SurveyMetaAnalysis:
         if not gemini_api_key:
             raise ValueError("GEMINI_API_KEY environment variable is required")
             
+        genai = _genai()
         genai.configure(api_key=gemini_api_key)
         self.model = genai.GenerativeModel('gemini-2.0-flash-001')
         self.azure_openai_client = AsyncAzureOpenAI(
@@ -58,28 +96,103 @@ class SurveyMetaAnalysis:
 
     async def analyze_persona_alignment(self) -> Dict[str, Any]:
         """Analyze how different persona types align in their responses."""
-        response_data = self._format_persona_data()
-        distribution_data = self._format_response_distributions()
-
-        prompt = AnalysisPrompts.get_alignment_prompt(self.persona_type, response_data, distribution_data)
-        return await self._get_gemini_response(prompt)
+        alignment_analysis, _ = await self.analyze_alignment_and_consistency()
+        return alignment_analysis
 
     async def analyze_response_consistency(self) -> Dict[str, Any]:
         """Analyze how consistent personas are across different questions."""
-        response_data = self._format_persona_data()
-        distribution_data = self._format_response_distributions()
+        _, consistency_analysis = await self.analyze_alignment_and_consistency()
+        return consistency_analysis
 
-        prompt = AnalysisPrompts.get_consistency_prompt(self.persona_type, response_data, distribution_data)
-        return await self._get_gemini_response(prompt)
+    async def analyze_alignment_and_consistency(self) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Compute alignment and consistency metrics locally and narrate them with a single LLM call.
+        The result is computed once and shared by analyze_persona_alignment and analyze_response_consistency.
+        """
+        async with self._statistical_analysis_lock:
+            if self._statistical_analysis is None:
+                statistics = self.survey_statistics.compute()
+                prompt = AnalysisPrompts.get_statistics_narrative_prompt(
+                    self.persona_type, json.dumps(statistics), self._format_response_distributions()
+                )
+                narrative = await self._get_gemini_response(prompt)
+                self._statistical_analysis = self._merge_statistics_narrative(statistics, narrative)
+            return self._statistical_analysis
 
+    def _merge_statistics_narrative(self, statistics: Dict[str, Any], narrative: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Combine the computed numbers with the narrative text into the alignment and consistency result shapes."""
+        group_traits = narrative.get("group_traits") or {}
+        group_patterns = narrative.get("group_patterns") or {}
+        segments = statistics["alignment"]["segments"]
+        most_aligned = segments[0] if segments else {}
+        alignment_analysis = {
+            "most_aligned_group": {
+                "group_name": most_aligned.get("group"),
+                "alignment_score": most_aligned.get("alignment_score"),
+                "member_count": most_aligned.get("size", 0),
+                "key_characteristics": narrative.get("key_characteristics", [])
+            },
+            "alignment_patterns": [
+                {
+                    "group": segment["group"],
+                    "score": segment["alignment_score"],
+                    "size": segment["size"],
+                    "common_traits": group_traits.get(segment["group"], [])
+                }
+                for segment in segments
+            ],
+            "notable_outliers": narrative.get("notable_outliers", []),
+            "statistics": statistics["alignment"]
+        }
+
+        consistency = statistics["consistency"]
+        consistency_analysis = {
+            "overall_consistency": {
+                "score": consistency.get("overall"),
+                "confidence_level": consistency.get("confidence_level"),
+                "influential_factors": narrative.get("influential_factors", [])
+            },
+            "consistency_by_group": [
+                {
+                    "group": group["group"],
+                    "consistency_score": group["consistency_score"],
+                    "pattern_description": group_patterns.get(group["group"], "")
+                }
+                for group in consistency.get("by_segment", [])
+            ],
+            "response_trends": narrative.get("response_trends", []),
+            "statistics": {
+                "questions": statistics["questions"],
+                "rank_correlations": statistics["rank_correlations"],
+                "entropy_drift": statistics["entropy_drift"]
+            }
+        }
+        if "error" in narrative:
+            alignment_analysis["error"] = consistency_analysis["error"] = narrative["error"]
+        return alignment_analysis, consistency_analysis
 
     async def analyze_demographic_insights(self) -> Dict[str, Any]:
-        """Generate insights about how different demographic groups respond."""
-        response_data = self._format_persona_data()
+        """Generate insights about how different demographic groups respond, from the significant crosstab differences."""
+        differences = self.crosstabs.top_differences()
+        segment_sizes = self.crosstabs.segment_sizes()
         distribution_data = self._format_response_distributions()
 
-        prompt = AnalysisPrompts.get_demographic_prompt(self.persona_type, response_data, distribution_data)
-        return await self._get_gemini_response(prompt)
+        if differences:
+            prompt = AnalysisPrompts.get_demographic_narrative_prompt(
+                self.persona_type, json.dumps(differences), json.dumps(segment_sizes), distribution_data
+            )
+            demographic_insights = await self._get_gemini_response(prompt)
+        else:
+            demographic_insights = {
+                "role_based_insights": [],
+                "experience_level_insights": [],
+                "demographic_correlations": []
+            }
+        demographic_insights["statistics"] = {
+            "segment_sizes": segment_sizes,
+            "significant_differences": differences
+        }
+        return demographic_insights
 
     async def generate_key_findings(self, alignment_results: Dict[str, Any] = None, consistency_results: Dict[str, Any] = None, demographic_results: Dict[str, Any] = None) -> Dict[str, Any]:
         """Generate overall key findings from the survey."""
@@ -94,12 +207,16 @@ class SurveyMetaAnalysis:
             demographic_results = await self.analyze_demographic_insights()
 
 
+        analysis_results = self._format_analysis_results({
+            "Alignment Analysis": alignment_results,
+            "Consistency Analysis": consistency_results,
+            "Demographic Analysis": demographic_results
+        })
+
         prompt = f"""
         Generate key findings based on the following analysis results:
         
-        Alignment Analysis: {json.dumps(alignment_results)}
-        Consistency Analysis: {json.dumps(consistency_results)}
-        Demographic Analysis: {json.dumps(demographic_results)}
+        {analysis_results}
 
         Generate a concise summary of the most important findings.
 
@@ -129,58 +246,50 @@ class SurveyMetaAnalysis:
         """
         return await self._get_gemini_response(prompt)
 
-    def _format_persona_data(self) -> str:
-        """Format response data for prompt inclusion."""
-        formatted_data = []
-        for persona in self.persona_data:
-            data = f"""
-            Persona Description:
-            Name: {persona.name}
-            Role: {persona.role}
-            Personality: {persona.personality_summary}
-            
-            Responses:
-            """
-            
-            for response in persona.conversation_history:
-                data += f"\n- {response['question']}\n  {response['summary']}"
-            
-            formatted_data.append(data)
-                
-        return "\n---\n".join(formatted_data)
+    def _format_analysis_results(self, results: Dict[str, Dict[str, Any]]) -> str:
+        """
+        Render the analysis results for the key findings prompt within context_token_budget.
+        The rank correlations alone grow with the square of the question count, so while the
+        results exceed the budget their lists are cut to ever fewer leading entries.
+        """
+        for limit in RESULT_LIST_LIMITS:
+            text = "\n        ".join(f"{name}: {json.dumps(_truncate_lists(result, limit))}" for name, result in results.items())
+            if count_tokens(text) <= self.context_token_budget:
+                break
+        if limit is not None:
+            print(f"[SurveyMetaAnalysis][_format_analysis_results] Lists cut to {limit} entries to fit {self.context_token_budget} tokens")
+            text += f"\n        (Longer lists are cut to their first {limit} entries, strongest first.)"
+        return text
 
     def _format_response_distributions(self) -> str:
         """
-        Format response distributions data into a readable string format.
+        Format response distributions data into a compact table, one row per question.
         Handles any response options dynamically.
         
         Returns:
             str: Formatted string showing distribution percentages for each question
         """
-        dist_section = "Response Distributions Analysis:\n"
-        
-        for q_id, distributions in self.response_distributions.items():
-            question = self.questions.get(q_id)
-            if question:
-                dist_section += f"\nQuestion {q_id}: {question.text}\n"
-            else:
-                print(f"[SurveyMetaAnalysis][_format_response_distributions] Warning: Question with ID {q_id} not found")
-            
-            # Simply display whatever options and percentages exist in the data
-            for response_option, percentage in distributions.items():
-                dist_section += f"- {response_option}: {percentage:.1%}\n"
-        
-        return dist_section
+        if self._distribution_context is None:
+            rows = ["Response Distributions Analysis (question | option share, ...):"]
+            for q_id, distributions in self.response_distributions.items():
+                question = self.questions.get(q_id)
+                if not question:
+                    print(f"[SurveyMetaAnalysis][_format_response_distributions] Warning: Question with ID {q_id} not found")
+                question_text = question.text if question else ""
+                shares = ", ".join(f"{option} {share:.1%}" for option, share in distributions.items())
+                rows.append(f"Q{q_id} {question_text} | {shares}")
+            self._distribution_context = "\n".join(rows)
+        return self._distribution_context
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), before_sleep=count_retry("meta_analysis", gemini_provider))
     async def _get_azure_openai_response(self, prompt: str) -> Dict[str, Any]:
         """Get structured response from Gemini API."""
         try:
-            response = await self.azure_openai_client.chat.completions.create(
+            response = await observe_call("meta_analysis", "azure", self.azure_openai_client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[{"role": "user", "content": prompt}],
                 response_format={"type": "json_object"}
-            )
+            ))
             response_data = json.loads(response.choices[0].message.content)
             if isinstance(response_data, dict):
                 return response_data
@@ -190,19 +299,19 @@ class SurveyMetaAnalysis:
         except Exception as e:
             return {"[SurveyMetaAnalysis][_get_azure_openai_response] error": str(e)}
         
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10), before_sleep=count_retry("meta_analysis", gemini_provider))
     async def _get_gemini_response(self, prompt: str) -> Dict[str, Any]:
         """Get structured response from Gemini API."""
         try:
             if self.use_azure_openai:
                 return await self._get_azure_openai_response(prompt)
             else:
-                response = await self.model.generate_content_async(
+                response = await observe_call("meta_analysis", "gemini", self.model.generate_content_async(
                     prompt,
-                    generation_config=genai.GenerationConfig(
+                    generation_config=_genai().GenerationConfig(
                         response_mime_type="application/json"
                     )
-                )
+                ))
                 response_data = json.loads(response.text)
                 if isinstance(response_data, dict):
                     return response_data
@@ -216,9 +325,8 @@ class SurveyMetaAnalysis:
         """Generate complete survey analysis including all aspects."""
         start_time = time.time()
         
-        alignment_analysis, consistency_analysis, demographic_insights = await asyncio.gather(
-            self.analyze_persona_alignment(),
-            self.analyze_response_consistency(),
+        (alignment_analysis, consistency_analysis), demographic_insights = await asyncio.gather(
+            self.analyze_alignment_and_consistency(),
             self.analyze_demographic_insights()
         )
 
@@ -0,0 +1,402 @@
+"""
+Background survey jobs backed by a SQLite job store.
+
+POST /survey/jobs stores the request as a queued job and returns its id straight away. Every API
+worker process runs a SurveyJobRunner that claims queued jobs from the shared database and runs
+them, at most max_workers at a time. The simulation status is written back as it changes, so any
+worker can answer GET /survey/jobs/{id}.
+
+Progress events (status changes, persona results, provisional aggregates, per-question statistics)
+are appended to an event log per job, which GET /survey/jobs/{id}/events streams as server-sent
+events. A writer task per job stores them in batches off the event loop, and the log of a job is
+deleted JOB_EVENT_RETENTION_SECONDS after it finished.
+
+Running jobs renew a lease (heartbeat). A job whose lease expired, e.g. because its worker was
+restarted, is claimed again and rerun by the next runner that polls the store.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import time
+import traceback
+import uuid
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+from SurveyTypes import SurveyRequest
+from survey_status import SimulationStatus
+from survey_runs import _json_default
+from admission import survey_cost
+
+JOB_DB_PATH = os.getenv("SURVEY_JOB_DB", "survey_jobs.db")
+JOB_WORKERS = int(os.getenv("SURVEY_JOB_WORKERS", "2"))
+JOB_LEASE_SECONDS = int(os.getenv("SURVEY_JOB_LEASE_SECONDS", "120"))
+JOB_POLL_SECONDS = float(os.getenv("SURVEY_JOB_POLL_SECONDS", "2"))
+JOB_EVENT_RETENTION_SECONDS = int(os.getenv("SURVEY_JOB_EVENT_RETENTION_SECONDS", "3600"))
+EVENT_PRUNE_INTERVAL_SECONDS = 300
+STATUS_WRITE_INTERVAL_SECONDS = 1.0
+
+
+class JobState(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class SurveyJobStore:
+    """
+    Persists survey jobs in SQLite. A connection is opened per operation so the store can be used
+    from any thread, and WAL mode lets several processes read while one writes.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH, lease_seconds: int = JOB_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS survey_jobs (
+                    id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    status TEXT,
+                    result TEXT,
+                    error TEXT,
+                    worker TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    heartbeat_at REAL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_survey_jobs_state ON survey_jobs (state, created_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS survey_job_events (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_survey_job_events_job ON survey_job_events (job_id, seq)")
+
+    def create_job(self, survey: SurveyRequest) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO survey_jobs (id, state, request, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, JobState.QUEUED.value, survey.model_dump_json(), now, now)
+            )
+        return job_id
+
+    def claim_next_job(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest queued job, or a running job whose lease expired"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                """
+                SELECT id, request FROM survey_jobs
+                WHERE state = ? OR (state = ? AND heartbeat_at < ?)
+                ORDER BY created_at LIMIT 1
+                """,
+                (JobState.QUEUED.value, JobState.RUNNING.value, now - self.lease_seconds)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE survey_jobs SET state = ?, worker = ?, attempts = attempts + 1, heartbeat_at = ?, updated_at = ? WHERE id = ?",
+                (JobState.RUNNING.value, worker, now, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        return {"id": row["id"], "request": SurveyRequest.model_validate_json(row["request"])}
+
+    def heartbeat(self, job_id: str, worker: str):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE survey_jobs SET heartbeat_at = ? WHERE id = ? AND worker = ? AND state = ?",
+                (now, job_id, worker, JobState.RUNNING.value)
+            )
+
+    def finish_job(self, job_id: str, worker: str, status: Optional[SimulationStatus], result: Dict[str, Any] = None, error: str = None):
+        now = time.time()
+        state = JobState.FAILED if error else JobState.COMPLETED
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE survey_jobs SET state = ?, status = COALESCE(?, status), result = ?, error = ?, heartbeat_at = ?, updated_at = ? WHERE id = ? AND worker = ?",
+                (
+                    state.value,
+                    status.model_dump_json() if status else None,
+                    json.dumps(result, default=_json_default) if result is not None else None,
+                    error,
+                    now,
+                    now,
+                    job_id,
+                    worker
+                )
+            )
+
+    def append_event(self, job_id: str, event_type: str, data: Dict[str, Any]):
+        self.record_progress(job_id, None, None, [(event_type, data)])
+
+    def record_progress(self, job_id: str, worker: Optional[str], status: Optional[SimulationStatus], events: List[Tuple[str, Dict[str, Any]]]):
+        """Append a batch of events and store the latest status (renewing the lease) in one transaction"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if status is not None:
+                conn.execute(
+                    "UPDATE survey_jobs SET status = ?, heartbeat_at = ?, updated_at = ? WHERE id = ? AND worker = ?",
+                    (status.model_dump_json(), now, now, job_id, worker)
+                )
+            conn.executemany(
+                "INSERT INTO survey_job_events (job_id, type, data, created_at) VALUES (?, ?, ?, ?)",
+                [(job_id, event_type, json.dumps(data, default=_json_default), now) for event_type, data in events]
+            )
+            conn.execute("COMMIT")
+
+    def prune_events(self, retention_seconds: float = JOB_EVENT_RETENTION_SECONDS) -> int:
+        """Delete the event logs of jobs that finished more than retention_seconds ago"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                DELETE FROM survey_job_events WHERE job_id IN (
+                    SELECT id FROM survey_jobs WHERE state IN (?, ?) AND updated_at < ?
+                )
+                """,
+                (JobState.COMPLETED.value, JobState.FAILED.value, time.time() - retention_seconds)
+            )
+        return cursor.rowcount
+
+    def get_events(self, job_id: str, after_seq: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        """Events of a job in order, starting after the given sequence number"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT seq, type, data FROM survey_job_events WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (job_id, after_seq, limit)
+            ).fetchall()
+        return [{"seq": row["seq"], "type": row["type"], "data": row["data"]} for row in rows]
+
+    def count_by_state(self) -> Dict[str, int]:
+        """Number of jobs in each state"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT state, COUNT(*) AS count FROM survey_jobs GROUP BY state").fetchall()
+        counts = {state.value: 0 for state in JobState}
+        counts.update({row["state"]: row["count"] for row in rows})
+        return counts
+
+    def get_state(self, job_id: str) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT state FROM survey_jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["state"] if row else None
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM survey_jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row["id"],
+            "state": row["state"],
+            "status": json.loads(row["status"]) if row["status"] else None,
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+
+
+async def stream_job_events(store: SurveyJobStore, job_id: str, last_event_id: int = 0, poll_seconds: float = 0.5, keepalive_seconds: float = 15.0):
+    """
+    Yield the events of a job formatted as server-sent events until the job completed or failed.
+    Clients that reconnect with Last-Event-ID continue where they left off.
+    """
+    seq = last_event_id
+    last_sent = time.time()
+    while True:
+        events = await asyncio.to_thread(store.get_events, job_id, seq)
+        for event in events:
+            seq = event["seq"]
+            yield f"id: {seq}\nevent: {event['type']}\ndata: {event['data']}\n\n"
+            last_sent = time.time()
+        if not events:
+            state = await asyncio.to_thread(store.get_state, job_id)
+            if state in (JobState.COMPLETED.value, JobState.FAILED.value, None):
+                # Drain anything written between the last read and the state change
+                if not await asyncio.to_thread(store.get_events, job_id, seq):
+                    return
+                continue
+            if time.time() - last_sent >= keepalive_seconds:
+                yield ": keepalive\n\n"
+                last_sent = time.time()
+            await asyncio.sleep(poll_seconds)
+
+
+class SurveyJobRunner:
+    """
+    Claims jobs from the store and runs them in the background, at most max_workers at a time.
+    """
+
+    def __init__(self, store: SurveyJobStore, max_workers: int = JOB_WORKERS, poll_seconds: float = JOB_POLL_SECONDS, admission=None):
+        self.store = store
+        # AdmissionController the jobs wait on before running, if any
+        self.admission = admission
+        self.max_workers = max_workers
+        self.poll_seconds = poll_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._slots = asyncio.Semaphore(max_workers)
+        self._wakeup = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._pruned_at = 0.0
+
+    def start(self):
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        """Stop claiming jobs and cancel the running ones. Their leases expire and another worker picks them up."""
+        tasks = list(self._running.values())
+        if self._dispatcher:
+            tasks.append(self._dispatcher)
+            self._dispatcher = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def submit(self, survey: SurveyRequest) -> str:
+        """Queue a survey and wake the dispatcher"""
+        job_id = await asyncio.to_thread(self.store.create_job, survey)
+        self._wakeup.set()
+        return job_id
+
+    async def _dispatch_loop(self):
+        while True:
+            await self._slots.acquire()
+            try:
+                job = await asyncio.to_thread(self.store.claim_next_job, self.worker_id)
+            except Exception as e:
+                print(f"[SurveyJobRunner][_dispatch_loop] Error claiming job: {str(e)}")
+                job = None
+            if job is None:
+                self._slots.release()
+                await self._prune_events()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._running[job["id"]] = asyncio.create_task(self._run_job(job["id"], job["request"]))
+
+    async def _prune_events(self):
+        """Drop expired event logs, at most once per EVENT_PRUNE_INTERVAL_SECONDS"""
+        if time.time() - self._pruned_at < EVENT_PRUNE_INTERVAL_SECONDS:
+            return
+        self._pruned_at = time.time()
+        try:
+            deleted = await asyncio.to_thread(self.store.prune_events)
+            if deleted:
+                print(f"[SurveyJobRunner] Pruned {deleted} events of finished jobs")
+        except Exception as e:
+            print(f"[SurveyJobRunner][_prune_events] Error: {str(e)}")
+
+    async def _write_progress(self, job_id: str, progress: Dict[str, Any], wakeup: asyncio.Event):
+        """
+        Store the events and status the simulation reports, in a thread. Whatever is reported while
+        a write is in progress goes into the next write, so a busy run makes few large writes.
+        """
+        while True:
+            await wakeup.wait()
+            wakeup.clear()
+            events, progress["events"] = progress["events"], []
+            status, progress["status"] = progress["status"], None
+            if not events and status is None:
+                continue
+            try:
+                await asyncio.to_thread(self.store.record_progress, job_id, self.worker_id, status, events)
+            except Exception as e:
+                print(f"[SurveyJobRunner][_write_progress] Error storing progress of job {job_id}: {str(e)}")
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.store.lease_seconds / 3)
+            await asyncio.to_thread(self.store.heartbeat, job_id, self.worker_id)
+
+    async def _run_job(self, job_id: str, survey: SurveyRequest):
+        # Imported here so importing this module does not pull in the LLM clients
+        from survey_simulation import run_survey_request
+
+        last_write = {"time": 0.0, "stage": None}
+        latest = {"status": None}
+        # Reported by the simulation and not yet stored by the writer task
+        progress = {"events": [], "status": None}
+        wakeup = asyncio.Event()
+
+        def on_status(status: SimulationStatus):
+            # Persist stage changes right away and progress updates at most once per interval
+            latest["status"] = status
+            now = time.time()
+            if status.stage != last_write["stage"] or now - last_write["time"] >= STATUS_WRITE_INTERVAL_SECONDS:
+                last_write.update(time=now, stage=status.stage)
+                progress["status"] = status.model_copy()
+                progress["events"].append(("status", status.model_dump(mode="json")))
+                wakeup.set()
+
+        def on_event(event_type: str, data: Dict[str, Any]):
+            progress["events"].append((event_type, data))
+            wakeup.set()
+
+        async def flush_progress():
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+            if progress["events"] or progress["status"] is not None:
+                try:
+                    await asyncio.to_thread(self.store.record_progress, job_id, self.worker_id, progress["status"], progress["events"])
+                except Exception as e:
+                    print(f"[SurveyJobRunner][_run_job] Error storing progress of job {job_id}: {str(e)}")
+
+        writer = asyncio.create_task(self._write_progress(job_id, progress, wakeup))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            print(f"[SurveyJobRunner] Running job {job_id} on {self.worker_id}")
+            # The job id doubles as the run id, so a job claimed again after a restart resumes from its checkpoints
+            if self.admission is None:
+                result = await run_survey_request(survey, on_status=on_status, on_event=on_event, run_id=job_id)
+            else:
+                # Jobs are queued durably, so they wait for capacity instead of being rejected
+                async with self.admission.admit(survey_cost(survey.number_of_personas, len(survey.questions)), wait=True):
+                    result = await run_survey_request(survey, on_status=on_status, on_event=on_event, run_id=job_id)
+            await flush_progress()
+            await asyncio.to_thread(self.store.finish_job, job_id, self.worker_id, latest["status"], result=result)
+            await asyncio.to_thread(self.store.append_event, job_id, "completed", {"job_id": job_id})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[SurveyJobRunner] Job {job_id} failed: {str(e)}")
+            print(traceback.format_exc())
+            await flush_progress()
+            await asyncio.to_thread(self.store.finish_job, job_id, self.worker_id, latest["status"], error=str(e))
+            await asyncio.to_thread(self.store.append_event, job_id, "failed", {"job_id": job_id, "error": str(e)})
+        finally:
+            writer.cancel()
+            heartbeat.cancel()
+            self._running.pop(job_id, None)
+            self._slots.release()
+            self._wakeup.set()
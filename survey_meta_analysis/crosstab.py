@@ -0,0 +1,241 @@
+"""
+Demographic crosstabs over persona attributes.
+
+Personas are split into segments (rating band, tenure, use case, ...) and every question is
+cross-tabulated against every segment definition. Each persona contributes its response
+distribution, scaled by its sampling weight, as one soft response. A chi-square test of
+independence is run on each segment x option table, so the demographic narrative only needs
+the differences that are statistically significant.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Callable
+import numpy as np
+from schema import Persona, PersonaType
+from SurveyTypes import Question
+from survey_meta_analysis.survey_statistics import rating_band, build_response_matrices
+
+
+@dataclass
+class SegmentDefinition:
+    """A named way of assigning personas to segments. extract returns None for unknown values."""
+    name: str
+    extract: Callable[[Persona], Optional[str]]
+    min_segment_size: int = 3
+
+
+def attribute_segment(name: str, field: str) -> SegmentDefinition:
+    """Segment personas by the (normalized) value of a Persona field."""
+    def extract(persona: Persona) -> Optional[str]:
+        value = getattr(persona, field, None)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            return None
+        return str(value).strip()
+    return SegmentDefinition(name=name, extract=extract)
+
+
+def bucket_segment(name: str, field: str, buckets: List[tuple]) -> SegmentDefinition:
+    """Segment personas by numeric ranges of a Persona field. buckets: [(label, lower, upper)], bounds inclusive."""
+    def extract(persona: Persona) -> Optional[str]:
+        value = getattr(persona, field, None)
+        if value is None:
+            return None
+        for label, lower, upper in buckets:
+            if lower <= value <= upper:
+                return label
+        return None
+    return SegmentDefinition(name=name, extract=extract)
+
+
+TENURE_PATTERN = re.compile(r"(more|less) than (an?|\d+) years?", re.IGNORECASE)
+
+
+def employment_tenure(persona: Persona) -> Optional[str]:
+    """Parse the tenure band from employment_status, e.g. 'Former employee, more than 10 years' -> '10+ years'."""
+    if not persona.employment_status:
+        return None
+    match = TENURE_PATTERN.search(persona.employment_status)
+    if not match:
+        return None
+    direction, amount = match.group(1).lower(), match.group(2).lower()
+    years = 1 if amount in ("a", "an") else int(amount)
+    if direction == "less":
+        return f"<{years} years"
+    if years >= 10:
+        return "10+ years"
+    if years >= 5:
+        return "5-10 years"
+    if years >= 3:
+        return "3-5 years"
+    return "1-3 years"
+
+
+def employment_type(persona: Persona) -> Optional[str]:
+    """Current or former employee, from employment_status."""
+    status = (persona.employment_status or "").lower()
+    if status.startswith("current"):
+        return "Current employee"
+    if status.startswith("former"):
+        return "Former employee"
+    return None
+
+
+def rating_band_segment(persona: Persona) -> Optional[str]:
+    band = rating_band(persona)
+    return None if band == "unrated" else band
+
+
+DEFAULT_SEGMENTS: Dict[PersonaType, List[SegmentDefinition]] = {
+    PersonaType.INTEL_EMPLOYEE: [
+        SegmentDefinition("rating_band", rating_band_segment),
+        SegmentDefinition("tenure", employment_tenure),
+        SegmentDefinition("employment_type", employment_type),
+        attribute_segment("location", "location"),
+        attribute_segment("recommends", "recommend"),
+    ],
+    PersonaType.INTEL_PRODUCT_REVIEWER: [
+        SegmentDefinition("rating_band", rating_band_segment),
+        attribute_segment("use_case", "use_case"),
+        attribute_segment("technical_level", "technical_level"),
+        attribute_segment("product_category", "product_category"),
+        attribute_segment("location", "location"),
+    ],
+}
+
+
+class CrosstabEngine:
+    """
+    Cross-tabulates every question against every segment definition.
+    """
+
+    def __init__(self, persona_data: List[Persona], persona_responses: Dict[str, List[Dict[str, Any]]], questions: Dict[str, Question], persona_type: PersonaType, segments: List[SegmentDefinition] = None, ordered_options: Dict[str, List[str]] = None, weights: Dict[str, float] = None):
+        """
+        Args:
+            persona_data: Personas that took part in the survey
+            persona_responses: Raw persona responses (persona_id, distribution, error) keyed by question id
+            questions: Questions asked in the survey keyed by question id
+            persona_type: Type of persona, used to pick the default segment definitions
+            segments: Segment definitions to use instead of the defaults
+            ordered_options: NEGATIVE to POSITIVE option order keyed by question id
+            weights: Optional sampling weight per persona id
+        """
+        self.persona_data = persona_data
+        self.persona_ids = [persona.id for persona in persona_data]
+        self.questions = questions
+        self.segments = segments if segments is not None else DEFAULT_SEGMENTS.get(persona_type, [])
+        self.weights = np.array([(weights or {}).get(pid, 1.0) for pid in self.persona_ids], dtype=float)
+        self.question_ids = [q_id for q_id in questions if q_id in persona_responses]
+        self.options, self.matrices = build_response_matrices(self.persona_ids, persona_responses, questions, self.question_ids, ordered_options or {})
+        self._results: Optional[Dict[str, Any]] = None
+
+    def _labels(self, definition: SegmentDefinition) -> tuple:
+        """Return (segment labels, one-hot membership matrix S x N). Small segments are folded into 'Other'."""
+        raw = [definition.extract(persona) for persona in self.persona_data]
+        counts: Dict[str, int] = {}
+        for label in raw:
+            if label is not None:
+                counts[label] = counts.get(label, 0) + 1
+        labels = [
+            (label if counts[label] >= definition.min_segment_size else "Other") if label is not None else None
+            for label in raw
+        ]
+        names = sorted({label for label in labels if label is not None})
+        index = {name: i for i, name in enumerate(names)}
+        membership = np.zeros((len(names), len(labels)))
+        for j, label in enumerate(labels):
+            if label is not None:
+                membership[index[label], j] = 1.0
+        return names, membership
+
+    @staticmethod
+    def chi_square(observed: np.ndarray) -> Dict[str, Any]:
+        """Chi-square test of independence on a (soft) contingency table, ignoring empty rows and columns."""
+        observed = observed[observed.sum(axis=1) > 0][:, observed.sum(axis=0) > 0]
+        rows, cols = observed.shape
+        total = observed.sum()
+        if rows < 2 or cols < 2 or total == 0:
+            return {"chi2": None, "dof": 0, "p_value": None, "cramers_v": None}
+        expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / total
+        statistic = float(((observed - expected) ** 2 / expected).sum())
+        dof = (rows - 1) * (cols - 1)
+        # scipy.stats costs over half a second to import, so it is only loaded by the first test
+        from scipy.stats import chi2
+        cramers_v = float(np.sqrt(statistic / (total * min(rows - 1, cols - 1))))
+        return {
+            "chi2": round(statistic, 4),
+            "dof": dof,
+            "p_value": float(chi2.sf(statistic, dof)),
+            "cramers_v": round(cramers_v, 4)
+        }
+
+    def compute(self) -> Dict[str, Any]:
+        """Segment sizes, weighted mean distributions and significance tests for every segment definition and question."""
+        if self._results is not None:
+            return self._results
+        results = {}
+        for definition in self.segments:
+            names, membership = self._labels(definition)
+            if len(names) < 2:
+                continue
+            weighted_membership = membership * self.weights
+            questions = {}
+            for q_id in self.question_ids:
+                matrix = self.matrices[q_id]
+                answered = ~np.isnan(matrix).any(axis=1)
+                # Segment x option table of weighted soft counts
+                observed = weighted_membership[:, answered] @ matrix[answered]
+                segment_totals = observed.sum(axis=1)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    distributions = np.where(segment_totals[:, None] > 0, observed / segment_totals[:, None], 0.0)
+                questions[q_id] = {
+                    "distributions": {
+                        name: {option: round(float(share), 4) for option, share in zip(self.options[q_id], distributions[i])}
+                        for i, name in enumerate(names) if segment_totals[i] > 0
+                    },
+                    "overall": {
+                        option: round(float(share), 4)
+                        for option, share in zip(self.options[q_id], observed.sum(axis=0) / max(observed.sum(), 1e-12))
+                    },
+                    "respondents": {name: int(membership[i, answered].sum()) for i, name in enumerate(names)},
+                    **self.chi_square(observed)
+                }
+            results[definition.name] = {
+                "segment_sizes": {name: int(membership[i].sum()) for i, name in enumerate(names)},
+                "weighted_sizes": {name: round(float(weighted_membership[i].sum()), 4) for i, name in enumerate(names)},
+                "questions": questions
+            }
+        self._results = results
+        return results
+
+    def top_differences(self, limit: int = 10, alpha: float = 0.05) -> List[Dict[str, Any]]:
+        """
+        The statistically significant segment differences, strongest first. For each significant table
+        the segment/option cell that deviates most from the overall share is reported.
+        """
+        differences = []
+        for segment_name, result in self.compute().items():
+            for q_id, table in result["questions"].items():
+                if table["p_value"] is None or table["p_value"] >= alpha:
+                    continue
+                best = None
+                for segment, distribution in table["distributions"].items():
+                    for option, share in distribution.items():
+                        delta = share - table["overall"].get(option, 0.0)
+                        if best is None or abs(delta) > abs(best["difference"]):
+                            best = {"segment": segment, "option": option, "segment_share": share, "overall_share": table["overall"].get(option, 0.0), "difference": round(delta, 4)}
+                if best is None:
+                    continue
+                differences.append({
+                    "segment_definition": segment_name,
+                    "question_id": q_id,
+                    "question": self.questions[q_id].text,
+                    "p_value": table["p_value"],
+                    "cramers_v": table["cramers_v"],
+                    "segment_size": result["segment_sizes"].get(best["segment"], 0),
+                    **best
+                })
+        return sorted(differences, key=lambda d: (d["p_value"], -(d["cramers_v"] or 0)))[:limit]
+
+    def segment_sizes(self) -> Dict[str, Dict[str, int]]:
+        return {name: result["segment_sizes"] for name, result in self.compute().items()}
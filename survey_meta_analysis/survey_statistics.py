@@ -0,0 +1,322 @@
+"""
+Exact survey-wide statistics for the meta analysis.
+
+These metrics used to be estimated by the LLM from the raw persona data. They are pure
+statistics over the per-persona response distributions, so they are computed here with NumPy
+and only the resulting numbers are handed to a single narrative LLM call.
+
+Metrics:
+- Per-question response entropy and agreement (1 - mean Jensen-Shannon divergence to the mean distribution)
+- Cross-question Spearman rank correlation of per-persona expected scores (ordered questions only)
+- Per-persona entropy drift across the survey (slope of normalized entropy over question order)
+- Per-persona consistency of expected scores across ordered questions
+- Inter-segment divergence and within-segment cohesion
+"""
+
+from typing import List, Dict, Any, Optional, Callable, Tuple
+import numpy as np
+from schema import Persona
+from SurveyTypes import Question
+
+
+def rating_band(persona: Persona) -> str:
+    """Default segment: the persona's rating band."""
+    if persona.rating is None:
+        return "unrated"
+    if persona.rating <= 2:
+        return "rating 1-2"
+    if persona.rating < 4:
+        return "rating 3"
+    return "rating 4-5"
+
+
+def entropy(probs: np.ndarray, axis: int = -1) -> np.ndarray:
+    """Shannon entropy normalized to [0, 1] by the number of options."""
+    n_options = probs.shape[axis]
+    if n_options < 2:
+        return np.zeros(np.delete(probs.shape, axis))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(probs > 0, probs * np.log(probs), 0.0)
+    return -terms.sum(axis=axis) / np.log(n_options)
+
+
+def js_divergence(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Jensen-Shannon divergence (base 2, in [0, 1]) along the last axis. Broadcasts."""
+    m = (p + q) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kl_pm = np.where(p > 0, p * np.log2(p / m), 0.0).sum(axis=-1)
+        kl_qm = np.where(q > 0, q * np.log2(q / m), 0.0).sum(axis=-1)
+    return (kl_pm + kl_qm) / 2
+
+
+def rankdata(values: np.ndarray) -> np.ndarray:
+    """Average ranks (ties share the mean rank)."""
+    order = np.argsort(values, kind="mergesort")
+    sorted_values = values[order]
+    ranks = np.empty(len(values), dtype=float)
+    ranks[order] = np.arange(1, len(values) + 1)
+    _, inverse, counts = np.unique(sorted_values, return_inverse=True, return_counts=True)
+    sums = np.bincount(inverse, weights=ranks[order])
+    ranks[order] = (sums / counts)[inverse]
+    return ranks
+
+
+def spearman(x: np.ndarray, y: np.ndarray) -> Optional[float]:
+    """Spearman rank correlation over the pairwise complete observations."""
+    mask = ~(np.isnan(x) | np.isnan(y))
+    if mask.sum() < 3:
+        return None
+    rx, ry = rankdata(x[mask]), rankdata(y[mask])
+    if rx.std() == 0 or ry.std() == 0:
+        return None
+    return float(np.corrcoef(rx, ry)[0, 1])
+
+
+def build_response_matrices(persona_ids: List[str], persona_responses: Dict[str, List[Dict[str, Any]]], questions: Dict[str, Question], question_ids: List[str], ordered_options: Dict[str, List[str]]) -> Tuple[Dict[str, List[str]], Dict[str, np.ndarray]]:
+    """
+    Build a personas x options probability matrix per question.
+    Personas without a valid answer are NaN rows. Options follow ordered_options when known.
+    """
+    row_index = {pid: i for i, pid in enumerate(persona_ids)}
+    options_by_question, matrices = {}, {}
+    for q_id in question_ids:
+        options = ordered_options.get(q_id) or [option.text for option in questions[q_id].options]
+        column_index = {option: j for j, option in enumerate(options)}
+        matrix = np.full((len(persona_ids), len(options)), np.nan)
+        for resp in persona_responses[q_id]:
+            if not isinstance(resp, dict) or resp.get("error") or not resp.get("distribution"):
+                continue
+            i = row_index.get(resp.get("persona_id"))
+            if i is None:
+                continue
+            matrix[i] = 0.0
+            for option, prob in resp["distribution"].items():
+                j = column_index.get(option)
+                if j is not None:
+                    matrix[i, j] = prob
+            total = matrix[i].sum()
+            if total > 0:
+                matrix[i] /= total
+        options_by_question[q_id] = options
+        matrices[q_id] = matrix
+    return options_by_question, matrices
+
+
+class SurveyStatistics:
+    """
+    Computes consistency and alignment metrics from per-persona response distributions.
+    """
+
+    def __init__(self, persona_data: List[Persona], persona_responses: Dict[str, List[Dict[str, Any]]], questions: Dict[str, Question], ordered_options: Dict[str, List[str]] = None, segment_by: Callable[[Persona], str] = rating_band, weights: Dict[str, float] = None):
+        """
+        Args:
+            persona_data: Personas that took part in the survey
+            persona_responses: Raw persona responses (persona_id, distribution, error) keyed by question id
+            questions: Questions asked in the survey keyed by question id, in survey order
+            ordered_options: NEGATIVE to POSITIVE option order for ordinal questions keyed by question id
+            segment_by: Function mapping a persona to its segment label
+            weights: Optional sampling weight per persona id
+        """
+        self.persona_data = persona_data
+        self.persona_ids = [persona.id for persona in persona_data]
+        self.questions = questions
+        self.ordered_options = ordered_options or {}
+        self.segments = np.array([segment_by(persona) for persona in persona_data])
+        self.weights = np.array([(weights or {}).get(pid, 1.0) for pid in self.persona_ids], dtype=float)
+        self.question_ids = [q_id for q_id in questions if q_id in persona_responses]
+        self.options, self.matrices = build_response_matrices(self.persona_ids, persona_responses, questions, self.question_ids, self.ordered_options)
+
+    def _answered(self, q_id: str) -> np.ndarray:
+        return ~np.isnan(self.matrices[q_id][:, 0]) if self.matrices[q_id].shape[1] else np.zeros(len(self.persona_ids), dtype=bool)
+
+    def _mean_distribution(self, q_id: str, mask: np.ndarray = None) -> Optional[np.ndarray]:
+        answered = self._answered(q_id)
+        if mask is not None:
+            answered = answered & mask
+        weights = self.weights[answered]
+        if not answered.any() or weights.sum() == 0:
+            return None
+        return np.average(self.matrices[q_id][answered], axis=0, weights=weights)
+
+    def expected_scores(self) -> Dict[str, np.ndarray]:
+        """Per-persona expected position (0 = most negative, 1 = most positive) for each ordered question."""
+        scores = {}
+        for q_id in self.question_ids:
+            if not self.ordered_options.get(q_id):
+                continue
+            n_options = len(self.options[q_id])
+            positions = np.linspace(0, 1, n_options) if n_options > 1 else np.zeros(1)
+            scores[q_id] = self.matrices[q_id] @ positions
+        return scores
+
+    def question_metrics(self) -> Dict[str, Any]:
+        """Entropy and agreement for each question."""
+        metrics = {}
+        for q_id in self.question_ids:
+            answered = self._answered(q_id)
+            mean_dist = self._mean_distribution(q_id)
+            if mean_dist is None:
+                continue
+            rows = self.matrices[q_id][answered]
+            divergences = js_divergence(rows, mean_dist)
+            metrics[q_id] = {
+                "respondents": int(answered.sum()),
+                "aggregate_entropy": round(float(entropy(mean_dist)), 4),
+                "mean_persona_entropy": round(float(np.average(entropy(rows), weights=self.weights[answered])), 4),
+                "agreement": round(float(1 - np.average(divergences, weights=self.weights[answered])), 4)
+            }
+        return metrics
+
+    def rank_correlations(self) -> List[Dict[str, Any]]:
+        """Spearman correlation of expected scores for every pair of ordered questions."""
+        scores = self.expected_scores()
+        q_ids = list(scores)
+        correlations = []
+        for a in range(len(q_ids)):
+            for b in range(a + 1, len(q_ids)):
+                rho = spearman(scores[q_ids[a]], scores[q_ids[b]])
+                if rho is not None:
+                    correlations.append({"question_a": q_ids[a], "question_b": q_ids[b], "spearman_rho": round(rho, 4)})
+        return sorted(correlations, key=lambda c: -abs(c["spearman_rho"]))
+
+    def entropy_drift(self) -> Dict[str, Any]:
+        """Slope of each persona's normalized entropy across the survey, in question order."""
+        if len(self.question_ids) < 2:
+            return {"mean_drift": None, "personas": []}
+        entropies = np.column_stack([
+            np.where(self._answered(q_id), entropy(np.nan_to_num(self.matrices[q_id])), np.nan)
+            for q_id in self.question_ids
+        ])
+        x = np.arange(len(self.question_ids), dtype=float)
+        drifts = np.full(len(self.persona_ids), np.nan)
+        for i, row in enumerate(entropies):
+            mask = ~np.isnan(row)
+            if mask.sum() >= 2:
+                drifts[i] = np.polyfit(x[mask], row[mask], 1)[0]
+        valid = ~np.isnan(drifts)
+        if not valid.any():
+            return {"mean_drift": None, "personas": []}
+        top = np.argsort(-np.abs(np.where(valid, drifts, 0)))[:5]
+        return {
+            "mean_drift": round(float(np.average(drifts[valid], weights=self.weights[valid])), 4),
+            "personas": [
+                {"persona_id": self.persona_ids[i], "drift": round(float(drifts[i]), 4)}
+                for i in top if valid[i]
+            ]
+        }
+
+    def persona_consistency(self) -> np.ndarray:
+        """Consistency in [0, 1] per persona: 1 - 2 * std of expected scores across ordered questions."""
+        scores = self.expected_scores()
+        if len(scores) < 2:
+            return np.full(len(self.persona_ids), np.nan)
+        matrix = np.column_stack(list(scores.values()))
+        answered = ~np.isnan(matrix)
+        counts = answered.sum(axis=1)
+        values = np.where(answered, matrix, 0.0)
+        means = values.sum(axis=1) / np.maximum(counts, 1)
+        std = np.sqrt((np.where(answered, matrix - means[:, None], 0.0) ** 2).sum(axis=1) / np.maximum(counts, 1))
+        return np.where(counts >= 2, np.clip(1 - 2 * std, 0, 1), np.nan)
+
+    def consistency_metrics(self) -> Dict[str, Any]:
+        """Overall and per-segment consistency."""
+        consistency = self.persona_consistency()
+        valid = ~np.isnan(consistency)
+        if not valid.any():
+            return {"overall": None, "by_segment": []}
+        n = int(valid.sum())
+        overall = float(np.average(consistency[valid], weights=self.weights[valid]))
+        half_width = 1.96 * float(consistency[valid].std()) / np.sqrt(n) if n > 1 else 1.0
+        by_segment = []
+        for segment in np.unique(self.segments[valid]):
+            mask = valid & (self.segments == segment)
+            by_segment.append({
+                "group": str(segment),
+                "size": int(mask.sum()),
+                "consistency_score": round(float(np.average(consistency[mask], weights=self.weights[mask])), 4)
+            })
+        return {
+            "overall": round(overall, 4),
+            "confidence_level": round(float(np.clip(1 - 2 * half_width, 0, 1)), 4),
+            "personas_measured": n,
+            "by_segment": sorted(by_segment, key=lambda s: -s["consistency_score"])
+        }
+
+    def segment_metrics(self) -> Dict[str, Any]:
+        """Within-segment cohesion, divergence from the overall distribution and notable outliers."""
+        segments = []
+        persona_divergence = np.zeros(len(self.persona_ids))
+        persona_answers = np.zeros(len(self.persona_ids))
+        for segment in np.unique(self.segments):
+            mask = self.segments == segment
+            cohesion, divergence = [], []
+            for q_id in self.question_ids:
+                overall = self._mean_distribution(q_id)
+                segment_mean = self._mean_distribution(q_id, mask)
+                if overall is None or segment_mean is None:
+                    continue
+                members = mask & self._answered(q_id)
+                cohesion.append(float(np.average(js_divergence(self.matrices[q_id][members], segment_mean), weights=self.weights[members])))
+                divergence.append(float(js_divergence(segment_mean, overall)))
+            if not cohesion:
+                continue
+            segments.append({
+                "group": str(segment),
+                "size": int(mask.sum()),
+                "alignment_score": round(1 - float(np.mean(cohesion)), 4),
+                "divergence_from_overall": round(float(np.mean(divergence)), 4)
+            })
+
+        for q_id in self.question_ids:
+            overall = self._mean_distribution(q_id)
+            if overall is None:
+                continue
+            answered = self._answered(q_id)
+            persona_divergence[answered] += js_divergence(self.matrices[q_id][answered], overall)
+            persona_answers[answered] += 1
+        with np.errstate(invalid="ignore"):
+            mean_divergence = np.where(persona_answers > 0, persona_divergence / np.maximum(persona_answers, 1), np.nan)
+        outliers = []
+        valid = ~np.isnan(mean_divergence)
+        if valid.any():
+            threshold = np.nanmean(mean_divergence) + 2 * np.nanstd(mean_divergence)
+            for i in np.argsort(-np.nan_to_num(mean_divergence, nan=-1))[:5]:
+                if valid[i] and mean_divergence[i] > threshold:
+                    outliers.append({
+                        "persona_id": self.persona_ids[i],
+                        "segment": str(self.segments[i]),
+                        "divergence_from_overall": round(float(mean_divergence[i]), 4)
+                    })
+
+        pairwise = []
+        for a in range(len(segments)):
+            for b in range(a + 1, len(segments)):
+                mask_a = self.segments == segments[a]["group"]
+                mask_b = self.segments == segments[b]["group"]
+                divergence = []
+                for q_id in self.question_ids:
+                    dist_a = self._mean_distribution(q_id, mask_a)
+                    dist_b = self._mean_distribution(q_id, mask_b)
+                    if dist_a is not None and dist_b is not None:
+                        divergence.append(float(js_divergence(dist_a, dist_b)))
+                if divergence:
+                    pairwise.append({
+                        "groups": [segments[a]["group"], segments[b]["group"]],
+                        "js_divergence": round(float(np.mean(divergence)), 4)
+                    })
+
+        return {
+            "segments": sorted(segments, key=lambda s: -s["alignment_score"]),
+            "pairwise_divergence": sorted(pairwise, key=lambda p: -p["js_divergence"]),
+            "outliers": outliers
+        }
+
+    def compute(self) -> Dict[str, Any]:
+        """Compute every metric."""
+        return {
+            "questions": self.question_metrics(),
+            "rank_correlations": self.rank_correlations(),
+            "entropy_drift": self.entropy_drift(),
+            "consistency": self.consistency_metrics(),
+            "alignment": self.segment_metrics()
+        }
@@ -0,0 +1,137 @@
+"""
+Dependency-driven executor for the survey analysis stages.
+
+Each stage declares the stages it needs. A stage starts as soon as all of its inputs are
+ready instead of waiting for a whole phase to finish, so e.g. the meta analysis can run
+while the qualitative analysis of the last question is still in flight.
+
+After a run, critical_path_report() shows when each stage's inputs were ready, how long the
+stage itself took, and the chain of stages that determined the total duration.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+@dataclass
+class PipelineStage:
+    """A unit of work. run receives the results of its inputs keyed by stage name."""
+    name: str
+    run: Callable[[Dict[str, Any]], Awaitable[Any]]
+    inputs: List[str] = field(default_factory=list)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class PipelineExecutor:
+    """
+    Runs stages concurrently, each one as soon as its declared inputs are available.
+    """
+
+    def __init__(self, name: str = "survey", on_stage_complete: Optional[Callable[[PipelineStage, Any], None]] = None):
+        self.name = name
+        self.on_stage_complete = on_stage_complete
+        self.stages: Dict[str, PipelineStage] = {}
+        self.results: Dict[str, Any] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._start_time: Optional[float] = None
+
+    def add_stage(self, name: str, run: Callable[[Dict[str, Any]], Awaitable[Any]], inputs: List[str] = None) -> "PipelineExecutor":
+        """Register a stage. Inputs must be registered before the pipeline runs."""
+        if name in self.stages:
+            raise ValueError(f"Stage {name} is already registered")
+        self.stages[name] = PipelineStage(name=name, run=run, inputs=list(inputs or []))
+        return self
+
+    def _validate(self):
+        for stage in self.stages.values():
+            missing = [dep for dep in stage.inputs if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+        # Detect cycles with a depth-first walk
+        visiting, done = set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage {name}")
+            visiting.add(name)
+            for dep in self.stages[name].inputs:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    async def _run_stage(self, stage: PipelineStage) -> Any:
+        inputs = {}
+        for dep in stage.inputs:
+            inputs[dep] = await self._tasks[dep]
+        stage.started_at = time.time()
+        try:
+            result = await stage.run(inputs)
+        finally:
+            stage.finished_at = time.time()
+        self.results[stage.name] = result
+        if self.on_stage_complete:
+            self.on_stage_complete(stage, result)
+        return result
+
+    async def run(self) -> Dict[str, Any]:
+        """Run every stage and return their results keyed by stage name. The first failure cancels the rest."""
+        self._validate()
+        self._start_time = time.time()
+        for stage in self.stages.values():
+            self._tasks[stage.name] = asyncio.ensure_future(self._run_stage(stage))
+        try:
+            await asyncio.gather(*self._tasks.values())
+        except Exception:
+            for task in self._tasks.values():
+                task.cancel()
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+            raise
+        return self.results
+
+    def critical_path_report(self) -> Dict[str, Any]:
+        """Per-stage timings (offsets from the pipeline start) and the critical path (the chain of inputs that finished last)."""
+        if self._start_time is None:
+            return {}
+        finished = [stage for stage in self.stages.values() if stage.finished_at is not None]
+        stages = {}
+        for stage in finished:
+            ready_at = max((self.stages[dep].finished_at for dep in stage.inputs), default=self._start_time)
+            stages[stage.name] = {
+                "start_offset_seconds": round(stage.started_at - self._start_time, 3),
+                "duration_seconds": round(stage.finished_at - stage.started_at, 3),
+                "inputs_ready_offset_seconds": round(ready_at - self._start_time, 3),
+                "inputs": stage.inputs
+            }
+
+        critical_path = []
+        current = max(finished, key=lambda s: s.finished_at, default=None)
+        while current is not None:
+            critical_path.append({
+                "stage": current.name,
+                "duration_seconds": round(current.finished_at - current.started_at, 3)
+            })
+            deps = [self.stages[dep] for dep in current.inputs if self.stages[dep].finished_at is not None]
+            current = max(deps, key=lambda s: s.finished_at, default=None)
+        critical_path.reverse()
+
+        total = max((stage.finished_at for stage in finished), default=self._start_time) - self._start_time
+        return {
+            "total_seconds": round(total, 3),
+            "critical_path": critical_path,
+            "stages": stages
+        }
+
+    def print_report(self):
+        report = self.critical_path_report()
+        if not report:
+            return
+        path = " -> ".join(f"{step['stage']} ({step['duration_seconds']}s)" for step in report["critical_path"])
+        print(f"[PipelineExecutor][{self.name}] total {report['total_seconds']}s, critical path: {path}")
@@ -0,0 +1,243 @@
+"""
+Durable checkpoints of survey runs.
+
+Every persona-question result (distribution, reason, reliability, personality summary) is stored
+under the run id as soon as it completes, by a background task that writes the results completed
+since its last write in one transaction in a thread. Resuming a run restores those results, replaying the
+persona state they imply, and only dispatches the persona-question units that are missing before
+rerunning the analytics.
+
+Completed runs also keep each persona's conversation state and each question's analysis, so a run
+can be extended with new questions: only those are simulated, on top of the restored history.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from SurveyTypes import SurveyRequest
+from schema import Persona
+
+RUN_DB_PATH = os.getenv("SURVEY_RUN_DB", "survey_runs.db")
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize numpy scalars left in analysis results as plain numbers"""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class SurveyRunStore:
+    """
+    Persists survey runs and their completed persona-question units in SQLite.
+    """
+
+    def __init__(self, path: str = RUN_DB_PATH):
+        self.path = path
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_schema(self):
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS survey_runs (
+                    id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS survey_run_units (
+                    run_id TEXT NOT NULL,
+                    question_id TEXT NOT NULL,
+                    persona_id TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (run_id, question_id, persona_id)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS survey_run_personas (
+                    run_id TEXT NOT NULL,
+                    persona_id TEXT NOT NULL,
+                    personality_summary TEXT,
+                    conversation_history TEXT NOT NULL,
+                    PRIMARY KEY (run_id, persona_id)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS survey_run_questions (
+                    run_id TEXT NOT NULL,
+                    question_id TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    PRIMARY KEY (run_id, question_id)
+                )
+            """)
+
+    def create_run(self, survey: SurveyRequest, run_id: str = None) -> str:
+        """Register a run. An existing run with the same id keeps its request and checkpoints."""
+        run_id = run_id or uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO survey_runs (id, state, request, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (run_id, "running", survey.model_dump_json(), now, now)
+            )
+        return run_id
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM survey_runs WHERE id = ?", (run_id,)).fetchone()
+            if row is None:
+                return None
+            units = conn.execute("SELECT COUNT(*) FROM survey_run_units WHERE run_id = ?", (run_id,)).fetchone()[0]
+        return {
+            "run_id": row["id"],
+            "state": row["state"],
+            "request": SurveyRequest.model_validate_json(row["request"]),
+            "error": row["error"],
+            "completed_units": units,
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+
+    def update_request(self, run_id: str, survey: SurveyRequest):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE survey_runs SET request = ?, updated_at = ? WHERE id = ?",
+                (survey.model_dump_json(), time.time(), run_id)
+            )
+
+    def set_state(self, run_id: str, state: str, error: str = None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE survey_runs SET state = ?, error = ?, updated_at = ? WHERE id = ?",
+                (state, error, time.time(), run_id)
+            )
+
+    def save_units(self, run_id: str, units: List[Tuple[str, Dict[str, Any]]]):
+        """Store (question id, response) units of a run in one transaction"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO survey_run_units (run_id, question_id, persona_id, response, created_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (run_id, question_id, response["persona_id"], json.dumps(response, default=_json_default), now)
+                    for question_id, response in units
+                ]
+            )
+            conn.execute("COMMIT")
+
+    def load_units(self, run_id: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Completed units of a run keyed by (question id, persona id)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT question_id, persona_id, response FROM survey_run_units WHERE run_id = ?",
+                (run_id,)
+            ).fetchall()
+        return {(row["question_id"], row["persona_id"]): json.loads(row["response"]) for row in rows}
+
+    def save_persona_state(self, run_id: str, personas: List[Persona]):
+        """Snapshot the personality summary and conversation history of the personas of a run"""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO survey_run_personas (run_id, persona_id, personality_summary, conversation_history) VALUES (?, ?, ?, ?)",
+                [(run_id, persona.id, persona.personality_summary, json.dumps(persona.conversation_history)) for persona in personas]
+            )
+
+    def load_persona_state(self, run_id: str) -> Dict[str, Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT persona_id, personality_summary, conversation_history FROM survey_run_personas WHERE run_id = ?",
+                (run_id,)
+            ).fetchall()
+        return {
+            row["persona_id"]: {
+                "personality_summary": row["personality_summary"],
+                "conversation_history": json.loads(row["conversation_history"])
+            }
+            for row in rows
+        }
+
+    def save_question_results(self, run_id: str, question_results: Dict[str, Dict[str, Any]]):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO survey_run_questions (run_id, question_id, result) VALUES (?, ?, ?)",
+                [(run_id, q_id, json.dumps(result, default=_json_default)) for q_id, result in question_results.items()]
+            )
+
+    def load_question_results(self, run_id: str) -> Dict[str, Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT question_id, result FROM survey_run_questions WHERE run_id = ?", (run_id,)).fetchall()
+        return {row["question_id"]: json.loads(row["result"]) for row in rows}
+
+
+class RunCheckpoint:
+    """
+    The checkpoint of one run as seen by a SurveySimulation: completed units are loaded once up
+    front and new ones are written to the store by a background task, off the event loop. flush()
+    waits until every saved unit is stored.
+    """
+
+    def __init__(self, store: SurveyRunStore, run_id: str, units: Dict[Tuple[str, str], Dict[str, Any]] = None):
+        self.store = store
+        self.run_id = run_id
+        self._units = store.load_units(run_id) if units is None else units
+        self._pending: List[Tuple[str, Dict[str, Any]]] = []
+        self._writer: Optional[asyncio.Task] = None
+        self.restored_units = 0
+        self.new_units = 0
+
+    @classmethod
+    async def load(cls, store: SurveyRunStore, run_id: str) -> "RunCheckpoint":
+        return cls(store, run_id, await asyncio.to_thread(store.load_units, run_id))
+
+    def get(self, question_id: str, persona_id: str) -> Optional[Dict[str, Any]]:
+        response = self._units.get((question_id, persona_id))
+        if response is not None:
+            self.restored_units += 1
+        return response
+
+    def responses(self, question_id: str) -> Dict[str, Dict[str, Any]]:
+        """Checkpointed responses to a question keyed by persona id"""
+        return {persona_id: response for (q_id, persona_id), response in self._units.items() if q_id == question_id}
+
+    def save(self, question_id: str, response: Dict[str, Any]):
+        self._units[(question_id, response["persona_id"])] = response
+        self._pending.append((question_id, response))
+        self.new_units += 1
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.get_running_loop().create_task(self._write_pending())
+
+    async def _write_pending(self):
+        # Units saved while a write is in progress go into the next one
+        while self._pending:
+            units, self._pending = self._pending, []
+            try:
+                await asyncio.to_thread(self.store.save_units, self.run_id, units)
+            except Exception as e:
+                # Not checkpointed units are simulated again if the run is resumed
+                print(f"[RunCheckpoint][{self.run_id}] Error saving {len(units)} units: {str(e)}")
+
+    async def flush(self):
+        """Wait until every saved unit is stored"""
+        while self._writer is not None and not self._writer.done():
+            await asyncio.shield(self._writer)
+        if self._pending:
+            await self._write_pending()
+
+    def summary(self) -> Dict[str, Any]:
+        return {"run_id": self.run_id, "restored_units": self.restored_units, "new_units": self.new_units}
@@ -1,19 +1,44 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional, Set
 import asyncio
+from collections import Counter
 from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel, Field
 from datetime import datetime
 import logging
 import traceback
 import time
+import random
 from llminference import LLMInference
 from schema import Persona, PersonaType
 from response_analytics import QuestionAnalytics
 from personas import PersonaManager
-from SurveyTypes import Option, Question
+from SurveyTypes import Option, Question, SurveyRequest, QUESTION_SECTIONS, SURVEY_SECTIONS
 from survey_status import SimulationStatus, SurveyStage
 from survery_meta_analysis import SurveyMetaAnalysis
+from question_classifier import QuestionClassifier
+from qualitative_analytics import QuestionQualitativeAnalysis
+from survey_pipeline import PipelineExecutor
+from survey_runs import SurveyRunStore, RunCheckpoint
+from persona_sampling import sample_personas
+from persona_store import parse_filter
+from prompts import prefix_cache_stats
+from shared_cache import SharedCache, get_shared_cache
+from metrics import observe_stage
+from admission import AdmissionController, survey_cost
 import json
+import os
+
+NOT_RELEVANT_REASON = "Question not relevant for persona"
+PROGRESS_MESSAGES = {
+    SurveyStage.QUERYING_LLM: "Surveying personas",
+    SurveyStage.QUANTITATIVE_ANALYSIS: "Computing response statistics",
+    SurveyStage.QUALITATIVE_ANALYSIS: "Running qualitative and meta analysis",
+}
+# Question result fields returned whatever sections are requested
+ALWAYS_INCLUDED = ("question_type", "ordered_options", "completed_personas")
+# How long other workers wait on a survey another worker is running before running it themselves
+SURVEY_CACHE_LEASE_SECONDS = int(os.getenv("SURVEY_CACHE_LEASE_SECONDS", "1800"))
+
 
 class SimulationConfig(BaseModel):
     """Configuration for the simulation"""
@@ -33,16 +58,41 @@ class SurveySimulation:
     - Error handling and status tracking
     """
     
-    def __init__(self, llm: LLMInference, persona_manager: PersonaManager, config: SimulationConfig = SimulationConfig(), number_of_personas: int = 5, number_of_samples: int = 2000, persona_type: PersonaType = PersonaType.INTEL_EMPLOYEE):
+    def __init__(self, llm: LLMInference, persona_manager: PersonaManager, config: SimulationConfig = SimulationConfig(), number_of_personas: int = 5, number_of_samples: int = 2000, persona_type: PersonaType = PersonaType.INTEL_EMPLOYEE, on_status: Optional[Callable[[SimulationStatus], None]] = None, on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None, checkpoint: Optional[RunCheckpoint] = None, persona_ids: List[str] = None, persona_weights: Dict[str, float] = None, sections: Optional[Set[str]] = None):
         self.llm = llm
         self.persona_manager = persona_manager
-        self.personas = self.persona_manager.get_all_personas()
+        self.total_personas = self.persona_manager.persona_count()
+        if persona_ids is not None:
+            # Targeted sample: survey exactly these personas
+            self.personas = [self.persona_manager.get_persona(persona_id) for persona_id in persona_ids]
+            number_of_personas = len(self.personas)
+        else:
+            self.personas = self.persona_manager.select_personas(limit=number_of_personas)
+        # Personas standing for several near-duplicate reviews weigh accordingly
+        self.persona_weights = persona_weights or self.persona_manager.catalog.persona_weights([persona.id for persona in self.personas])
+        self.sampling_report: Dict[str, Any] = {}
+        # Result sections to compute (None: all). Stages no requested section needs are not run
+        self.sections = sections
         self.config = config
         self.status = None
+        # Stages of the running pipeline not yet completed, by kind (responses, classify, ...)
+        self._pending_stages: Counter = Counter()
+        self.on_status = on_status
+        self.on_event = on_event
+        self.checkpoint = checkpoint
+        self.questions: List[Question] = []
+        self._provisional: Dict[int, Dict[str, Any]] = {}
         self._executor = None
         self.number_of_personas = number_of_personas
         self.number_of_samples = number_of_samples
         self.persona_type = persona_type
+        self.question_responses: Dict[int, List[Dict[str, Any]]] = {}
+        self.completed_personas: Dict[int, int] = {}
+        self.question_classifier = QuestionClassifier()
+
+    def surveyed_personas(self) -> List[Persona]:
+        """The surveyed personas with the conversation state of this run"""
+        return [self.persona_manager.get_persona(persona.id) for persona in self.personas[:self.number_of_personas]]
 
     async def __aenter__(self):
         """Setup for async context manager"""
@@ -89,8 +139,8 @@ class SurveySimulation:
                 "persona_id": persona.id,
                 "personality_summary": personality_summary,
                 "distribution": {},
-                "reason": "Question not relevant for persona",
-                "error": "Question not relevant for persona"
+                "reason": NOT_RELEVANT_REASON,
+                "error": NOT_RELEVANT_REASON
             }
             
         except Exception as e:
@@ -106,11 +156,79 @@ class SurveySimulation:
                 "error": str(e)
             }
 
-    async def _process_question_batch(self, question_text: str, options: List[Option], batch: List[Persona]) -> List[Dict[str, Any]]:
+    def _emit(self, event_type: str, data: Dict[str, Any]):
+        """Send a progress event to the on_event callback, if any"""
+        if not self.on_event:
+            return
+        try:
+            self.on_event(event_type, data)
+        except Exception as e:
+            print(f"[SurveySimulation][_emit] Error sending {event_type} event: {str(e)}")
+
+    def _question_id(self, question_index: int) -> str:
+        if question_index < len(self.questions):
+            return self.questions[question_index].id
+        return str(question_index)
+
+    def _record_persona_result(self, question_index: int, response: Dict[str, Any]):
+        """Emit a persona result and the running mean distribution of its question"""
+        if not self.on_event:
+            return
+        question_id = self._question_id(question_index)
+        self._emit("persona_result", {
+            "question_id": question_id,
+            "persona_id": response["persona_id"],
+            "distribution": response["distribution"],
+            "reliability_score": response.get("reliability_score"),
+            "reason": response["reason"],
+            "error": response["error"]
+        })
+        provisional = self._provisional.setdefault(question_index, {"totals": {}, "answered": 0, "failed": 0})
+        if response["error"] or not response["distribution"]:
+            provisional["failed"] += 1
+        else:
+            provisional["answered"] += 1
+            for option, probability in response["distribution"].items():
+                provisional["totals"][option] = provisional["totals"].get(option, 0.0) + float(probability)
+        answered = provisional["answered"]
+        self._emit("provisional_aggregate", {
+            "question_id": question_id,
+            "answered": answered,
+            "failed": provisional["failed"],
+            "mean_distribution": {
+                option: round(total / answered, 4) for option, total in provisional["totals"].items()
+            } if answered else {}
+        })
+
+    def _restore_persona_response(self, persona: Persona, question_text: str, response: Dict[str, Any]):
+        """Replay the persona state a checkpointed response implies, as _process_persona_question would have left it"""
+        if response.get("personality_summary"):
+            self.persona_manager.update_personality_summary(persona_id=persona.id, personality_summary=response["personality_summary"])
+        if not response["error"] and response["distribution"]:
+            self.persona_manager.update_conversation_history(
+                persona_id=persona.id,
+                question=question_text,
+                distribution=response["distribution"]
+            )
+
+    async def _process_and_record(self, persona: Persona, question_text: str, options: List[Option], question_index: int) -> Dict[str, Any]:
+        question_id = self._question_id(question_index)
+        response = self.checkpoint.get(question_id, persona.id) if self.checkpoint else None
+        if response is not None:
+            self._restore_persona_response(persona, question_text, response)
+        else:
+            response = await self._process_persona_question(persona, question_text, options)
+            # Failed units are not checkpointed so a resume retries them
+            if self.checkpoint and (not response["error"] or response["error"] == NOT_RELEVANT_REASON):
+                self.checkpoint.save(question_id, response)
+        self._record_persona_result(question_index, response)
+        return response
+
+    async def _process_question_batch(self, question_text: str, options: List[Option], batch: List[Persona], question_index: int = 0) -> List[Dict[str, Any]]:
         """Process a batch of personas for a single question"""
         start_time = time.time()
         tasks = [
-            self._process_persona_question(persona, question_text, options)
+            self._process_and_record(persona, question_text, options, question_index)
             for persona in batch
         ]
         await asyncio.sleep(0.01)
@@ -123,7 +241,7 @@ class SurveySimulation:
         await asyncio.sleep(0.01)
         # Extract valid distributions
         options_text = [option.text for option in options]
-        analytics = QuestionAnalytics(all_responses=all_responses, n_samples=self.number_of_samples)
+        analytics = QuestionAnalytics(all_responses=all_responses, n_samples=self.number_of_samples, weights=self.persona_weights)
         analysis = await analytics.analyze_survey_question(question=question, options=options_text)
         
         if asyncio.iscoroutine(analysis):
@@ -131,37 +249,37 @@ class SurveySimulation:
         
         return analysis
 
-    async def run_question(self, question_text: str, options: List[Option], question_index: int, total_questions: int) -> Dict[str, Any]:
-        """Run a single question across all personas"""
+    async def _collect_question_responses(self, question_text: str, options: List[Option], question_index: int) -> List[Dict[str, Any]]:
+        """Collect the responses of all personas to a single question"""
         # Update status
         self.status.current_question = question_index + 1
-        self.status.completed_personas = 0
-        start_time = time.time()
+        self.status.notify()
         # Determine the number of personas to process
         num_personas = min(self.number_of_personas, len(self.personas))
-        print(f"Number of personas: {num_personas}, total personas: {len(self.personas)}")
+        print(f"Number of personas: {num_personas}, total personas: {self.total_personas}")
         await asyncio.sleep(0.01)
         # Create tasks for processing all batches concurrently
         batch_tasks = [
             self._process_question_batch(
                 question_text,
                 options,
-                self.personas[i:i + self.config.max_parallel_personas]
+                self.personas[i:min(i + self.config.max_parallel_personas, num_personas)],
+                question_index
             )
             for i in range(0, num_personas, self.config.max_parallel_personas)
         ]
         # Gather all batch responses concurrently
         all_batch_responses = await asyncio.gather(*batch_tasks, return_exceptions=True)
-        # await asyncio.sleep(0.01)
         all_responses = []
+        completed_personas = 0
         for batch_responses in all_batch_responses:
             if isinstance(batch_responses, Exception):
-                print(f"[SurveySimulation][run_question] Error processing batch: {str(batch_responses)}")
+                print(f"[SurveySimulation][_collect_question_responses] Error processing batch: {str(batch_responses)}")
                 continue
             all_responses.extend(batch_responses)
             
             # Update completion status
-            self.status.completed_personas += len(batch_responses)
+            completed_personas += len(batch_responses)
             
             # Track errors
             for resp in batch_responses:
@@ -169,7 +287,16 @@ class SurveySimulation:
                     self.status.errors.append(
                         f"Error processing persona {resp['persona_id']} for question {question_text}: {resp['error']}"
                     )
-                    self.status.completed_personas -= 1
+                    completed_personas -= 1
+        self.status.completed_personas += completed_personas
+        self.status.notify()
+        self.question_responses[question_index] = all_responses
+        self.completed_personas[question_index] = completed_personas
+        return all_responses
+
+    async def run_question(self, question_text: str, options: List[Option], question_index: int, total_questions: int) -> Dict[str, Any]:
+        """Run a single question across all personas"""
+        all_responses = await self._collect_question_responses(question_text, options, question_index)
         # Analyze responses
         await asyncio.sleep(0.01)
 
@@ -178,89 +305,232 @@ class SurveySimulation:
         if asyncio.iscoroutine(analysis):
             print(f"[SurveySimulation][run_question] Warning: Analysis is a coroutine, expected a dictionary.")
         
-        return analysis, self.status.completed_personas
+        return analysis, self.completed_personas[question_index]
+
+    async def _quantitative_analysis(self, all_responses: List[Dict[str, Any]], classification: Dict[str, Any]) -> Dict[str, Any]:
+        """Sample and compute the statistics of a question off the event loop so LLM calls keep flowing"""
+        analytics = QuestionAnalytics(all_responses=all_responses, n_samples=self.number_of_samples, weights=self.persona_weights)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, analytics.calculate_quantitative_metrics, classification, self.sections)
+
+    async def _qualitative_analysis(self, all_responses: List[Dict[str, Any]], question_text: str, options: List[Option]) -> Dict[str, Any]:
+        """Run the LLM based qualitative analysis of a question"""
+        valid_responses = [resp for resp in all_responses if not resp.get('error')]
+        qualitative_analysis = QuestionQualitativeAnalysis(valid_responses)
+        return await qualitative_analysis.analyze_question(question_text, [option.text for option in options], self.sections)
+
+    def _wants(self, *sections: str) -> bool:
+        """Whether any of the sections was requested"""
+        return self.sections is None or any(section in self.sections for section in sections)
+
+    def _needs_meta_analysis(self) -> bool:
+        return self._wants(*SURVEY_SECTIONS)
+
+    def _needs_quantitative(self) -> bool:
+        # The meta analysis reads every question's distribution and option order
+        return self._wants(*QUESTION_SECTIONS["quantitative"]) or self._needs_meta_analysis()
 
-    async def run_survey(self, questions: List[Question]) -> Dict[str, Any]:
+    def _add_question_stages(self, pipeline: PipelineExecutor, question: Question, question_index: int):
+        """Declare the stages of a single question: responses and classification feed the analyses"""
+        q_id = question.id
+        options_text = [option.text for option in question.options]
+
+        async def collect_responses(inputs):
+            return await self._collect_question_responses(question.text, question.options, question_index)
+
+        async def classify(inputs):
+            return await self.question_classifier.classify(question.text, options_text)
+
+        async def quantitative(inputs):
+            return await self._quantitative_analysis(inputs[f"responses:{q_id}"], inputs[f"classify:{q_id}"])
+
+        async def qualitative(inputs):
+            return await self._qualitative_analysis(inputs[f"responses:{q_id}"], question.text, question.options)
+
+        pipeline.add_stage(f"responses:{q_id}", collect_responses)
+        if self._needs_quantitative():
+            pipeline.add_stage(f"classify:{q_id}", classify)
+            pipeline.add_stage(f"quantitative:{q_id}", quantitative, inputs=[f"responses:{q_id}", f"classify:{q_id}"])
+        if self._wants(*QUESTION_SECTIONS["qualitative"]):
+            pipeline.add_stage(f"qualitative:{q_id}", qualitative, inputs=[f"responses:{q_id}"])
+
+    def _add_meta_analysis_stages(self, pipeline: PipelineExecutor, questions: List[Question]):
+        """Declare the survey level stages. They start once every question's responses and statistics are in"""
+        async def meta_analysis_setup(inputs):
+            response_distributions = {}
+            ordered_options = {}
+            for question in questions:
+                quantitative = inputs[f"quantitative:{question.id}"]
+                if "basic_statistics" in quantitative:
+                    response_distributions[question.id] = quantitative["basic_statistics"]["proportions"]
+                if quantitative.get("ordered_options"):
+                    ordered_options[question.id] = quantitative["ordered_options"]
+            persona_responses = {
+                question.id: inputs[f"responses:{question.id}"]
+                for question in questions
+            }
+            return SurveyMetaAnalysis(
+                persona_data=self.surveyed_personas(),
+                response_distributions=response_distributions,
+                questions=questions,
+                persona_type=self.persona_type,
+                persona_responses=persona_responses,
+                ordered_options=ordered_options,
+                weights=self.persona_weights
+            )
+
+        async def alignment_consistency(inputs):
+            return await inputs["meta_analysis_setup"].analyze_alignment_and_consistency()
+
+        async def demographic_insights(inputs):
+            return await inputs["meta_analysis_setup"].analyze_demographic_insights()
+
+        async def key_findings(inputs):
+            alignment_analysis, consistency_analysis = inputs["alignment_consistency"]
+            return await inputs["meta_analysis_setup"].generate_key_findings(
+                alignment_analysis, consistency_analysis, inputs["demographic_insights"]
+            )
+
+        if not self._needs_meta_analysis():
+            return
+        pipeline.add_stage(
+            "meta_analysis_setup",
+            meta_analysis_setup,
+            inputs=[f"{stage}:{question.id}" for question in questions for stage in ("responses", "quantitative")]
+        )
+        # Key findings summarize the alignment, consistency and demographic analyses
+        wants_findings = self._wants("key_findings", "statistical_metrics", "recommendations")
+        if wants_findings or self._wants("alignment_analysis", "consistency_analysis"):
+            pipeline.add_stage("alignment_consistency", alignment_consistency, inputs=["meta_analysis_setup"])
+        if wants_findings or self._wants("demographic_insights"):
+            pipeline.add_stage("demographic_insights", demographic_insights, inputs=["meta_analysis_setup"])
+        if wants_findings:
+            pipeline.add_stage("key_findings", key_findings, inputs=["meta_analysis_setup", "alignment_consistency", "demographic_insights"])
+
+    def _progress_stage(self) -> SurveyStage:
+        """Earliest phase with stages still running: persona calls, then statistics, then the LLM analyses"""
+        if self._pending_stages["responses"]:
+            return SurveyStage.QUERYING_LLM
+        if self._pending_stages["classify"] or self._pending_stages["quantitative"]:
+            return SurveyStage.QUANTITATIVE_ANALYSIS
+        return SurveyStage.QUALITATIVE_ANALYSIS
+
+    def _on_stage_complete(self, stage, result: Any):
+        """Emit stage completions, with the statistics of each question as soon as they are computed"""
+        observe_stage(stage.name, stage.finished_at - stage.started_at)
+        self._pending_stages[stage.name.split(":", 1)[0]] -= 1
+        progress = self._progress_stage()
+        if self.status.stage not in (progress, SurveyStage.ERROR):
+            self.status.update(stage=progress, message=PROGRESS_MESSAGES[progress])
+        self._emit("stage_completed", {
+            "stage": stage.name,
+            "duration_seconds": round(stage.finished_at - stage.started_at, 3)
+        })
+        if stage.name.startswith("quantitative:"):
+            self._emit("question_statistics", {"question_id": stage.name.split(":", 1)[1], "analysis": result})
+
+    def _add_prior_question_stages(self, pipeline: PipelineExecutor, question: Question, question_index: int, prior: Dict[str, Any]):
+        """Declare a question answered by an earlier run: its stages return the stored responses and analysis"""
+        q_id = question.id
+        self.question_responses[question_index] = prior["responses"]
+        self.completed_personas[question_index] = prior["result"].get("completed_personas", 0)
+
+        async def stored_responses(inputs):
+            return prior["responses"]
+
+        async def stored_analysis(inputs):
+            return prior["result"]
+
+        pipeline.add_stage(f"responses:{q_id}", stored_responses)
+        pipeline.add_stage(f"quantitative:{q_id}", stored_analysis)
+        pipeline.add_stage(f"qualitative:{q_id}", stored_analysis)
+
+    async def run_survey(self, questions: List[Question], prior_questions: List[Question] = None, prior_results: Dict[str, Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Run the complete survey simulation.
+
+        Every analysis step is a pipeline stage that starts as soon as its inputs are ready:
+        question classification runs alongside the persona calls, and the meta analysis starts
+        while the qualitative analysis of the questions is still running.
+
+        When extending an earlier run, prior_questions were already answered: prior_results holds
+        their stored responses and analysis keyed by question id. Only the new questions are
+        simulated, and the survey level analysis covers all of them.
         """
+        prior_questions = list(prior_questions or [])
+        questions = prior_questions + list(questions)
         try:            
-            start_time = time.time()
             # Initialize status tracking
             self.status = SimulationStatus(
                 start_time=datetime.now(),
                 current_question=0,
                 total_questions=len(questions),
                 completed_personas=0,
-                total_personas=len(self.personas)
+                total_personas=self.total_personas
             )
-            
-            results = {}
-            
-            # Process questions concurrently
-            question_tasks = [
-                self.run_question(
-                    question_text=question.text,
-                    options=question.options,
-                    question_index=i,
-                    total_questions=len(questions)
-                )
-                for i, question in enumerate(questions)
-            ]
-            
-            await asyncio.sleep(0.01)
-            question_results = await asyncio.gather(*question_tasks, return_exceptions=True)
-            # await asyncio.sleep(0.01)
-            for i, result in enumerate(question_results):
-                if isinstance(result, Exception):
-                    print(f"[SurveySimulation][run_survey] Error processing question {i}: {str(result)}")
-                    raise result
-                elif asyncio.iscoroutine(result):
-                    # Ensure coroutine is awaited
-                    result = await result
+            if self.on_status:
+                self.status.subscribe(self.on_status)
+            self.status.update(stage=SurveyStage.QUERYING_LLM, message=PROGRESS_MESSAGES[SurveyStage.QUERYING_LLM])
+            self.questions = list(questions)
+
+            pipeline = PipelineExecutor(name="run_survey", on_stage_complete=self._on_stage_complete)
+            for i, question in enumerate(questions):
+                if i < len(prior_questions):
+                    self._add_prior_question_stages(pipeline, question, i, prior_results[question.id])
                 else:
-                    question_id = questions[i].id
-                    results[question_id], completed_personas = result
-                    results[question_id]["completed_personas"] = completed_personas
+                    self._add_question_stages(pipeline, question, i)
+            self._add_meta_analysis_stages(pipeline, questions)
+            self._pending_stages = Counter(name.split(":", 1)[0] for name in pipeline.stages)
 
-            # completed personas for all questions
-            completed_personas = {}
-            for question_id, result in results.items():
-                completed_personas[question_id] = result["completed_personas"]
+            stage_results = await pipeline.run()
+            pipeline.print_report()
 
-            # Extract simplified response distributions for each question
-            response_distributions = {}
-            for question_id, result in results.items():
-                if "basic_statistics" in result:
-                    response_distributions[question_id] = result["basic_statistics"]["proportions"]
+            results = {}
+            completed_personas = {}
+            for i, question in enumerate(questions):
+                # Stages of sections that were not requested did not run
+                question_result = dict(stage_results.get(f"quantitative:{question.id}", {}))
+                qualitative_analysis = stage_results.get(f"qualitative:{question.id}", {})
+                question_result.update({
+                    section: qualitative_analysis.get(section, {})
+                    for section in QUESTION_SECTIONS["qualitative"] if self._wants(section)
+                })
+                question_result["completed_personas"] = self.completed_personas.get(i, 0)
+                results[question.id] = question_result
+                completed_personas[question.id] = question_result["completed_personas"]
 
             final_result = {
                 "question_results": results,
                 "metadata": {
-                    "total_personas": len(self.personas),
+                    "total_personas": self.total_personas,
                     "total_questions": len(questions),
                     "error_count": len(self.status.errors),
                     "completed_personas": completed_personas,
-                    "duration_seconds": (datetime.now() - self.status.start_time).total_seconds()
+                    "duration_seconds": (datetime.now() - self.status.start_time).total_seconds(),
+                    "pipeline": pipeline.critical_path_report()
                 }
             }
+            if self.checkpoint:
+                final_result["metadata"]["checkpoint"] = self.checkpoint.summary()
+            if self.sampling_report:
+                final_result["metadata"]["sampling"] = self.sampling_report
+            final_result["metadata"]["llm_usage"] = {**self.llm.usage_report(), "prompt_prefixes": prefix_cache_stats()}
 
-            await asyncio.sleep(0.01)
+            complete_analysis = {}
+            if "key_findings" in stage_results:
+                key_findings = stage_results["key_findings"]
+                complete_analysis.update({
+                    "key_findings": key_findings.get("primary_findings", []),
+                    "statistical_metrics": key_findings.get("statistical_metrics", {}),
+                    "recommendations": key_findings.get("recommendations", []),
+                })
+            if "alignment_consistency" in stage_results:
+                complete_analysis["alignment_analysis"], complete_analysis["consistency_analysis"] = stage_results["alignment_consistency"]
+            if "demographic_insights" in stage_results:
+                complete_analysis["demographic_insights"] = stage_results["demographic_insights"]
+            if complete_analysis:
+                final_result["complete_analysis"] = complete_analysis
             self.status.update(stage=SurveyStage.COMPLETED, message="Survey completed")
-            
-            start_time = time.time()
-            survey_meta_analysis = SurveyMetaAnalysis(persona_data=self.personas[:self.number_of_personas], response_distributions=response_distributions, questions=questions, persona_type=self.persona_type)
-            
-            complete_analysis = await survey_meta_analysis.get_complete_analysis()
-            await asyncio.sleep(0.01)
-            final_result["complete_analysis"] = {
-                "key_findings": complete_analysis.get("key_findings", []),
-                "statistical_metrics": complete_analysis.get("statistical_metrics", {}),
-                "recommendations": complete_analysis.get("recommendations", []),
-                "alignment_analysis": complete_analysis.get("alignment_analysis", {}),
-                "consistency_analysis": complete_analysis.get("consistency_analysis", {}),
-                "demographic_insights": complete_analysis.get("demographic_insights", {})
-            }
             return final_result
             
         except Exception as e:
@@ -268,4 +538,167 @@ class SurveySimulation:
             error_trace = traceback.format_exc()
             print(f"[SurveySimulation][run_survey] Fatal error: {str(e)}")
             print(f"[SurveySimulation][run_survey] Fatal error Full traceback:\n{error_trace}")
+            if self.status:
+                self.status.update(stage=SurveyStage.ERROR, message="Survey failed", error=str(e))
             raise
+
+
+def project_result(results: Dict[str, Any], sections: Optional[Set[str]]) -> Dict[str, Any]:
+    """
+    Survey result restricted to the requested sections. Every question result keeps its question
+    type, option order and completed persona count; metadata is always returned in full.
+    """
+    if sections is None:
+        return results
+    projected = {
+        **results,
+        "question_results": {
+            question_id: {key: value for key, value in result.items() if key in sections or key in ALWAYS_INCLUDED}
+            for question_id, result in results.get("question_results", {}).items()
+        },
+        "metadata": {**results.get("metadata", {}), "include": sorted(sections)}
+    }
+    complete_analysis = {key: value for key, value in results.get("complete_analysis", {}).items() if key in sections}
+    if complete_analysis:
+        projected["complete_analysis"] = complete_analysis
+    else:
+        projected.pop("complete_analysis", None)
+    return projected
+
+
+async def _run_with_store(survey: SurveyRequest, run_store: SurveyRunStore, run_id: str, on_status: Optional[Callable[[SimulationStatus], None]] = None, on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None, prior_questions: List[Question] = None, persona_state: Dict[str, Dict[str, Any]] = None, prior_results: Dict[str, Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Run the questions of a survey that are not in prior_questions under a run id, and save the run state for later extension"""
+    prior_questions = prior_questions or []
+    checkpoint = await RunCheckpoint.load(run_store, run_id)
+    # Loads the catalog in a thread if the server has not built it at startup
+    persona_manager = await asyncio.to_thread(PersonaManager, survey.persona_type)
+    for persona_id, state in (persona_state or {}).items():
+        persona_manager.restore_persona_state(persona_id, state["personality_summary"], state["conversation_history"])
+    llm = LLMInference(persona_manager)
+    config = SimulationConfig(max_parallel_personas=3, thread_pool_size=2, timeout_seconds=300)
+    sample = None
+    if survey.is_targeted:
+        sample = sample_personas(
+            persona_manager.catalog,
+            survey.number_of_personas,
+            predicates=parse_filter(survey.persona_filter, persona_manager.catalog.store.column_kinds()),
+            stratify_by=survey.stratify_by.field if survey.stratify_by else None,
+            proportions=survey.stratify_by.proportions if survey.stratify_by else None,
+            seed=survey.sampling_seed
+        )
+
+    try:
+        async with SurveySimulation(llm, persona_manager, config, survey.number_of_personas, survey.number_of_samples, survey.persona_type, on_status=on_status, on_event=on_event, checkpoint=checkpoint, persona_ids=sample.persona_ids if sample else None, persona_weights=sample.weights if sample else None, sections=survey.result_sections()) as simulation:
+            if sample:
+                simulation.sampling_report = {**sample.report, "persona_filter": survey.persona_filter, "sampling_seed": survey.sampling_seed}
+            prior = {}
+            for question in prior_questions:
+                responses = checkpoint.responses(question.id)
+                prior[question.id] = {
+                    "result": prior_results[question.id],
+                    "responses": [responses[persona.id] for persona in simulation.personas if persona.id in responses]
+                }
+            try:
+                results = await simulation.run_survey(survey.questions[len(prior_questions):], prior_questions=prior_questions, prior_results=prior)
+            finally:
+                await checkpoint.flush()
+            await asyncio.to_thread(run_store.save_persona_state, run_id, simulation.surveyed_personas())
+    except Exception as e:
+        await asyncio.to_thread(run_store.set_state, run_id, "failed", str(e))
+        raise
+    await asyncio.to_thread(run_store.save_question_results, run_id, results["question_results"])
+    await asyncio.to_thread(run_store.set_state, run_id, "completed")
+    results["metadata"]["run_id"] = run_id
+    return project_result(results, survey.result_sections())
+
+
+async def run_survey_request(survey: SurveyRequest, on_status: Optional[Callable[[SimulationStatus], None]] = None, on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None, run_id: str = None, run_store: SurveyRunStore = None) -> Dict[str, Any]:
+    """
+    Build the persona manager, LLM and simulation for a survey request and run it.
+
+    Completed persona-question units are checkpointed under run_id. Running again with the id of
+    an earlier run reuses its checkpoints and only dispatches the missing units.
+    """
+    print(f"[run_survey_request] params: {survey.persona_type}, {survey.number_of_personas} personas, {len(survey.questions)} questions, {survey.number_of_samples} samples")
+    run_store = run_store or SurveyRunStore()
+    existing = run_store.get_run(run_id) if run_id else None
+    if existing:
+        # Keep the stored request (and its sampling seed) so the same personas are surveyed again
+        survey = existing["request"]
+    elif survey.is_targeted and survey.sampling_seed is None:
+        survey = survey.model_copy(update={"sampling_seed": random.randrange(2 ** 31)})
+    run_id = run_store.create_run(survey, run_id)
+    return await _run_with_store(survey, run_store, run_id, on_status=on_status, on_event=on_event)
+
+
+async def run_cached_survey_request(survey: SurveyRequest, run_id: str = None, cache: SharedCache = None, admission: Optional[AdmissionController] = None) -> Dict[str, Any]:
+    """
+    run_survey_request through the shared cache. A request that surveys the same personas as an
+    earlier one (untargeted, or targeted with a sampling seed) returns that run's result and run id;
+    identical requests arriving at several workers together are run once. With an admission
+    controller, only a run that is not served from the cache is admitted against its capacity.
+    """
+    async def run():
+        if admission is None:
+            return await run_survey_request(survey, run_id=run_id)
+        async with admission.admit(survey_cost(survey.number_of_personas, len(survey.questions))):
+            return await run_survey_request(survey, run_id=run_id)
+
+    if not survey.is_reproducible:
+        return await run()
+    cache = cache or get_shared_cache()
+    return await cache.get_or_compute(
+        "survey",
+        [survey.model_dump(mode="json")],
+        run,
+        lease_seconds=SURVEY_CACHE_LEASE_SECONDS
+    )
+
+
+async def resume_survey_run(run_id: str, on_status: Optional[Callable[[SimulationStatus], None]] = None, on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None, run_store: SurveyRunStore = None) -> Dict[str, Any]:
+    """Rerun a checkpointed run: only the missing persona-question units are dispatched, then the analytics rerun"""
+    run_store = run_store or SurveyRunStore()
+    run = run_store.get_run(run_id)
+    if run is None:
+        raise KeyError(f"Survey run {run_id} not found")
+    print(f"[resume_survey_run] resuming run {run_id} with {run['completed_units']} completed units")
+    return await run_survey_request(run["request"], on_status=on_status, on_event=on_event, run_id=run_id, run_store=run_store)
+
+
+async def extend_survey_run(run_id: str, questions: List[Question], on_status: Optional[Callable[[SimulationStatus], None]] = None, on_event: Optional[Callable[[str, Dict[str, Any]], None]] = None, run_store: SurveyRunStore = None) -> Dict[str, Any]:
+    """
+    Add questions to a completed run. Persona conversation history and the analysis of the earlier
+    questions are restored from the run store; only the new questions are simulated before the
+    survey level analysis is recomputed over all questions.
+    """
+    run_store = run_store or SurveyRunStore()
+    run = run_store.get_run(run_id)
+    if run is None:
+        raise KeyError(f"Survey run {run_id} not found")
+    if run["state"] != "completed":
+        raise ValueError(f"Survey run {run_id} is {run['state']}, resume it before extending it")
+    survey = run["request"]
+    existing_ids = {question.id for question in survey.questions}
+    duplicates = [question.id for question in questions if question.id in existing_ids]
+    if duplicates:
+        raise ValueError(f"Questions {duplicates} are already part of survey run {run_id}")
+    prior_results = run_store.load_question_results(run_id)
+    missing = [question.id for question in survey.questions if question.id not in prior_results]
+    if missing:
+        raise ValueError(f"Survey run {run_id} has no stored results for questions {missing}")
+
+    extended = survey.model_copy(update={"questions": list(survey.questions) + list(questions)})
+    # A failed extension can then be resumed like any other run
+    run_store.update_request(run_id, extended)
+    run_store.set_state(run_id, "running")
+    print(f"[extend_survey_run] extending run {run_id} with {len(questions)} questions")
+    return await _run_with_store(
+        extended,
+        run_store,
+        run_id,
+        on_status=on_status,
+        on_event=on_event,
+        prior_questions=survey.questions,
+        persona_state=run_store.load_persona_state(run_id),
+        prior_results=prior_results
+    )
@@ -1,7 +1,7 @@
 from enum import Enum
 from datetime import datetime
-from typing import List
-from pydantic import BaseModel
+from typing import List, Callable
+from pydantic import BaseModel, PrivateAttr
 
 class SurveyStage(Enum):
     INITIALIZING = "Initializing survey"
@@ -22,6 +22,19 @@ class SimulationStatus(BaseModel):
     stage: SurveyStage = SurveyStage.INITIALIZING
     message: str = ""
     errors: List[str] = []
+    _listeners: List[Callable[["SimulationStatus"], None]] = PrivateAttr(default_factory=list)
+
+    def subscribe(self, listener: Callable[["SimulationStatus"], None]):
+        """Register a callback invoked on every status change"""
+        self._listeners.append(listener)
+
+    def notify(self):
+        """Tell listeners that the status changed"""
+        for listener in self._listeners:
+            try:
+                listener(self)
+            except Exception as e:
+                print(f"[Survey Status] Listener error: {str(e)}")
 
     def update(self, stage: SurveyStage, message: str = "", error: str = None):
         self.stage = stage
@@ -29,4 +42,5 @@ class SimulationStatus(BaseModel):
         if error:
             self.errors.append(error)
             self.stage = SurveyStage.ERROR
-        print(f"[Survey Status] {stage.value}: {message}") 
\ No newline at end of file
+        print(f"[Survey Status] {stage.value}: {message}") 
+        self.notify()
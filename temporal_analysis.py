@@ -0,0 +1,262 @@
+"""
+Map-reduce temporal analysis of persona responses for /analyze_responses.
+
+Responses are dated locally (Glassdoor reviews by `date`, product reviewers by
+`information_cutoff`) and split into chunks of at most ANALYSIS_CHUNK_SIZE responses from one
+year: busy months are split, quiet months of a year share a chunk. Each chunk is analyzed by its
+own LLM call, all concurrently, so latency is bounded by the largest chunk rather than by the
+corpus and no prompt outgrows the context window. The chunk results are reduced locally, weighted
+by response counts, into the sentimentTimeSeries, themeDistribution and emotionAnalysis the
+endpoint has always returned; one small call over the theme and emotion names and the chunk
+insights merges synonymous names and writes the insights.
+"""
+
+import asyncio
+import os
+import re
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from schema import PersonaType
+
+ANALYSIS_CHUNK_SIZE = int(os.getenv("ANALYSIS_CHUNK_SIZE", "60"))
+ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "16"))
+MAX_THEMES = 8
+MAX_EMOTIONS = 8
+MAX_REDUCE_INSIGHTS = 40
+DATE_FORMATS = ("%b %d, %Y", "%B %d, %Y", "%Y-%m-%d", "%m/%d/%Y", "%b %Y", "%B %Y")
+DATE_FIELDS = {
+    PersonaType.INTEL_EMPLOYEE: "date",
+    PersonaType.INTEL_PRODUCT_REVIEWER: "information_cutoff",
+}
+
+Complete = Callable[[str], Awaitable[Any]]
+
+
+def parse_date(value: Any) -> Optional[date]:
+    """Date of a review, or None when it cannot be read"""
+    if not value:
+        return None
+    text = re.sub(r"\s+", " ", str(value)).strip()
+    text = re.sub(r"(\d)(st|nd|rd|th)\b", r"\1", text)
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    try:
+        return datetime.fromisoformat(text).date()
+    except ValueError:
+        return None
+
+
+def format_response(i: int, resp: Dict[str, Any], persona_type: PersonaType) -> str:
+    if persona_type == PersonaType.INTEL_EMPLOYEE:
+        return (
+            f"Response {i+1}: {resp.get('response')} "
+            f"Date: {resp.get('date')}"
+            f"(from {resp.get('name')}, {resp.get('role')}, {resp.get('location')}, "
+            f"Rating: {resp.get('rating')})"
+        )
+    if persona_type == PersonaType.INTEL_PRODUCT_REVIEWER:
+        return (
+            f"Response {i+1}: {resp.get('response')} "
+            f"(User: {resp.get('name')}, "
+            f"Date: {resp.get('information_cutoff')}"
+            f"Technical Level: {resp.get('expertise_level', {}).get('level', 'Unknown')})"
+        )
+    raise ValueError(f"Unsupported persona type: {persona_type}")
+
+
+def bucket_responses(responses: List[Dict[str, Any]], persona_type: PersonaType, chunk_size: int = ANALYSIS_CHUNK_SIZE) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Chunks of formatted responses in date order, each from a single year and holding at most
+    chunk_size responses, with the number of responses per month (YYYY-MM) they hold; and the
+    number of responses without a readable date, which are left out.
+    """
+    if persona_type not in DATE_FIELDS:
+        raise ValueError(f"Unsupported persona type: {persona_type}")
+    months: Dict[str, List[str]] = defaultdict(list)
+    undated = 0
+    for i, resp in enumerate(responses):
+        day = parse_date(resp.get(DATE_FIELDS[persona_type]))
+        if day is None:
+            undated += 1
+            continue
+        month = day.strftime("%Y-%m")
+        months[month].append(f"[{month}] {format_response(i, resp, persona_type)}")
+    chunks: List[Dict[str, Any]] = []
+    for month in sorted(months):
+        formatted = months[month]
+        current = chunks[-1] if chunks else None
+        if current and current["year"] == month[:4] and len(current["responses"]) + len(formatted) <= chunk_size:
+            current["responses"].extend(formatted)
+            current["months"][month] = len(formatted)
+            continue
+        # Even parts: 61 responses make chunks of 31 and 30 rather than 60 and 1
+        size = -(-len(formatted) // -(-len(formatted) // chunk_size))
+        for start in range(0, len(formatted), size):
+            part = formatted[start:start + size]
+            chunks.append({"year": month[:4], "months": {month: len(part)}, "responses": part})
+    return chunks, undated
+
+
+def chunk_prompt(question: str, months: List[str], formatted: List[str]) -> str:
+    return (
+        f"Analyze these responses to: \"{question}\"\n\n"
+        f"Each response is prefixed with its month. Responses with their details:\n"
+        f"{chr(10).join(formatted)}\n\n"
+        f"Provide the analysis in this exact JSON format:\n"
+        "{\n"
+        '    "sentiment": [\n'
+        '        { "date": "month (YYYY-MM)", "positive": "percentage of the month\'s responses with positive sentiment (0-100)", "negative": "percentage with negative sentiment (0-100)" }\n'
+        "    ],\n"
+        '    "themes": [\n'
+        '        { "theme": "short theme name", "share": "percentage of the responses raising it (0-100)" }\n'
+        "    ],\n"
+        '    "emotions": [\n'
+        '        { "emotion": "emotion name", "intensity": "intensity across the responses (0-100)" }\n'
+        "    ],\n"
+        '    "insights": [\n'
+        '        { "title": "Key insight title", "description": "Detailed description", "type": "sentiment|themes|improvement" }\n'
+        "    ]\n"
+        "}\n"
+        f"Give one sentiment entry for each of the months {months}. Name at most 6 themes and 6 emotions, in title case."
+    )
+
+
+def reduce_prompt(question: str, themes: List[str], emotions: List[str], sentiment: List[Dict[str, Any]], insights: List[Dict[str, Any]]) -> str:
+    return (
+        f"Batches of responses to: \"{question}\" were analyzed separately.\n\n"
+        f"Theme names used by the batches: {themes}\n"
+        f"Emotion names used by the batches: {emotions}\n"
+        f"Sentiment by month (percent positive and negative): {sentiment}\n"
+        f"Insights of the batches: {insights}\n\n"
+        f"Merge theme names and emotion names that mean the same thing, and summarize the insights "
+        f"across all batches. Provide the result in this exact JSON format:\n"
+        "{\n"
+        '    "themes": { "theme name as used": "merged theme name" },\n'
+        '    "emotions": { "emotion name as used": "merged emotion name" },\n'
+        '    "insights": [\n'
+        '        { "title": "Key insight title", "description": "Detailed description", "type": "sentiment|themes|improvement" }\n'
+        "    ]\n"
+        "}"
+    )
+
+
+def _number(value: Any) -> float:
+    try:
+        return min(max(float(str(value).strip().rstrip("%")), 0.0), 100.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _named_values(items: Any, name_key: str, value_key: str) -> Dict[str, float]:
+    """{name: value} of a chunk's list of themes or emotions; repeated names add up"""
+    values: Dict[str, float] = defaultdict(float)
+    for item in items if isinstance(items, list) else []:
+        if isinstance(item, dict) and str(item.get(name_key, "")).strip():
+            values[str(item[name_key]).strip()] += _number(item.get(value_key))
+    return values
+
+
+def _by_year(chunks: List[Dict[str, Any]], field: str, names: Dict[str, str], limit: int, label: str) -> List[Dict[str, Any]]:
+    """Count-weighted mean of each merged name's values per year, for the limit names with the largest overall mean"""
+    year_counts: Dict[str, int] = defaultdict(int)
+    totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for chunk in chunks:
+        year = chunk["year"]
+        year_counts[year] += chunk["count"]
+        merged: Dict[str, float] = defaultdict(float)
+        for name, value in chunk[field].items():
+            merged[names.get(name, name)] += value
+        for name, value in merged.items():
+            totals[name][year] += min(value, 100.0) * chunk["count"]
+    corpus = sum(year_counts.values())
+    ranked = sorted(totals, key=lambda name: sum(totals[name].values()) / corpus, reverse=True)[:limit]
+    return [
+        {label: name, **{year: round(totals[name][year] / year_counts[year], 1) for year in sorted(year_counts)}}
+        for name in ranked
+    ]
+
+
+async def analyze_temporal(question: str, responses: List[Dict[str, Any]], persona_type: PersonaType, complete: Complete, chunk_size: int = ANALYSIS_CHUNK_SIZE, concurrency: int = ANALYSIS_CONCURRENCY) -> Dict[str, Any]:
+    """
+    Sentiment time series, theme distribution, emotion analysis and insights of the responses.
+
+    Args:
+        question: Question the responses answer
+        responses: Persona responses with their persona fields
+        persona_type: Persona type, which determines the date field
+        complete: Coroutine function returning the parsed JSON answer to a prompt
+    """
+    chunks, undated = bucket_responses(responses, persona_type, chunk_size)
+    print(f"[analyze_temporal] {len(responses)} responses in {len(chunks)} chunks, {undated} without a date")
+    slots = asyncio.Semaphore(concurrency)
+
+    async def analyze_chunk(chunk: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        async with slots:
+            try:
+                analysis = await complete(chunk_prompt(question, list(chunk["months"]), chunk["responses"])) or {}
+            except Exception as e:
+                print(f"[analyze_temporal][{min(chunk['months'])}] Error: {str(e)}")
+                return None
+        sentiment = {
+            str(entry.get("date", "")).strip()[:7]: entry
+            for entry in analysis.get("sentiment", []) if isinstance(entry, dict)
+        }
+        return {
+            "year": chunk["year"],
+            "count": len(chunk["responses"]),
+            # Months the model left out of the sentiment do not count towards their average
+            "sentiment": {
+                month: (count, _number(sentiment[month].get("positive")), _number(sentiment[month].get("negative")))
+                for month, count in chunk["months"].items() if month in sentiment
+            },
+            "themes": _named_values(analysis.get("themes"), "theme", "share"),
+            "emotions": _named_values(analysis.get("emotions"), "emotion", "intensity"),
+            "insights": [insight for insight in analysis.get("insights", []) if isinstance(insight, dict)],
+        }
+
+    results = [result for result in await asyncio.gather(*(analyze_chunk(chunk) for chunk in chunks)) if result]
+    if chunks and not results:
+        raise RuntimeError("Every chunk of the analysis failed")
+
+    months: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for result in results:
+        for month, (count, positive, negative) in result["sentiment"].items():
+            months[month]["count"] += count
+            months[month]["positive"] += positive * count
+            months[month]["negative"] += negative * count
+    sentiment_series = [
+        {
+            "date": month,
+            "positive": round(months[month]["positive"] / months[month]["count"], 1),
+            "negative": round(months[month]["negative"] / months[month]["count"], 1)
+        }
+        for month in sorted(months)
+    ]
+
+    theme_names = sorted({name for result in results for name in result["themes"]})
+    emotion_names = sorted({name for result in results for name in result["emotions"]})
+    insights = [insight for result in results for insight in result["insights"]]
+    names = {"themes": {}, "emotions": {}}
+    if len(results) > 1:
+        # The chunks name themes independently; merge synonyms and summarize the insights
+        try:
+            merged = await complete(reduce_prompt(question, theme_names, emotion_names, sentiment_series, insights[:MAX_REDUCE_INSIGHTS])) or {}
+            for field in names:
+                if isinstance(merged.get(field), dict):
+                    names[field] = {str(k): str(v) for k, v in merged[field].items() if str(v).strip()}
+            if isinstance(merged.get("insights"), list):
+                insights = merged["insights"]
+        except Exception as e:
+            print(f"[analyze_temporal][reduce] Error: {str(e)}")
+        insights = insights[:MAX_REDUCE_INSIGHTS]
+
+    return {
+        "sentimentTimeSeries": sentiment_series,
+        "themeDistribution": _by_year(results, "themes", names["themes"], MAX_THEMES, "theme"),
+        "emotionAnalysis": _by_year(results, "emotions", names["emotions"], MAX_EMOTIONS, "emotion"),
+        "insights": insights
+    }